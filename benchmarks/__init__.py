@@ -0,0 +1,5 @@
+'''
+This code is copyrighted work by Paul Williams.
+Distributed under the BSD-3-Clause license available:
+    https://opensource.org/licenses/BSD-3-Clause
+'''
\ No newline at end of file
@@ -0,0 +1,373 @@
+#!/usr/bin/env python
+
+"""
+This code is copyrighted work by Paul Williams.
+Distributed under the BSD-3-Clause license available:
+    https://opensource.org/licenses/BSD-3-Clause
+"""
+
+
+import json
+import platform
+import statistics
+import sys
+from argparse import ArgumentParser
+from itertools import product
+from timeit import default_timer
+
+import PIL
+from PIL import Image
+
+from project.glyph_atlas import atlas_cache
+from project.stamp_cache import stamp_cache
+from project.textual_water_marker import Corner
+from project.textual_water_marker import Edge
+from project.textual_water_marker import TextualWaterMarker
+
+
+"""
+Apply methods mapped to a function calling them with representative
+arguments.
+"""
+METHODS = {
+    "centre": lambda wm, text: wm.apply_centre(text),
+    "corner": lambda wm, text: wm.apply_corner(text, Corner.bottom_right()),
+    "edge": lambda wm, text: wm.apply_edge(text, Edge.top()),
+    "absolute": lambda wm, text: wm.apply_absolute(text, 10, 10),
+    "percent": lambda wm, text: wm.apply_percent(text, 50, 50),
+    "random": lambda wm, text: wm.apply_random(text, 10, 1),
+    "lattice": lambda wm, text: wm.apply_lattice(text, 40, 40),
+    "rotated_lattice":
+        lambda wm, text: wm.apply_rotated_lattice(text, 40, 40),
+}
+
+
+"""
+Fields identifying a benchmark case within the results.
+"""
+CASE_FIELDS = ("method", "megapixels", "font_size", "rotation", "reverse")
+
+
+"""
+Gets the size of an image with a 4:3 aspect ratio.
+
+Args:
+    megapixels: Number of millions of pixels.
+
+Returns:
+    (width, height) tuple.
+"""
+def image_size(megapixels):
+    height = int(round((megapixels * 1e6 * 3 / 4) ** 0.5))
+    width = int(round(megapixels * 1e6 / height))
+    return width, height
+
+
+"""
+Generates every combination of the benchmark parameters.
+
+Args:
+    methods: Names of the apply methods.
+    megapixels: Image sizes in megapixels.
+    font_sizes: Font sizes in points.
+    rotations: Rotations in degrees.
+    reverses: Reverse settings.
+
+Returns:
+    Iterator of case dictionaries keyed by CASE_FIELDS.
+"""
+def benchmark_cases(methods, megapixels, font_sizes, rotations, reverses):
+    for values in product(megapixels, methods, font_sizes, rotations,
+                          reverses):
+        size, method, font_size, rotation, reverse = values
+        yield {"method": method,
+               "megapixels": size,
+               "font_size": font_size,
+               "rotation": rotation,
+               "reverse": reverse}
+
+
+"""
+Times one benchmark case. The image is reused between runs since
+watermarking it again costs the same.
+
+Args:
+    case: Case dictionary.
+    img: Pillow Image of the case's size.
+    font: Font file name.
+    repeats: Number of timed runs.
+    cold: True to clear the stamp and glyph atlas caches before every
+    run so text rendering is timed too; otherwise stamps are rendered
+    once up front.
+
+Returns:
+    Result dictionary; the case plus the best and median run seconds
+    and the megapixels watermarked per second.
+"""
+def time_case(case, img, font, repeats, cold=False):
+    water_marker = TextualWaterMarker(img)\
+        .font(font)\
+        .size(case["font_size"])\
+        .rotation(case["rotation"])\
+        .reverse(case["reverse"])
+    apply = METHODS[case["method"]]
+
+    if not cold:
+        water_marker.warm("WATERMARK")
+
+    runs = []
+    for _ in range(repeats):
+        if cold:
+            stamp_cache.clear()
+            atlas_cache.clear()
+
+        started = default_timer()
+        apply(water_marker, "WATERMARK")
+        runs.append(default_timer() - started)
+
+    result = dict(case)
+    result["width"], result["height"] = img.size
+    result["best_s"] = min(runs)
+    result["median_s"] = statistics.median(runs)
+    result["megapixels_per_s"] = case["megapixels"] / max(min(runs), 1e-9)
+    return result
+
+
+"""
+Runs the benchmark cases, creating each image size once.
+
+Args:
+    cases: Iterable of case dictionaries.
+    font: Font file name.
+    repeats: Number of timed runs per case.
+    cold: True to time text rendering too.
+    progress: Function receiving each result as it is produced.
+    Defaults to none.
+
+Returns:
+    List of result dictionaries.
+"""
+def run_benchmarks(cases, font, repeats, cold=False, progress=None):
+    results = []
+    img = None
+
+    for case in cases:
+        size = image_size(case["megapixels"])
+        if img is None or img.size != size:
+            img = None
+            img = Image.new('RGB', size, (90, 120, 150))
+
+        result = time_case(case, img, font, repeats, cold)
+        results.append(result)
+        if progress is not None:
+            progress(result)
+
+    return results
+
+
+"""
+Builds the JSON report of a run.
+
+Args:
+    results: List of result dictionaries.
+    repeats: Number of timed runs per case.
+    cold: True if text rendering was timed too.
+
+Returns:
+    Report dictionary.
+"""
+def report(results, repeats, cold):
+    return {"environment": {"python": platform.python_version(),
+                            "pillow": PIL.__version__,
+                            "machine": platform.machine(),
+                            "system": platform.system()},
+            "repeats": repeats,
+            "cold": cold,
+            "results": results}
+
+
+"""
+Finds the cases that got slower than a baseline report.
+
+Args:
+    results: List of result dictionaries of this run.
+    baseline: Report dictionary of an earlier run.
+    threshold: Allowed slowdown as a fraction, e.g. 0.25 for 25%.
+    noise_s: Slowdowns of fewer seconds than this are ignored as timer
+    noise.
+
+Returns:
+    List of (result, baseline result, ratio) tuples of the regressed
+    cases; cases missing from the baseline are skipped.
+"""
+def find_regressions(results, baseline, threshold, noise_s):
+    previous = {_case_key(result): result
+                for result in baseline["results"]}
+    regressions = []
+
+    for result in results:
+        before = previous.get(_case_key(result))
+        if before is None:
+            continue
+
+        slowdown = result["best_s"] - before["best_s"]
+        ratio = result["best_s"] / max(before["best_s"], 1e-9)
+
+        if ratio > 1 + threshold and slowdown > noise_s:
+            regressions.append((result, before, ratio))
+
+    return regressions
+
+
+"""
+Parses the command line arguments.
+
+Args:
+    argv: Arguments excluding the program name.
+
+Returns:
+    argparse Namespace.
+"""
+def parse_args(argv):
+    parser = ArgumentParser(
+        prog="python -m benchmarks.apply_benchmark",
+        description="Times every apply method across image sizes, font"
+                    " sizes, rotations and reverse settings")
+    parser.add_argument("--methods", nargs="+", default=list(METHODS),
+                        choices=list(METHODS))
+    parser.add_argument("--megapixels", type=float, nargs="+",
+                        default=[1, 10, 100])
+    parser.add_argument("--font-sizes", type=int, nargs="+",
+                        default=[12, 48])
+    parser.add_argument("--rotations", type=int, nargs="+",
+                        default=[0, 45])
+    parser.add_argument("--reverses", type=_boolean, nargs="+",
+                        default=[False, True])
+    parser.add_argument("--font", default="Arial_Bold.ttf")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--cold", action="store_true",
+                        help="clear the stamp and glyph atlas caches"
+                             " before every run")
+    parser.add_argument("-o", "--output",
+                        help="file to write the JSON report to; defaults"
+                             " to standard output")
+    parser.add_argument("--baseline",
+                        help="JSON report to check this run against")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="allowed slowdown against the baseline as a"
+                             " fraction")
+    parser.add_argument("--noise", type=float, default=0.001,
+                        help="slowdowns under this many seconds are"
+                             " ignored")
+    args = parser.parse_args(argv)
+
+    if args.repeats < 1:
+        parser.error("--repeats must be 1 or greater")
+
+    return args
+
+
+"""
+Runs the benchmark suite.
+
+Args:
+    argv: Arguments excluding the program name. Defaults to sys.argv.
+
+Returns:
+    Exit status; 1 if any case regressed against the baseline.
+"""
+def main(argv=None):
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+
+    cases = benchmark_cases(args.methods, args.megapixels, args.font_sizes,
+                            args.rotations, args.reverses)
+    results = run_benchmarks(cases, args.font, args.repeats, args.cold,
+                             _print_progress)
+    text = json.dumps(report(results, args.repeats, args.cold), indent=2)
+
+    if args.output is None:
+        print(text)
+    else:
+        with open(args.output, "w") as output:
+            output.write(text + "\n")
+
+    if args.baseline is None:
+        return 0
+
+    with open(args.baseline) as baseline_file:
+        baseline = json.load(baseline_file)
+
+    regressions = find_regressions(results, baseline, args.threshold,
+                                   args.noise)
+    for result, before, ratio in regressions:
+        print("REGRESSED {}: {:.4f}s -> {:.4f}s ({:.2f}x)".format(
+            _describe(result), before["best_s"], result["best_s"], ratio),
+            file=sys.stderr)
+
+    return 1 if regressions else 0
+
+
+'''
+Gets the key identifying the case of a result.
+
+Args:
+    result: Result dictionary.
+
+Returns:
+    Tuple of the CASE_FIELDS values.
+'''
+def _case_key(result):
+    return tuple(result[field] for field in CASE_FIELDS)
+
+
+'''
+Describes the case of a result for people.
+
+Args:
+    result: Result dictionary.
+
+Returns:
+    Description.
+'''
+def _describe(result):
+    description = "{method} {megapixels:g}MP {font_size}pt {rotation}deg"\
+        .format(**result)
+    if result["reverse"]:
+        description += " reversed"
+    return description
+
+
+'''
+Prints a result to standard error as it is produced.
+
+Args:
+    result: Result dictionary.
+'''
+def _print_progress(result):
+    print("{:<40} {:>10.4f}s {:>10.1f} MP/s".format(
+        _describe(result), result["best_s"], result["megapixels_per_s"]),
+        file=sys.stderr)
+
+
+'''
+Parses a true or false command line value.
+
+Args:
+    value: 'true' or 'false' in any case.
+
+Returns:
+    The boolean.
+
+Raises:
+    ValueError: If the value is neither.
+'''
+def _boolean(value):
+    if value.lower() in ("true", "1", "yes"):
+        return True
+    if value.lower() in ("false", "0", "no"):
+        return False
+    raise ValueError(value)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
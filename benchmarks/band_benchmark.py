@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+
+"""
+This code is copyrighted work by Paul Williams.
+Distributed under the BSD-3-Clause license available:
+    https://opensource.org/licenses/BSD-3-Clause
+"""
+
+
+import os
+from argparse import ArgumentParser
+from timeit import default_timer
+
+import numpy
+from PIL import Image
+
+from project.band_compositor import BandCompositor
+from project.textual_water_marker import TextualWaterMarker
+
+
+"""
+Records a dense plan on an image: a rotated lattice of small stamps and
+a scatter of larger ones.
+
+Args:
+    img: Pillow Image the plan is recorded for; left untouched.
+    font: Font file name.
+
+Returns:
+    The WatermarkPlan.
+"""
+def dense_plan(img, font):
+    water_marker = TextualWaterMarker(img).font(font).defer(True)
+    water_marker.colour((255, 255, 255)).size(12).rotation(30)
+    water_marker.apply_lattice("LATTICE", 24, 24)
+    water_marker.size(48).rotation(0).apply_random("SCATTER", 40, 1)
+    return water_marker.plan()
+
+
+"""
+Times applying a plan with a compositor, returning the best of several
+runs and the watermarked image of the last one.
+
+Args:
+    compositor: BandCompositor to apply the plan with.
+    img: Pillow Image to watermark; copied for every run.
+    plan: WatermarkPlan of the image's size.
+    repeats: Number of runs.
+
+Returns:
+    (fastest run in seconds, watermarked image) tuple.
+"""
+def time_apply(compositor, img, plan, repeats):
+    best = None
+    target = None
+    for _ in range(repeats):
+        target = img.copy()
+        started = default_timer()
+        compositor.apply(target, plan)
+        elapsed = default_timer() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, target
+
+
+"""
+Benchmarks applying a dense plan from 1 to N threads, printing the
+speedup over one thread and checking every output matches it.
+"""
+if __name__ == "__main__":
+
+    parser = ArgumentParser(description="Band compositing benchmark")
+    parser.add_argument("--width", type=int, default=6000)
+    parser.add_argument("--height", type=int, default=4000)
+    parser.add_argument("--font", default="Arial_Bold.ttf")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--max-threads", type=int,
+                        default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    image = Image.new('RGB', (args.width, args.height), (90, 120, 150))
+    plan = dense_plan(image, args.font)
+    plan.compile()
+
+    print("{} CPUs".format(os.cpu_count()))
+    print("{:>8} {:>10} {:>8} {:>10}".format(
+        "threads", "seconds", "speedup", "identical"))
+
+    baseline = None
+    reference = None
+    for threads in range(1, args.max_threads + 1):
+        compositor = BandCompositor(threads)
+        seconds, result = time_apply(compositor, image, plan, args.repeats)
+        compositor.shutdown()
+
+        if baseline is None:
+            baseline, reference = seconds, numpy.asarray(result)
+
+        print("{:>8} {:>10.4f} {:>7.2f}x {:>10}".format(
+            threads, seconds, baseline / seconds,
+            str(numpy.array_equal(reference, numpy.asarray(result)))))
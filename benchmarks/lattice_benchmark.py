@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+
+"""
+This code is copyrighted work by Paul Williams.
+Distributed under the BSD-3-Clause license available:
+    https://opensource.org/licenses/BSD-3-Clause
+"""
+
+
+from argparse import ArgumentParser
+from timeit import default_timer
+
+from PIL import Image
+
+from project.lattice import paste_lattice
+from project.textual_water_marker import TextualWaterMarker
+
+
+"""
+Pastes a lattice one cell at a time; the approach replaced by the
+lattice engine and kept here as the benchmark reference.
+
+Args:
+    img: Pillow Image to paste onto.
+    stamp: RGBA stamp image to tile.
+    start: (x, y) position of the first cell.
+    margins: (horizontal, vertical) space between cells.
+"""
+def paste_lattice_per_cell(img, stamp, start, margins):
+    img_width, img_height = img.size
+    stamp_width, stamp_height = stamp.size
+
+    y = start[1]
+    while y < img_height:
+
+        x = start[0]
+        while x < img_width:
+            img.paste(stamp, (x, y), stamp)
+            x += stamp_width + margins[0]
+
+        y += stamp_height + margins[1]
+
+
+"""
+Times a lattice paste function, returning the best of several runs.
+
+Args:
+    paste: Lattice paste function to time.
+    img: Pillow Image to paste onto; copied for every run.
+    stamp: RGBA stamp image to tile.
+    margin: Space between cells both horizontally and vertically.
+    repeats: Number of runs.
+
+Returns:
+    Fastest run in seconds.
+"""
+def time_paste(paste, img, stamp, margin, repeats):
+    best = None
+    for _ in range(repeats):
+        target = img.copy()
+        started = default_timer()
+        paste(target, stamp, (margin, margin), (margin, margin))
+        elapsed = default_timer() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+"""
+Counts the cells of a lattice.
+
+Args:
+    img_size: (width, height) of the image.
+    stamp_size: (width, height) of the stamp.
+    margin: Space between cells both horizontally and vertically.
+
+Returns:
+    Number of cells.
+"""
+def cell_count(img_size, stamp_size, margin):
+    columns = -(-(img_size[0] - margin) // (stamp_size[0] + margin))
+    rows = -(-(img_size[1] - margin) // (stamp_size[1] + margin))
+    return max(columns, 0) * max(rows, 0)
+
+
+"""
+Benchmarks the per cell loop against the lattice engine for a range of
+cell counts and prints the speedup.
+"""
+if __name__ == "__main__":
+
+    parser = ArgumentParser(description="Lattice engine benchmark")
+    parser.add_argument("--width", type=int, default=4000)
+    parser.add_argument("--height", type=int, default=3000)
+    parser.add_argument("--font", default="Arial_Bold.ttf")
+    parser.add_argument("--size", type=int, default=12)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--margins", type=int, nargs="+",
+                        default=[256, 128, 64, 32, 16, 8, 4])
+    args = parser.parse_args()
+
+    image = Image.new('RGB', (args.width, args.height), (90, 120, 150))
+    water_marker = TextualWaterMarker(image).font(args.font).size(args.size)
+    text_img = water_marker._prepare_text_img("LATTICE")
+
+    print("{:>8} {:>8} {:>12} {:>12} {:>8}".format(
+        "margin", "cells", "per-cell s", "engine s", "speedup"))
+
+    for margin in args.margins:
+        cells = cell_count(image.size, text_img.size, margin)
+        per_cell = time_paste(paste_lattice_per_cell, image, text_img,
+                              margin, args.repeats)
+        engine = time_paste(paste_lattice, image, text_img,
+                            margin, args.repeats)
+
+        print("{:>8} {:>8} {:>12.4f} {:>12.4f} {:>7.1f}x".format(
+            margin, cells, per_cell, engine, per_cell / engine))
@@ -0,0 +1,421 @@
+"""
+This code is copyrighted work by Paul Williams.
+Distributed under the BSD-3-Clause license available:
+    https://opensource.org/licenses/BSD-3-Clause
+"""
+
+
+import asyncio
+import copy
+import os
+from concurrent.futures import ThreadPoolExecutor
+from weakref import WeakKeyDictionary
+
+from project.errors import WaterMarkerTypeError
+from project.errors import WaterMarkerValueError
+from project.textual_water_marker import TextualWaterMarker
+
+
+class WatermarkExecutor(object):
+    """
+    Bounded thread pool running Pillow work for coroutines. Pillow
+    releases the GIL while it rasterizes, rotates and pastes so the
+    threads run in parallel. At most max_workers calls per event loop
+    are submitted at once; the rest wait in the event loop, where
+    cancelling them is free.
+    """
+
+    """
+    Initialiser.
+
+    Args:
+        max_workers: Maximum number of threads and of calls in flight.
+        Defaults to the CPU count.
+
+    Raises:
+        WaterMarkerTypeError: If max_workers is not an integer.
+        WaterMarkerValueError: If max_workers is less than 1.
+    """
+    def __init__(self, max_workers=None):
+        if max_workers is None:
+            max_workers = os.cpu_count() or 1
+
+        if not isinstance(max_workers, int):
+            raise WaterMarkerTypeError(
+                "The maximum number of workers must be an integer")
+
+        if max_workers < 1:
+            raise WaterMarkerValueError(
+                "The maximum number of workers must be 1 or greater")
+
+        self._max_workers = max_workers
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="watermark")
+        self._semaphores = WeakKeyDictionary()
+
+    """
+    Gets the maximum number of calls in flight.
+
+    Returns:
+        Maximum number of workers.
+    """
+    def max_workers(self):
+        return self._max_workers
+
+    """
+    Runs a function on the pool without blocking the event loop.
+
+    If the awaiting task is cancelled before the function starts, the
+    function never runs. Once it has started it cannot be interrupted,
+    so cancellation waits for it to finish before CancelledError is
+    raised; the caller never races a thread still writing to its image.
+
+    Args:
+        function: Function to run.
+        args: Positional arguments of the function.
+
+    Returns:
+        The result of the function.
+    """
+    async def run(self, function, *args):
+        async with self._semaphore():
+            future = self._executor.submit(function, *args)
+            waiter = asyncio.wrap_future(future)
+
+            try:
+                return await asyncio.shield(waiter)
+            except asyncio.CancelledError:
+                if not future.cancel():
+                    await _finish(waiter)
+                raise
+
+    """
+    Stops the threads once every submitted call has finished.
+
+    Args:
+        wait: True to block until the calls have finished.
+    """
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+
+    '''
+    Gets the semaphore limiting the calls in flight from the running
+    event loop. Each loop gets its own since asyncio primitives are
+    bound to one loop.
+
+    Returns:
+        asyncio Semaphore.
+    '''
+    def _semaphore(self):
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self._max_workers)
+            self._semaphores[loop] = semaphore
+        return semaphore
+
+
+class AsyncTextualWaterMarker(object):
+    """
+    Asynchronous front end of a TextualWaterMarker for use within an
+    event loop. The style setters are cheap and stay synchronous; the
+    apply methods, warm, collect and defer return awaitables whose
+    Pillow work runs on a WatermarkExecutor.
+
+    The style and deferral state are captured when an apply method is
+    called, so several applies can be created up front and gathered.
+    Operations on one image run one at a time in call order while
+    different images are watermarked in parallel. Fonts and stamps come
+    from the process-wide caches shared by every thread.
+    """
+
+    """
+    Initialiser.
+
+    Args:
+        img: Pillow Image, or a TextualWaterMarker, to watermark.
+        executor: WatermarkExecutor to run the Pillow work on. Defaults
+        to the process-wide watermark_executor.
+
+    Raises:
+        WaterMarkerTypeError: If the image parameter has not been
+        provided or is not of the correct type.
+    """
+    def __init__(self, img, executor=None):
+        if isinstance(img, TextualWaterMarker):
+            self._water_marker = img
+        else:
+            self._water_marker = TextualWaterMarker(img)
+
+        self._executor = executor or watermark_executor
+        self._lock = asyncio.Lock()
+
+    """
+    Gets the wrapped water marker, e.g. to apply a spec to it.
+
+    Returns:
+        The TextualWaterMarker.
+    """
+    def water_marker(self):
+        return self._water_marker
+
+    """
+    Gets the plan of the deferred operations.
+
+    Returns:
+        The WatermarkPlan or None if operations are not being deferred.
+    """
+    def plan(self):
+        return self._water_marker.plan()
+
+    """
+    See TextualWaterMarker.font.
+
+    Returns:
+        Self; instance that received the invocation.
+    """
+    def font(self, font_file):
+        self._water_marker.font(font_file)
+        return self
+
+    """
+    See TextualWaterMarker.size.
+
+    Returns:
+        Self; instance that received the invocation.
+    """
+    def size(self, size_pt):
+        self._water_marker.size(size_pt)
+        return self
+
+    """
+    See TextualWaterMarker.colour.
+
+    Returns:
+        Self; instance that received the invocation.
+    """
+    def colour(self, rgb_colour):
+        self._water_marker.colour(rgb_colour)
+        return self
+
+    """
+    See TextualWaterMarker.rotation.
+
+    Returns:
+        Self; instance that received the invocation.
+    """
+    def rotation(self, degrees):
+        self._water_marker.rotation(degrees)
+        return self
+
+    """
+    See TextualWaterMarker.reverse.
+
+    Returns:
+        Self; instance that received the invocation.
+    """
+    def reverse(self, reverse):
+        self._water_marker.reverse(reverse)
+        return self
+
+    """
+    See TextualWaterMarker.margin.
+
+    Returns:
+        Self; instance that received the invocation.
+    """
+    def margin(self, margin):
+        self._water_marker.margin(margin)
+        return self
+
+    """
+    Sets whether apply operations are deferred; see
+    TextualWaterMarker.defer. Turning deferral off composites the
+    deferred operations so it runs on the executor.
+
+    Returns:
+        Awaitable of self.
+    """
+    def defer(self, defer):
+        return self._run(self._defer, defer)
+
+    """
+    Gets the image with any applied watermarks; see
+    TextualWaterMarker.collect.
+
+    Returns:
+        Awaitable of the image.
+    """
+    def collect(self):
+        return self._run(self._water_marker.collect)
+
+    """
+    Renders and caches the stamp of a text in the current style; see
+    TextualWaterMarker.warm.
+
+    Returns:
+        Awaitable of self.
+    """
+    def warm(self, text):
+        return self._run(self._warm, self._snapshot(), text)
+
+    """
+    See TextualWaterMarker.apply_centre.
+
+    Returns:
+        Awaitable of the watermarked image.
+    """
+    def apply_centre(self, text):
+        return self._run(self._snapshot().apply_centre, text)
+
+    """
+    See TextualWaterMarker.apply_corner.
+
+    Returns:
+        Awaitable of the watermarked image.
+    """
+    def apply_corner(self, text, corner):
+        return self._run(self._snapshot().apply_corner, text, corner)
+
+    """
+    See TextualWaterMarker.apply_edge.
+
+    Returns:
+        Awaitable of the watermarked image.
+    """
+    def apply_edge(self, text, edge):
+        return self._run(self._snapshot().apply_edge, text, edge)
+
+    """
+    See TextualWaterMarker.apply_absolute.
+
+    Returns:
+        Awaitable of the watermarked image.
+    """
+    def apply_absolute(self, text, x_pos_px, y_pos_px):
+        return self._run(self._snapshot().apply_absolute, text, x_pos_px,
+                         y_pos_px)
+
+    """
+    See TextualWaterMarker.apply_percent.
+
+    Returns:
+        Awaitable of the watermarked image.
+    """
+    def apply_percent(self, text, x_from_left, y_from_top):
+        return self._run(self._snapshot().apply_percent, text, x_from_left,
+                         y_from_top)
+
+    """
+    See TextualWaterMarker.apply_random.
+
+    Returns:
+        Awaitable of the watermarked image.
+    """
+    def apply_random(self, text, quantity=1, seed=None):
+        return self._run(self._snapshot().apply_random, text, quantity,
+                         seed)
+
+    """
+    See TextualWaterMarker.apply_lattice.
+
+    Returns:
+        Awaitable of the watermarked image.
+    """
+    def apply_lattice(self, text,
+                      horizontal_margin,
+                      vertical_margin,
+                      horizontal_start_margin=None,
+                      vertical_start_margin=None):
+
+        return self._run(self._snapshot().apply_lattice, text,
+                         horizontal_margin,
+                         vertical_margin,
+                         horizontal_start_margin,
+                         vertical_start_margin)
+
+    """
+    See TextualWaterMarker.apply_rotated_lattice.
+
+    Returns:
+        Awaitable of the watermarked image.
+    """
+    def apply_rotated_lattice(self, text, horizontal_margin,
+                              vertical_margin):
+        return self._run(self._snapshot().apply_rotated_lattice, text,
+                         horizontal_margin, vertical_margin)
+
+    '''
+    Runs a function on the executor once the operations on this image
+    called before it have finished.
+
+    Args:
+        function: Function to run.
+        args: Positional arguments of the function.
+
+    Returns:
+        The result of the function.
+    '''
+    async def _run(self, function, *args):
+        async with self._lock:
+            return await self._executor.run(function, *args)
+
+    '''
+    Copies the water marker so the style and plan in use now are the
+    ones applied, whatever is set before the work runs. The copy shares
+    the image and plan.
+
+    Returns:
+        The copied TextualWaterMarker.
+    '''
+    def _snapshot(self):
+        return copy.copy(self._water_marker)
+
+    '''
+    Sets the deferral state of the wrapped water marker.
+
+    Args:
+        defer: True if apply operations should be deferred.
+
+    Returns:
+        Self.
+    '''
+    def _defer(self, defer):
+        self._water_marker.defer(defer)
+        return self
+
+    '''
+    Warms the stamp of a text in the style of a snapshot.
+
+    Args:
+        snapshot: Snapshot of the water marker.
+        text: Text of the watermark.
+
+    Returns:
+        Self.
+    '''
+    def _warm(self, snapshot, text):
+        snapshot.warm(text)
+        return self
+
+
+'''
+Waits for a future to finish, ignoring further cancellation of the
+waiting task. An exception raised by the future's call is not hidden.
+
+Args:
+    waiter: asyncio Future to wait for.
+'''
+async def _finish(waiter):
+    while not waiter.done():
+        try:
+            await asyncio.shield(waiter)
+        except asyncio.CancelledError:
+            pass
+
+
+"""
+Executor shared by every AsyncTextualWaterMarker in the process that is
+not given its own.
+"""
+watermark_executor = WatermarkExecutor()
@@ -0,0 +1,159 @@
+"""
+This code is copyrighted work by Paul Williams.
+Distributed under the BSD-3-Clause license available:
+    https://opensource.org/licenses/BSD-3-Clause
+"""
+
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image
+
+from project.errors import WaterMarkerTypeError
+from project.errors import WaterMarkerValueError
+
+
+class BandCompositor(object):
+    """
+    Applies watermark plans to large images on several threads. The
+    image is split into horizontal bands and each band is copied out,
+    watermarked and pasted back by a thread of its own; Pillow releases
+    the GIL while it blends, so bands are composited in parallel. Every
+    band receives the stamps crossing it in plan order, so the result is
+    identical to applying the plan on one thread, whatever the thread
+    count or scheduling.
+    """
+
+    """
+    Initialiser.
+
+    Args:
+        threads: Number of threads. Defaults to the number of CPUs.
+        min_band_height: Fewest rows in a band; images too short to give
+        every thread a band this tall use fewer threads. Defaults to 64.
+
+    Raises:
+        WaterMarkerTypeError: If the thread count or minimum band height
+        is not an integer.
+        WaterMarkerValueError: If the thread count or minimum band height
+        is less than 1.
+    """
+    def __init__(self, threads=None, min_band_height=64):
+        if threads is None:
+            threads = os.cpu_count() or 1
+
+        if not isinstance(threads, int):
+            raise WaterMarkerTypeError(
+                "The thread count must be an integer")
+
+        if threads < 1:
+            raise WaterMarkerValueError(
+                "The thread count must be 1 or greater")
+
+        if not isinstance(min_band_height, int):
+            raise WaterMarkerTypeError(
+                "The minimum band height must be an integer")
+
+        if min_band_height < 1:
+            raise WaterMarkerValueError(
+                "The minimum band height must be 1 or greater")
+
+        self._threads = threads
+        self._min_band_height = min_band_height
+        self._executor = None
+        if threads > 1:
+            self._executor = ThreadPoolExecutor(
+                max_workers=threads, thread_name_prefix="band")
+
+    """
+    Gets the number of threads.
+
+    Returns:
+        Thread count.
+    """
+    def threads(self):
+        return self._threads
+
+    """
+    Splits an image into the bands its plan is applied to.
+
+    Args:
+        img_size: (width, height) of the image.
+
+    Returns:
+        List of (left, top, right, bottom) boxes from top to bottom.
+    """
+    def bands(self, img_size):
+        width, height = img_size
+        count = max(1, min(self._threads, height // self._min_band_height))
+
+        edges = [height * band // count for band in range(count + 1)]
+        return [(0, edges[band], width, edges[band + 1])
+                for band in range(count)]
+
+    """
+    Applies a plan to an image in place, one band per thread.
+
+    Args:
+        img: Pillow Image to watermark.
+        plan: WatermarkPlan of the image's size.
+
+    Returns:
+        The watermarked image.
+
+    Raises:
+        WaterMarkerTypeError: If the image is none or not a Pillow Image.
+        WaterMarkerValueError: If the image size differs from the plan.
+    """
+    def apply(self, img, plan):
+        if img is None:
+            raise WaterMarkerTypeError(
+                "An image must be provided")
+
+        if not isinstance(img, Image.Image):
+            raise WaterMarkerTypeError(
+                "The image parameter must be a Pillow Image")
+
+        if img.size != plan.img_size():
+            raise WaterMarkerValueError(
+                "The image size must match the size of the plan")
+
+        bands = self.bands(img.size)
+        if len(bands) == 1:
+            return plan.apply(img)
+
+        img.load()
+        if plan.uses_overlay(img):
+            plan.compile()
+
+        futures = [self._executor.submit(_apply_band, img, plan, band)
+                   for band in bands]
+
+        for future, band in zip(futures, bands):
+            img.paste(future.result(), band[:2])
+
+        return img
+
+    """
+    Stops the threads once the bands being applied are done.
+    """
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+
+
+'''
+Watermarks one band of an image.
+
+Args:
+    img: Pillow Image being watermarked.
+    plan: WatermarkPlan of the image's size.
+    band: (left, top, right, bottom) box of the band.
+
+Returns:
+    Watermarked copy of the band.
+'''
+def _apply_band(img, plan, band):
+    region = img.crop(band)
+    return plan.apply_region(region, band[:2])
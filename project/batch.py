@@ -0,0 +1,119 @@
+"""
+This code is copyrighted work by Paul Williams.
+Distributed under the BSD-3-Clause license available:
+    https://opensource.org/licenses/BSD-3-Clause
+"""
+
+
+from itertools import islice
+
+from PIL import Image
+
+from project.errors import WaterMarkerTypeError
+from project.errors import WaterMarkerValueError
+from project.spec import OPERATIONS
+from project.spec import STYLE_SETTERS
+from project.spec import apply_style
+from project.stamp_cache import StampCache
+from project.style import WatermarkStyle
+from project.textual_water_marker import TextualWaterMarker
+
+
+"""
+Watermarks a stream of images, each with its own text, in one shared
+style and placement. The style is validated once up front rather than
+per image. Jobs are read a chunk at a time, the stamps of the distinct
+texts in a chunk are rendered together before any image of the chunk is
+watermarked, and the images are then yielded in job order. An invalid
+text raises when its job is reached. The stamps of a chunk are kept in
+a cache of their own rather than the one shared by the process, as
+per-image texts are rarely used again. Memory stays bounded by the
+chunk however long the batch is.
+
+Args:
+    jobs: Iterable of (Pillow Image, text) tuples; it is only read as
+    results are consumed.
+    style: WatermarkStyle, or dictionary of style keys as in a spec
+    (font, size, colour, rotation, reverse and margin).
+    apply: Apply name as in a spec, e.g. 'corner'.
+    args: Tuple of the apply method's arguments after the text, e.g.
+    (Corner.bottom_right(),). Defaults to none.
+    chunk_size: Number of jobs read ahead and rendered together.
+    Defaults to 32.
+
+Returns:
+    Generator of the watermarked images in job order.
+
+Raises:
+    WaterMarkerTypeError: If the style is not a WatermarkStyle or a
+    dictionary, a style value is not of the correct type, the arguments
+    are not a tuple or the chunk size is not an integer.
+    WaterMarkerValueError: If the style has unknown keys, a style value
+    is not valid, the apply name is unknown or the chunk size is less
+    than 1.
+"""
+def watermark_batch(jobs, style, apply, args=(), chunk_size=32):
+    if not isinstance(style, (WatermarkStyle, dict)):
+        raise WaterMarkerTypeError(
+            "The batch style must be a WatermarkStyle or a dictionary")
+
+    if isinstance(style, dict):
+        for key in style:
+            if key not in STYLE_SETTERS:
+                raise WaterMarkerValueError(
+                    "Unknown style key '{}'".format(key))
+
+    if apply not in OPERATIONS:
+        raise WaterMarkerValueError(
+            "Unknown apply name '{}'".format(apply))
+
+    if not isinstance(args, tuple):
+        raise WaterMarkerTypeError("The apply arguments must be a tuple")
+
+    if not isinstance(chunk_size, int):
+        raise WaterMarkerTypeError("The chunk size must be an integer")
+
+    if chunk_size < 1:
+        raise WaterMarkerValueError("The chunk size must be 1 or greater")
+
+    placeholder = Image.new('RGBA', (1, 1))
+    if isinstance(style, WatermarkStyle):
+        template = TextualWaterMarker(placeholder, style)
+    else:
+        template = TextualWaterMarker(placeholder)
+        apply_style(template, style)
+
+    return _watermarked(iter(jobs), template, OPERATIONS[apply][0], args,
+                        chunk_size)
+
+
+'''
+Generates the watermarked images of a batch.
+
+Args:
+    jobs: Iterator of (Pillow Image, text) tuples.
+    template: TextualWaterMarker holding the batch style.
+    method: Name of the apply method.
+    args: Tuple of the apply method's arguments after the text.
+    chunk_size: Number of jobs read ahead and rendered together.
+
+Returns:
+    Generator of the watermarked images.
+'''
+def _watermarked(jobs, template, method, args, chunk_size):
+    while True:
+        chunk = list(islice(jobs, chunk_size))
+        if len(chunk) == 0:
+            return
+
+        template.use_stamp_cache(StampCache())
+        warmed = set()
+        for _, text in chunk:
+            if isinstance(text, str) and text.strip() != "" \
+                    and text not in warmed:
+                template.warm(text)
+                warmed.add(text)
+
+        for img, text in chunk:
+            water_marker = template.for_image(img)
+            yield getattr(water_marker, method)(text, *args)
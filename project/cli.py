@@ -0,0 +1,499 @@
+#!/usr/bin/env python
+
+"""
+This code is copyrighted work by Paul Williams.
+Distributed under the BSD-3-Clause license available:
+    https://opensource.org/licenses/BSD-3-Clause
+"""
+
+
+import os
+import secrets
+import sys
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor
+from glob import glob
+from timeit import default_timer
+
+from PIL import Image
+
+from project.compositing import has_alpha
+from project.errors import WaterMarkerTypeError
+from project.errors import WaterMarkerValueError
+from project.output_cache import OutputCache
+from project.spec import apply_spec
+from project.spec import check_spec
+from project.spec import load_spec
+from project.spec import warm_spec
+from project.stamp_cache import stamp_cache
+from project.stamp_store import StampStore
+from project.textual_water_marker import TextualWaterMarker
+
+
+"""
+File extensions treated as images when a directory is given.
+"""
+IMAGE_EXTENSIONS = (".bmp", ".gif", ".jpeg", ".jpg", ".png", ".ppm",
+                    ".tif", ".tiff", ".webp")
+
+
+class ThroughputReport(object):
+    """
+    Totals of a batch run used to report its throughput.
+    """
+
+    def __init__(self):
+        self.images = 0
+        self.failures = []
+        self.input_bytes = 0
+        self.output_bytes = 0
+        self.seconds = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.bytes_saved = 0
+
+    """
+    Adds the result of one image.
+
+    Args:
+        result: (path, input bytes, output bytes, error) tuple where the
+        error is None on success, optionally followed by True if the
+        output came from an OutputCache or False if it missed.
+    """
+    def add(self, result):
+        path, input_bytes, output_bytes, error = result[:4]
+
+        if error is not None:
+            self.failures.append((path, error))
+            return
+
+        cached = result[4] if len(result) > 4 else None
+        if cached:
+            self.cache_hits += 1
+            self.bytes_saved += output_bytes
+        elif cached is not None:
+            self.cache_misses += 1
+
+        self.images += 1
+        self.input_bytes += input_bytes
+        self.output_bytes += output_bytes
+
+    """
+    Gets the number of images watermarked per second.
+
+    Returns:
+        Images per second.
+    """
+    def images_per_second(self):
+        if self.seconds <= 0:
+            return 0.0
+        return self.images / self.seconds
+
+    """
+    Gets the megabytes of input read per second.
+
+    Returns:
+        Megabytes (10^6 bytes) per second.
+    """
+    def megabytes_per_second(self):
+        if self.seconds <= 0:
+            return 0.0
+        return self.input_bytes / 1e6 / self.seconds
+
+    """
+    Gets the fraction of images whose output came from an OutputCache.
+
+    Returns:
+        Hit rate from 0 to 1; 0 if no cache was used.
+    """
+    def cache_hit_rate(self):
+        lookups = self.cache_hits + self.cache_misses
+        if lookups == 0:
+            return 0.0
+        return self.cache_hits / lookups
+
+    def __str__(self):
+        lines = ["{} images in {:.2f}s: {:.1f} images/sec, {:.2f} MB/sec"
+                 .format(self.images,
+                         self.seconds,
+                         self.images_per_second(),
+                         self.megabytes_per_second())]
+
+        if self.cache_hits + self.cache_misses > 0:
+            lines.append("{} cached ({:.1f}% hit rate), {:.2f} MB not"
+                         " re-encoded"
+                         .format(self.cache_hits,
+                                 100 * self.cache_hit_rate(),
+                                 self.bytes_saved / 1e6))
+
+        for path, error in self.failures:
+            lines.append("FAILED {}: {}".format(path, error))
+
+        return "\n".join(lines)
+
+
+"""
+Finds the image files named by directories, glob patterns or paths.
+Directories are not searched recursively; use a '**' glob for that.
+
+Args:
+    inputs: Iterable of directories, glob patterns or file paths.
+
+Returns:
+    List of image file paths without duplicates, in input order.
+"""
+def find_images(inputs):
+    paths = []
+    seen = set()
+
+    for source in inputs:
+        if os.path.isdir(source):
+            found = [os.path.join(source, name)
+                     for name in sorted(os.listdir(source))
+                     if name.lower().endswith(IMAGE_EXTENSIONS)]
+        elif os.path.isfile(source):
+            found = [source]
+        else:
+            found = sorted(glob(source, recursive=True))
+
+        for path in found:
+            if os.path.isfile(path) and path not in seen:
+                seen.add(path)
+                paths.append(path)
+
+    return paths
+
+
+"""
+Gets the paths images are written to in an output directory. Each
+output keeps its input's path relative to the deepest directory holding
+every input, so images of the same name from different directories do
+not overwrite each other; inputs from one directory keep their names.
+
+Args:
+    paths: Image file paths.
+    output_dir: Directory the watermarked images are written to.
+
+Returns:
+    List of output paths in input order.
+
+Raises:
+    WaterMarkerValueError: If two inputs would be written to the same
+    output, e.g. the same file given by two different paths.
+"""
+def output_paths(paths, output_dir):
+    if len(paths) == 0:
+        return []
+
+    absolute = [os.path.abspath(path) for path in paths]
+    root = os.path.commonpath([os.path.dirname(path) for path in absolute])
+
+    outputs = []
+    seen = set()
+    for path in absolute:
+        output_path = os.path.join(output_dir, os.path.relpath(path, root))
+        if output_path in seen:
+            raise WaterMarkerValueError(
+                "More than one input would be written to '{}'"
+                .format(output_path))
+        seen.add(output_path)
+        outputs.append(output_path)
+
+    return outputs
+
+
+"""
+Watermarks the images in a process pool. The spec is checked with
+check_spec before the pool starts, so an invalid style value or
+operation argument raises here rather than failing every image.
+
+Args:
+    paths: Image file paths.
+    spec: Valid spec dictionary.
+    output_dir: Directory the watermarked images are written to, at
+    their paths as given by output_paths.
+    workers: Number of worker processes.
+    chunksize: Number of images sent to a worker per task.
+    save_options: Keyword arguments for Image.save, e.g. quality.
+    stamp_store: Directory of a StampStore the workers share rendered
+    stamps through. Defaults to none.
+    output_cache: Directory of an OutputCache the workers reuse earlier
+    outputs through. Defaults to none.
+
+Returns:
+    ThroughputReport of the run.
+
+Raises:
+    WaterMarkerTypeError: If a style value or operation argument of the
+    spec is not of the correct type.
+    WaterMarkerValueError: If a style value or operation argument of the
+    spec is not valid, or two inputs would share an output.
+    OSError: If a font of the spec cannot be loaded.
+"""
+def watermark_files(paths, spec, output_dir, workers=None, chunksize=8,
+                    save_options=None, stamp_store=None, output_cache=None):
+    check_spec(spec)
+
+    tasks = [(path, output_path, save_options or {})
+             for path, output_path in zip(paths,
+                                          output_paths(paths, output_dir))]
+    os.makedirs(output_dir, exist_ok=True)
+
+    report = ThroughputReport()
+    started = default_timer()
+
+    with ProcessPoolExecutor(max_workers=workers,
+                             initializer=init_worker,
+                             initargs=(spec, stamp_store,
+                                       output_cache)) as executor:
+        for result in executor.map(watermark_file, tasks,
+                                   chunksize=chunksize):
+            report.add(result)
+
+    report.seconds = default_timer() - started
+    return report
+
+
+_worker_spec = None
+_worker_output_cache = None
+
+
+"""
+Initialises a worker process by loading the fonts and rendering the
+stamps of the spec so the first image pays no warm-up cost.
+
+Args:
+    spec: Valid spec dictionary.
+    stamp_store: Directory of a StampStore to load the stamps from
+    instead of rendering them. Defaults to none.
+    output_cache: Directory of an OutputCache to reuse earlier outputs
+    from. Defaults to none.
+"""
+def init_worker(spec, stamp_store=None, output_cache=None):
+    global _worker_spec, _worker_output_cache
+    _worker_spec = spec
+
+    if stamp_store is not None:
+        stamp_cache.use_store(StampStore(stamp_store))
+
+    if output_cache is not None:
+        _worker_output_cache = OutputCache(output_cache)
+
+    warm_spec(TextualWaterMarker(Image.new('RGB', (1, 1))), spec)
+
+
+"""
+Gets the spec of a worker process.
+
+Returns:
+    Spec dictionary given to init_worker, or None in a process that was
+    not initialised by it.
+"""
+def worker_spec():
+    return _worker_spec
+
+
+"""
+Watermarks one image file with the worker's spec.
+
+Args:
+    task: (input path, output path, save options) tuple.
+
+Returns:
+    Result tuple as returned by watermark_path.
+"""
+def watermark_file(task):
+    path, output_path, save_options = task
+    return watermark_path(path, output_path, _worker_spec, save_options,
+                          _worker_output_cache)
+
+
+"""
+Watermarks one image file with a spec.
+
+Args:
+    path: Path of the image.
+    output_path: Path to write the watermarked image to; it is written
+    under a temporary name and renamed into place.
+    spec: Valid spec dictionary.
+    save_options: Keyword arguments for Image.save.
+    output_cache: OutputCache to reuse the output from when the input
+    and spec are unchanged, and to store it in otherwise. Defaults to
+    none.
+
+Returns:
+    (input path, input bytes, output bytes, error, cached) tuple where
+    the error is None on success or a message on failure, and cached is
+    True on a cache hit, False on a miss and None without a cache.
+"""
+def watermark_path(path, output_path, spec, save_options,
+                   output_cache=None):
+    cached = None
+
+    try:
+        if os.path.abspath(path) == os.path.abspath(output_path):
+            raise WaterMarkerValueError(
+                "The output would overwrite the input")
+
+        directory = os.path.dirname(output_path)
+        if directory != "":
+            os.makedirs(directory, exist_ok=True)
+
+        if output_cache is not None:
+            key = output_cache.key(path, output_path, spec, save_options)
+            cached = output_cache.fetch(key, output_path)
+
+        if not cached:
+            with Image.open(path) as image:
+                image = open_for_watermarking(image)
+                water_marker = TextualWaterMarker(image)
+                apply_spec(water_marker.defer(not has_alpha(image)),
+                           spec).collect()
+
+                _save_replacing(image, output_path, save_options)
+                if output_cache is not None:
+                    output_cache.store(key, output_path)
+
+        return (path, os.path.getsize(path),
+                os.path.getsize(output_path), None, cached)
+    except Exception as error:
+        return path, 0, 0, str(error), cached
+
+
+'''
+Saves an image under a temporary name in the output's directory and
+renames it over the output. An existing output may be hard linked into
+an OutputCache, so it is replaced rather than overwritten in place,
+whether or not this run uses the cache.
+'''
+def _save_replacing(image, output_path, save_options):
+    directory, name = os.path.split(output_path)
+    temp_path = _create_temp(directory or ".", os.path.splitext(name)[1])
+
+    try:
+        image.save(temp_path, **save_options)
+        os.replace(temp_path, output_path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+'''
+Creates an empty file with a unique name in a directory. Unlike mkstemp,
+which makes files only their owner can read, the file gets the
+permissions the umask gives new files.
+
+Returns:
+    Path of the file.
+'''
+def _create_temp(directory, suffix):
+    while True:
+        temp_path = os.path.join(
+            directory, "tmp{}{}".format(secrets.token_hex(4), suffix))
+        try:
+            os.close(os.open(temp_path,
+                             os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666))
+            return temp_path
+        except FileExistsError:
+            pass
+
+
+"""
+Loads an image and converts it to a mode stamps can be pasted onto.
+
+Args:
+    image: Opened Pillow Image.
+
+Returns:
+    Loaded RGB or RGBA image.
+"""
+def open_for_watermarking(image):
+    if image.mode in ('RGB', 'RGBA'):
+        image.load()
+        return image
+
+    if 'A' in image.getbands() or 'transparency' in image.info:
+        return image.convert('RGBA')
+
+    return image.convert('RGB')
+
+
+"""
+Parses the command line arguments.
+
+Args:
+    argv: Arguments excluding the program name.
+
+Returns:
+    argparse Namespace.
+"""
+def parse_args(argv):
+    parser = ArgumentParser(
+        prog="python -m project.cli",
+        description="Watermarks batches of images across processes")
+    parser.add_argument("inputs", nargs="+",
+                        help="image files, directories or glob patterns")
+    parser.add_argument("-s", "--spec", required=True,
+                        help="watermark spec as a JSON file or inline JSON")
+    parser.add_argument("-o", "--output-dir", required=True,
+                        help="directory to write watermarked images to")
+    parser.add_argument("-w", "--workers", type=int, default=None,
+                        help="worker processes; defaults to the CPU count")
+    parser.add_argument("-c", "--chunksize", type=int, default=8,
+                        help="images sent to a worker per task")
+    parser.add_argument("-q", "--quality", type=int, default=None,
+                        help="encoder quality for JPEG and WebP output")
+    parser.add_argument("--stamp-store", default=None,
+                        help="directory to share rendered stamps through"
+                             " across runs")
+    parser.add_argument("--output-cache", default=None,
+                        help="directory to reuse outputs of unchanged"
+                             " inputs from across runs")
+    args = parser.parse_args(argv)
+
+    if args.workers is not None and args.workers < 1:
+        parser.error("--workers must be 1 or greater")
+
+    if args.chunksize < 1:
+        parser.error("--chunksize must be 1 or greater")
+
+    return args
+
+
+"""
+Runs the command line tool.
+
+Args:
+    argv: Arguments excluding the program name. Defaults to sys.argv.
+
+Returns:
+    Exit status; 1 if any image failed or 2 if the spec or inputs are
+    invalid.
+"""
+def main(argv=None):
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+    paths = find_images(args.inputs)
+
+    save_options = {}
+    if args.quality is not None:
+        save_options["quality"] = args.quality
+
+    try:
+        spec = load_spec(args.spec)
+        report = watermark_files(paths, spec, args.output_dir,
+                                 workers=args.workers,
+                                 chunksize=args.chunksize,
+                                 save_options=save_options,
+                                 stamp_store=args.stamp_store,
+                                 output_cache=args.output_cache)
+    except (WaterMarkerTypeError, WaterMarkerValueError, OSError) as error:
+        print("error: {}".format(error), file=sys.stderr)
+        return 2
+
+    print(report)
+
+    return 1 if report.failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
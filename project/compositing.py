@@ -0,0 +1,84 @@
+"""
+This code is copyrighted work by Paul Williams.
+Distributed under the BSD-3-Clause license available:
+    https://opensource.org/licenses/BSD-3-Clause
+"""
+
+
+import numpy
+
+
+"""
+Pastes an RGBA layer onto an image using its alpha as the mask. This is
+how stamps are applied to the user image.
+
+Args:
+    target: Pillow Image to paste onto.
+    layer: RGBA layer to paste.
+    position: (x, y) position of the layer's top left corner; may lie
+    outside the target.
+"""
+def paste_layer(target, layer, position):
+    target.paste(layer, position, layer)
+
+
+"""
+Composites an RGBA layer over an RGBA image. This is how stamps are
+gathered into an overlay; pasting the overlay afterwards gives the same
+result, up to rounding, as pasting every layer in turn.
+
+Args:
+    target: RGBA Pillow Image to composite onto.
+    layer: RGBA layer to composite.
+    position: (x, y) position of the layer's top left corner; may lie
+    outside the target.
+"""
+def composite_layer(target, layer, position):
+    x, y = position
+    left = max(0, -x)
+    top = max(0, -y)
+    right = min(layer.size[0], target.size[0] - x)
+    bottom = min(layer.size[1], target.size[1] - y)
+
+    if left >= right or top >= bottom:
+        return
+
+    target.alpha_composite(layer, (x + left, y + top),
+                           (left, top, right, bottom))
+
+
+"""
+Gets whether an image has an alpha band. Pasting a layer with a mask
+blends the image's alpha with the layer's alpha as if it were a colour,
+unlike alpha compositing, so layers accumulated into one overlay only
+match pasting them in turn onto images without alpha.
+
+Args:
+    img: Pillow Image.
+
+Returns:
+    True if the image has an alpha band.
+"""
+def has_alpha(img):
+    return 'A' in img.getbands()
+
+
+"""
+Gets the colour of a stamp inked in a single colour, as rendered text
+is.
+
+Args:
+    stamp: RGBA stamp image.
+
+Returns:
+    (red, green, blue) tuple or None if the stamp has no visible pixel
+    or its visible pixels differ in colour.
+"""
+def ink_colour(stamp):
+    pixels = numpy.asarray(stamp)
+    ink = pixels[pixels[:, :, 3] > 0, :3]
+
+    if len(ink) == 0 or not (ink == ink[0]).all():
+        return None
+
+    return tuple(int(channel) for channel in ink[0])
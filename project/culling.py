@@ -0,0 +1,116 @@
+"""
+This code is copyrighted work by Paul Williams.
+Distributed under the BSD-3-Clause license available:
+    https://opensource.org/licenses/BSD-3-Clause
+"""
+
+
+from collections import namedtuple
+from threading import Lock
+
+import numpy
+
+
+"""
+Counts of stamp copies by how they met the border of the image they
+were rendered onto: wholly inside, clipped by the border or culled for
+having no pixel inside.
+"""
+BorderStats = namedtuple("BorderStats", ["whole", "clipped", "culled"])
+
+
+class BorderCounter(object):
+    """
+    Thread-safe running totals of the copies rendered whole, clipped by
+    the border and culled, for monitoring how much of a lattice or
+    scatter lands off the image. Counts are per render target, so a
+    tiled render counts the copies of each strip.
+    """
+
+    def __init__(self):
+        self._whole = 0
+        self._clipped = 0
+        self._culled = 0
+        self._lock = Lock()
+
+    """
+    Adds to the totals.
+
+    Args:
+        whole: Number of copies wholly inside the target.
+        clipped: Number of copies crossing the target's border.
+        culled: Number of copies skipped as wholly outside the target.
+    """
+    def add(self, whole, clipped, culled):
+        with self._lock:
+            self._whole += whole
+            self._clipped += clipped
+            self._culled += culled
+
+    """
+    Gets a snapshot of the totals.
+
+    Returns:
+        BorderStats of the copies rendered whole, clipped and culled.
+    """
+    def stats(self):
+        with self._lock:
+            return BorderStats(self._whole, self._clipped, self._culled)
+
+    """
+    Resets the totals.
+    """
+    def clear(self):
+        with self._lock:
+            self._whole = 0
+            self._clipped = 0
+            self._culled = 0
+
+
+"""
+Classifies copies of a stamp against the border of a target.
+
+Args:
+    positions: Integer array of shape (N, 2) holding the (x, y) top left
+    position of each copy.
+    stamp_size: (width, height) of the stamp.
+    target_size: (width, height) of the target.
+
+Returns:
+    (visible, whole) tuple of boolean arrays of shape (N,); visible
+    copies have at least one pixel inside the target and whole copies
+    have every pixel inside it.
+"""
+def classify_copies(positions, stamp_size, target_size):
+    ends = positions + stamp_size
+
+    visible = numpy.all((positions < target_size) & (ends > 0), axis=1)
+    whole = numpy.all((positions >= 0) & (ends <= target_size), axis=1)
+
+    return visible, whole
+
+
+"""
+Counts the lattice cells along one axis that lie wholly inside a
+target, given the first visible cell.
+
+Args:
+    start: Position of the first visible cell.
+    size: Size of the stamp along the axis.
+    pitch: Distance between the start of consecutive cells.
+    count: Number of visible cells along the axis.
+    limit: Size of the target along the axis.
+
+Returns:
+    Number of cells wholly inside.
+"""
+def whole_cells(start, size, pitch, count, limit):
+    first = max(0, -(start // pitch))
+    last = min(count - 1, (limit - size - start) // pitch)
+    return max(0, last - first + 1)
+
+
+"""
+Border counter shared by every render in the process.
+"""
+border_counter = BorderCounter()
@@ -0,0 +1,17 @@
+"""
+This code is copyrighted work by Paul Williams.
+Distributed under the BSD-3-Clause license available:
+    https://opensource.org/licenses/BSD-3-Clause
+"""
+
+
+class WaterMarkerTypeError(TypeError):
+    """
+    Raised to signal an invalid argument type to a function or method.
+    """
+
+
+class WaterMarkerValueError(ValueError):
+    """
+    Raised to signal an argument with an invalid argument value.
+    """
@@ -0,0 +1,123 @@
+"""
+This code is copyrighted work by Paul Williams.
+Distributed under the BSD-3-Clause license available:
+    https://opensource.org/licenses/BSD-3-Clause
+"""
+
+
+import os
+from threading import Lock
+
+from PIL import ImageFont
+
+from project.lru_cache import LRUCache
+
+
+class FontCache(LRUCache):
+    """
+    Process-wide cache of loaded TrueType fonts keyed by font file, size
+    and the identity of the file on disk, so each font file is only
+    opened and parsed once and editing or replacing it loads it again.
+    """
+
+    """
+    Initialiser.
+
+    Args:
+        capacity: Maximum number of fonts to keep loaded. Defaults to 32.
+    """
+    def __init__(self, capacity=32):
+        super(FontCache, self).__init__(capacity)
+        self._font_paths = {}
+        self._paths_lock = Lock()
+
+    """
+    Gets a loaded font, loading it on a miss.
+
+    Args:
+        font_file: Font file name.
+        size_pt: Font size in points (pt).
+
+    Returns:
+        The Pillow font.
+
+    Raises:
+        OSError: If the font file cannot be found or read.
+    """
+    def font(self, font_file, size_pt):
+        return self.get((font_file, size_pt) + self.identity(font_file),
+                        lambda: ImageFont.truetype(font_file, size_pt))
+
+    """
+    Gets the identity of a font file on disk, i.e. its path, size and
+    modification time. Every cache of fonts or of what is rendered with
+    them keys by it, so they all notice the same edits.
+
+    Args:
+        font_file: Font file name.
+
+    Returns:
+        (absolute path, size in bytes, modification time in ns) tuple.
+
+    Raises:
+        OSError: If the font file cannot be found.
+    """
+    def identity(self, font_file):
+        path = self._font_path(font_file)
+        font_stat = os.stat(path)
+        return path, font_stat.st_size, font_stat.st_mtime_ns
+
+    """
+    Loads fonts ahead of use, e.g. when a process starts.
+
+    Args:
+        fonts: Iterable of (font file name, size in points) tuples.
+
+    Returns:
+        Self; instance that received the invocation.
+    """
+    def warm(self, fonts):
+        for font_file, size_pt in fonts:
+            self.font(font_file, size_pt)
+        return self
+
+    """
+    Removes every size of a font file from the cache, e.g. after the
+    file has changed on disk.
+
+    Args:
+        font_file: Font file name.
+
+    Returns:
+        Number of removed fonts.
+    """
+    def invalidate_font(self, font_file):
+        return self.invalidate_if(lambda key: key[0] == font_file)
+
+    '''
+    Resolves a font file name to the path of the file, as Pillow looks
+    names up in the system font directories too.
+
+    Raises:
+        OSError: If the font file cannot be found.
+    '''
+    def _font_path(self, font_file):
+        with self._paths_lock:
+            path = self._font_paths.get(font_file)
+
+        if path is None:
+            if os.path.isfile(font_file):
+                path = os.path.abspath(font_file)
+            else:
+                path = os.path.abspath(ImageFont.truetype(font_file, 20).path)
+
+            with self._paths_lock:
+                self._font_paths[font_file] = path
+
+        return path
+
+
+"""
+Font cache shared by every TextualWaterMarker in the process.
+"""
+font_cache = FontCache()
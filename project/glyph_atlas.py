@@ -0,0 +1,304 @@
+"""
+This code is copyrighted work by Paul Williams.
+Distributed under the BSD-3-Clause license available:
+    https://opensource.org/licenses/BSD-3-Clause
+"""
+
+
+import math
+from collections import namedtuple
+
+import numpy
+from PIL import Image
+from PIL import ImageDraw
+from PIL import ImageFont
+
+from project.font_cache import font_cache
+from project.lru_cache import LRUCache
+
+
+"""
+Maximum number of glyphs, and of kerned pairs, an atlas keeps. Latin
+texts need a few hundred of each; texts drawing on large scripts evict
+the least recently used rather than growing without bound.
+"""
+MAX_GLYPHS = 4096
+MAX_KERNING_PAIRS = 16384
+
+
+"""
+Coverage mask of one glyph and its placement relative to the pen
+position. The mask is None for glyphs without ink, e.g. spaces.
+"""
+Glyph = namedtuple("Glyph", ["mask", "offset", "bbox", "advance"])
+
+
+"""
+Layout of a text: the size of the image it is drawn on and each inked
+glyph with the (x, y) position of its mask. Glyphs is None when the
+text cannot be assembled from glyphs and has to be drawn whole.
+"""
+TextLayout = namedtuple("TextLayout", ["text", "size", "glyphs"])
+
+
+class GlyphAtlas(object):
+    """
+    Glyphs of one font and size, each rasterized on first use and kept
+    while recently used, from which texts are assembled without
+    rasterizing them as a whole. Texts such as serial numbers are nearly
+    always unique so their stamps are never reused, but they draw on a
+    small set of glyphs. Pen positions
+    follow the glyph advances and the kerning of each pair, rounded like
+    Pillow's basic layout, so the result is pixel identical to
+    ImageDraw.text. Texts the basic layout does not cover, multiline
+    texts or fonts laid out with raqm, are drawn whole instead.
+    """
+
+    """
+    Initialiser.
+
+    Args:
+        font: Pillow TrueType font.
+        max_glyphs: Maximum number of glyphs to keep. Defaults to
+        MAX_GLYPHS.
+        max_kerning_pairs: Maximum number of kerned pairs to keep.
+        Defaults to MAX_KERNING_PAIRS.
+    """
+    def __init__(self, font, max_glyphs=MAX_GLYPHS,
+                 max_kerning_pairs=MAX_KERNING_PAIRS):
+        self._font = font
+        self._glyphs = LRUCache(max_glyphs)
+        self._kerning = LRUCache(max_kerning_pairs)
+        self._assembled = font.layout_engine == ImageFont.Layout.BASIC
+
+    """
+    Gets the font the glyphs are rasterized from.
+
+    Returns:
+        The Pillow font.
+    """
+    def font(self):
+        return self._font
+
+    """
+    Gets the number of glyphs kept.
+
+    Returns:
+        Number of glyphs.
+    """
+    def glyph_count(self):
+        return len(self._glyphs)
+
+    """
+    Gets the number of kerned pairs kept.
+
+    Returns:
+        Number of pairs.
+    """
+    def kerning_count(self):
+        return len(self._kerning)
+
+    """
+    Lays out a text, rasterizing the glyphs not seen before.
+
+    Args:
+        text: Text to lay out.
+
+    Returns:
+        TextLayout of the text; its size equals the font's getsize.
+    """
+    def layout(self, text):
+        if not self._assembled or "\n" in text:
+            return TextLayout(text, self._font.getsize(text), None)
+
+        glyphs = []
+        pen = 0.0
+        left = 0
+        right = 0
+        bottom = 0
+        previous = None
+
+        for character in text:
+            glyph = self._glyph(character)
+
+            if previous is not None:
+                pen += self._kerning_of(previous, character)
+            previous = character
+
+            x = int(math.floor(pen + 0.5))
+            x0, _, x1, y1 = glyph.bbox
+            bottom = max(bottom, y1)
+
+            if x1 > x0:
+                left = min(left, x + x0)
+                right = max(right, x + x1)
+
+            if glyph.mask is not None:
+                glyphs.append((glyph.mask, (x + glyph.offset[0],
+                                            glyph.offset[1])))
+
+            pen += glyph.advance
+
+        right = max(right, int(math.floor(pen + 0.5)))
+
+        return TextLayout(text, (right - left, bottom), tuple(glyphs))
+
+    """
+    Draws a laid out text.
+
+    Args:
+        layout: TextLayout of the text.
+        rgb_colour: Colour as a (red, green, blue) tuple.
+
+    Returns:
+        RGBA image of the text on a transparent background.
+    """
+    def draw(self, layout, rgb_colour):
+        transparent = (0, 0, 0, 0)
+        text_img = Image.new('RGBA', layout.size, transparent)
+        editor = ImageDraw.Draw(text_img)
+
+        if layout.glyphs is None:
+            editor.text((0, 0), layout.text, rgb_colour, font=self._font)
+        else:
+            coverage = Image.fromarray(self._coverage(layout), 'L')
+            editor.bitmap((0, 0), coverage, fill=rgb_colour)
+
+        return text_img
+
+    '''
+    Combines the glyph masks of a layout into the coverage of the text.
+    Overlapping glyphs keep the larger coverage, as Pillow does when it
+    renders a text.
+
+    Args:
+        layout: TextLayout of the text; its glyphs must not be None.
+
+    Returns:
+        uint8 array of shape (height, width).
+    '''
+    def _coverage(self, layout):
+        width, height = layout.size
+        coverage = numpy.zeros((height, width), dtype=numpy.uint8)
+
+        for mask, (x, y) in layout.glyphs:
+            mask_height, mask_width = mask.shape
+            left, top = max(x, 0), max(y, 0)
+            right = min(width, x + mask_width)
+            bottom = min(height, y + mask_height)
+
+            if left >= right or top >= bottom:
+                continue
+
+            area = coverage[top:bottom, left:right]
+            numpy.maximum(area,
+                          mask[top - y:bottom - y, left - x:right - x],
+                          out=area)
+
+        return coverage
+
+    '''
+    Gets a glyph, rasterizing it on first use.
+
+    Args:
+        character: Character of the glyph.
+
+    Returns:
+        The Glyph.
+    '''
+    def _glyph(self, character):
+        return self._glyphs.get(character,
+                                lambda: self._rasterize(character))
+
+    '''
+    Rasterizes a glyph.
+
+    Args:
+        character: Character of the glyph.
+
+    Returns:
+        The Glyph.
+    '''
+    def _rasterize(self, character):
+        mask, offset = self._font.getmask2(character, 'L')
+
+        pixels = None
+        if mask.size[0] > 0 and mask.size[1] > 0:
+            pixels = numpy.asarray(Image.frombytes('L', mask.size,
+                                                   bytes(mask)))
+
+        return Glyph(pixels, offset, self._font.getbbox(character),
+                     self._font.getlength(character))
+
+    '''
+    Gets the kerning between a pair of characters.
+
+    Args:
+        first: Character on the left.
+        second: Character on the right.
+
+    Returns:
+        Adjustment of the pen position in pixels.
+    '''
+    def _kerning_of(self, first, second):
+        pair = first + second
+        return self._kerning.get(pair,
+                                 lambda: self._font.getlength(pair)
+                                 - self._font.getlength(first)
+                                 - self._font.getlength(second))
+
+
+class AtlasCache(LRUCache):
+    """
+    Process-wide cache of glyph atlases keyed by font file, size and the
+    identity of the file on disk.
+    Atlases hold glyph coverage rather than coloured glyphs, so one
+    atlas serves every colour.
+    """
+
+    """
+    Initialiser.
+
+    Args:
+        capacity: Maximum number of atlases to keep. Defaults to 32.
+    """
+    def __init__(self, capacity=32):
+        super(AtlasCache, self).__init__(capacity)
+
+    """
+    Gets the atlas of a font, creating it on a miss.
+
+    Args:
+        font_file: Font file name.
+        size_pt: Font size in points (pt).
+
+    Returns:
+        The GlyphAtlas.
+
+    Raises:
+        OSError: If the font file cannot be found or read.
+    """
+    def atlas(self, font_file, size_pt):
+        return self.get((font_file, size_pt)
+                        + font_cache.identity(font_file),
+                        lambda: GlyphAtlas(font_cache.font(font_file,
+                                                           size_pt)))
+
+    """
+    Removes every size of a font file from the cache, e.g. after the
+    file has changed on disk.
+
+    Args:
+        font_file: Font file name.
+
+    Returns:
+        Number of removed atlases.
+    """
+    def invalidate_font(self, font_file):
+        return self.invalidate_if(lambda key: key[0] == font_file)
+
+
+"""
+Atlas cache shared by every TextualWaterMarker in the process.
+"""
+atlas_cache = AtlasCache()
@@ -0,0 +1,172 @@
+"""
+This code is copyrighted work by Paul Williams.
+Distributed under the BSD-3-Clause license available:
+    https://opensource.org/licenses/BSD-3-Clause
+"""
+
+
+from collections import namedtuple
+from contextlib import contextmanager
+from threading import Lock
+from timeit import default_timer
+
+import numpy
+
+
+"""
+Duration of one stage of an apply call and the size in bytes of the
+image it produced or pasted; 0 when the stage produces no image.
+"""
+StageTiming = namedtuple("StageTiming", ["stage", "seconds", "nbytes"])
+
+
+"""
+Stage timings of one apply or collect call, in the order the stages ran.
+"""
+ApplyTimings = namedtuple("ApplyTimings", ["operation", "stages"])
+
+
+"""
+Summary of the durations of one stage across many calls.
+"""
+StageSummary = namedtuple("StageSummary", ["stage",
+                                           "count",
+                                           "p50",
+                                           "p95",
+                                           "p99",
+                                           "total_seconds",
+                                           "total_bytes"])
+
+
+class StageRecorder(object):
+    """
+    Records the stages of one call as laps; each stage lasts from the
+    end of the previous stage, or the start of the call, to its own end.
+    """
+
+    def __init__(self):
+        self._stages = []
+        self._last = default_timer()
+
+    """
+    Ends the current stage.
+
+    Args:
+        stage: Name of the stage.
+        nbytes: Size in bytes of the image the stage produced or
+        pasted. Defaults to 0.
+    """
+    def lap(self, stage, nbytes=0):
+        now = default_timer()
+        self._stages.append(StageTiming(stage, now - self._last, nbytes))
+        self._last = now
+
+    """
+    Gets the recorded stages.
+
+    Args:
+        operation: Name of the call, e.g. 'centre'.
+
+    Returns:
+        ApplyTimings of the call.
+    """
+    def timings(self, operation):
+        return ApplyTimings(operation, tuple(self._stages))
+
+
+class StageStats(object):
+    """
+    Thread-safe aggregator of stage timings reporting the 50th, 95th and
+    99th percentile durations of each stage. Instances are callable so
+    they can be passed straight to TextualWaterMarker.instrument.
+    """
+
+    def __init__(self):
+        self._seconds = {}
+        self._bytes = {}
+        self._lock = Lock()
+
+    """
+    Adds the stage timings of one call.
+
+    Args:
+        timings: ApplyTimings of the call.
+    """
+    def __call__(self, timings):
+        with self._lock:
+            for stage, seconds, nbytes in timings.stages:
+                self._seconds.setdefault(stage, []).append(seconds)
+                self._bytes[stage] = self._bytes.get(stage, 0) + nbytes
+
+    """
+    Summarizes every stage seen so far.
+
+    Returns:
+        List of StageSummary in the order stages were first seen.
+    """
+    def summaries(self):
+        with self._lock:
+            stages = [(stage, list(seconds))
+                      for stage, seconds in self._seconds.items()]
+            total_bytes = dict(self._bytes)
+
+        summaries = []
+        for stage, seconds in stages:
+            p50, p95, p99 = numpy.percentile(seconds, [50, 95, 99])
+            summaries.append(StageSummary(stage,
+                                          len(seconds),
+                                          float(p50),
+                                          float(p95),
+                                          float(p99),
+                                          float(sum(seconds)),
+                                          total_bytes[stage]))
+        return summaries
+
+    """
+    Removes every timing.
+    """
+    def clear(self):
+        with self._lock:
+            self._seconds.clear()
+            self._bytes.clear()
+
+    def __str__(self):
+        lines = ["{:<12} {:>8} {:>10} {:>10} {:>10} {:>12}".format(
+            "stage", "count", "p50 ms", "p95 ms", "p99 ms", "MB")]
+
+        for summary in self.summaries():
+            lines.append(
+                "{:<12} {:>8} {:>10.3f} {:>10.3f} {:>10.3f} {:>12.2f}"
+                .format(summary.stage,
+                        summary.count,
+                        summary.p50 * 1000,
+                        summary.p95 * 1000,
+                        summary.p99 * 1000,
+                        summary.total_bytes / 1e6))
+
+        return "\n".join(lines)
+
+
+"""
+Instruments a water marker for the duration of a with block, restoring
+its previous callback afterwards.
+
+Args:
+    water_marker: TextualWaterMarker to instrument.
+    callback: Function receiving the ApplyTimings of each call. Defaults
+    to a new StageStats.
+
+Returns:
+    Context manager yielding the callback.
+"""
+@contextmanager
+def instrumented(water_marker, callback=None):
+    if callback is None:
+        callback = StageStats()
+
+    previous = water_marker.instrumentation()
+    water_marker.instrument(callback)
+    try:
+        yield callback
+    finally:
+        water_marker.instrument(previous)
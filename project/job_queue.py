@@ -0,0 +1,580 @@
+#!/usr/bin/env python
+
+"""
+This code is copyrighted work by Paul Williams.
+Distributed under the BSD-3-Clause license available:
+    https://opensource.org/licenses/BSD-3-Clause
+"""
+
+
+import json
+import os
+import socket
+import sqlite3
+import sys
+import time
+from argparse import ArgumentParser
+from collections import namedtuple
+from contextlib import closing
+from contextlib import contextmanager
+from multiprocessing import Process
+from threading import Event
+from threading import Thread
+from timeit import default_timer
+
+from project.cli import ThroughputReport
+from project.cli import find_images
+from project.cli import output_paths
+from project.cli import watermark_path
+from project.errors import WaterMarkerTypeError
+from project.errors import WaterMarkerValueError
+from project.output_cache import OutputCache
+from project.spec import canonical_spec
+from project.spec import load_spec
+from project.spec import validate_spec
+from project.stamp_cache import stamp_cache
+from project.stamp_store import StampStore
+
+
+"""
+A job claimed from a JobQueue.
+
+Fields:
+    id: Identifier of the job.
+    input: Path of the image to watermark.
+    output: Path to write the watermarked image to.
+    spec: Spec dictionary to apply.
+    save_options: Keyword arguments for Image.save.
+    attempts: Number of times the job has been claimed, this one
+    included.
+"""
+Job = namedtuple("Job", "id input output spec save_options attempts")
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    input TEXT NOT NULL,
+    output TEXT NOT NULL,
+    spec TEXT NOT NULL,
+    save_options TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    worker TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_by_state ON jobs (state, lease_expires);
+CREATE INDEX IF NOT EXISTS jobs_by_state_id ON jobs (state, id);
+"""
+
+
+class JobQueue(object):
+    """
+    Queue of watermarking jobs in a SQLite file that coordinators and
+    workers on any host sharing the file open independently. A worker
+    claims a job with a lease and renews it by heartbeating while it
+    works; a job whose lease runs out, because its worker died or hung,
+    is claimed again by another worker. A job that has been claimed
+    max_attempts times without finishing is failed. Workers finish a job
+    only while they still hold its lease, so a job reclaimed from a slow
+    worker is not finished twice. Leases are compared against each
+    host's clock, so hosts' clocks must agree to well within a lease.
+
+    Each call opens its own connection, so a queue may be used from
+    several threads and survives forking.
+    """
+
+    """
+    Initialiser. Creates the queue's file and table if missing.
+
+    Args:
+        path: Path of the SQLite file.
+        lease_seconds: Time a claim or heartbeat holds a job for.
+        Defaults to 60 seconds.
+        max_attempts: Number of claims after which a job whose lease ran
+        out is failed rather than claimed again. Defaults to 3.
+
+    Raises:
+        WaterMarkerTypeError: If the path is none or not a string.
+        WaterMarkerValueError: If the path is empty, the lease is not
+        positive or the attempts are less than 1.
+        sqlite3.Error: If the file cannot be opened.
+    """
+    def __init__(self, path, lease_seconds=60.0, max_attempts=3):
+        if path is None:
+            raise WaterMarkerTypeError(
+                "A job queue path must be provided")
+
+        if not isinstance(path, str):
+            raise WaterMarkerTypeError(
+                "The job queue path must be a string")
+
+        if path.strip() == "":
+            raise WaterMarkerValueError(
+                "The job queue path cannot be empty")
+
+        if lease_seconds <= 0:
+            raise WaterMarkerValueError(
+                "The lease must be longer than 0 (Zero) seconds")
+
+        if max_attempts < 1:
+            raise WaterMarkerValueError(
+                "The maximum attempts must be 1 or greater")
+
+        self._path = path
+        self._lease_seconds = lease_seconds
+        self._max_attempts = max_attempts
+
+        with closing(sqlite3.connect(path, timeout=60)) as connection:
+            connection.executescript(_SCHEMA)
+
+    """
+    Gets the path of the SQLite file.
+
+    Returns:
+        File path.
+    """
+    def path(self):
+        return self._path
+
+    """
+    Gets the time a claim or heartbeat holds a job for.
+
+    Returns:
+        Seconds.
+    """
+    def lease_seconds(self):
+        return self._lease_seconds
+
+    """
+    Adds jobs to the queue in one transaction.
+
+    Args:
+        jobs: Iterable of (input path, output path, spec) or (input path,
+        output path, spec, save options) tuples; each spec is a valid
+        spec dictionary.
+
+    Returns:
+        Number of jobs added.
+
+    Raises:
+        WaterMarkerTypeError: If a spec is invalid.
+        WaterMarkerValueError: If a spec is invalid.
+    """
+    def put(self, jobs):
+        rows = []
+        for job in jobs:
+            path, output_path, spec = job[:3]
+            save_options = job[3] if len(job) > 3 else {}
+            validate_spec(spec)
+            rows.append((path, output_path, canonical_spec(spec),
+                         canonical_spec(save_options)))
+
+        with self._transaction() as connection:
+            connection.executemany(
+                "INSERT INTO jobs (input, output, spec, save_options)"
+                " VALUES (?, ?, ?, ?)", rows)
+
+        return len(rows)
+
+    """
+    Claims the oldest pending job for a worker or, once no job is
+    pending, the job whose lease ran out first. Jobs whose lease ran out
+    on their last attempt are failed instead. Each lookup reads one row
+    of an index, so claiming does not slow down as the queue grows.
+
+    Args:
+        worker: Identifier of the claiming worker.
+
+    Returns:
+        The Job, or None if no job can be claimed.
+    """
+    def claim(self, worker):
+        now = time.time()
+
+        with self._transaction() as connection:
+            connection.execute(
+                "UPDATE jobs SET state = 'failed', worker = NULL,"
+                " error = 'The lease ran out on every attempt'"
+                " WHERE state = 'running' AND lease_expires < ?"
+                " AND attempts >= ?", (now, self._max_attempts))
+
+            row = connection.execute(
+                "SELECT id, input, output, spec, save_options, attempts"
+                " FROM jobs WHERE state = 'pending'"
+                " ORDER BY id LIMIT 1").fetchone()
+
+            if row is None:
+                row = connection.execute(
+                    "SELECT id, input, output, spec, save_options, attempts"
+                    " FROM jobs WHERE state = 'running'"
+                    " AND lease_expires < ?"
+                    " ORDER BY lease_expires LIMIT 1", (now,)).fetchone()
+
+            if row is None:
+                return None
+
+            connection.execute(
+                "UPDATE jobs SET state = 'running', worker = ?,"
+                " lease_expires = ?, attempts = attempts + 1"
+                " WHERE id = ?",
+                (worker, now + self._lease_seconds, row[0]))
+
+        return Job(row[0], row[1], row[2], json.loads(row[3]),
+                   json.loads(row[4]), row[5] + 1)
+
+    """
+    Renews a worker's lease on a job.
+
+    Args:
+        job_id: Identifier of the job.
+        worker: Identifier of the worker.
+
+    Returns:
+        True if renewed; False if the worker no longer holds the job.
+    """
+    def heartbeat(self, job_id, worker):
+        with self._transaction() as connection:
+            cursor = connection.execute(
+                "UPDATE jobs SET lease_expires = ?"
+                " WHERE id = ? AND worker = ? AND state = 'running'",
+                (time.time() + self._lease_seconds, job_id, worker))
+            return cursor.rowcount == 1
+
+    """
+    Marks a worker's job as done.
+
+    Args:
+        job_id: Identifier of the job.
+        worker: Identifier of the worker.
+
+    Returns:
+        True if marked; False if the worker no longer holds the job.
+    """
+    def complete(self, job_id, worker):
+        return self._finish(job_id, worker, "done", None)
+
+    """
+    Marks a worker's job as failed; failed jobs are not claimed again.
+
+    Args:
+        job_id: Identifier of the job.
+        worker: Identifier of the worker.
+        error: Message describing the failure.
+
+    Returns:
+        True if marked; False if the worker no longer holds the job.
+    """
+    def fail(self, job_id, worker, error):
+        return self._finish(job_id, worker, "failed", error)
+
+    """
+    Puts every failed job back in the queue with its attempts reset.
+
+    Returns:
+        Number of jobs put back.
+    """
+    def retry_failed(self):
+        with self._transaction() as connection:
+            cursor = connection.execute(
+                "UPDATE jobs SET state = 'pending', worker = NULL,"
+                " lease_expires = NULL, attempts = 0, error = NULL"
+                " WHERE state = 'failed'")
+            return cursor.rowcount
+
+    """
+    Counts the jobs in each state.
+
+    Returns:
+        Dictionary of 'pending', 'running', 'done' and 'failed' counts.
+    """
+    def counts(self):
+        counts = {"pending": 0, "running": 0, "done": 0, "failed": 0}
+
+        with self._transaction() as connection:
+            for state, count in connection.execute(
+                    "SELECT state, COUNT(*) FROM jobs GROUP BY state"):
+                counts[state] = count
+
+        return counts
+
+    """
+    Gets the failed jobs.
+
+    Returns:
+        List of (input path, error) tuples.
+    """
+    def failures(self):
+        with self._transaction() as connection:
+            return connection.execute(
+                "SELECT input, error FROM jobs WHERE state = 'failed'"
+                " ORDER BY id").fetchall()
+
+    '''
+    Moves a held job to a final state.
+    '''
+    def _finish(self, job_id, worker, state, error):
+        with self._transaction() as connection:
+            cursor = connection.execute(
+                "UPDATE jobs SET state = ?, error = ?, lease_expires = NULL"
+                " WHERE id = ? AND worker = ? AND state = 'running'",
+                (state, error, job_id, worker))
+            return cursor.rowcount == 1
+
+    '''
+    Opens a connection and runs a write transaction on it, committing
+    on success and rolling back on error. The write lock is taken up
+    front so concurrent claims queue rather than deadlock.
+    '''
+    @contextmanager
+    def _transaction(self):
+        with closing(sqlite3.connect(self._path, timeout=60,
+                                     isolation_level=None)) as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield connection
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+            connection.execute("COMMIT")
+
+
+class _Heartbeat(object):
+    '''
+    Renews a worker's lease on a job on a background thread until
+    stopped.
+    '''
+
+    def __init__(self, queue, job_id, worker):
+        self._queue = queue
+        self._job_id = job_id
+        self._worker = worker
+        self._stopped = Event()
+        self._thread = Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
+
+    def _run(self):
+        interval = self._queue.lease_seconds() / 3
+        while not self._stopped.wait(interval):
+            try:
+                if not self._queue.heartbeat(self._job_id, self._worker):
+                    return
+            except sqlite3.Error:
+                pass
+
+
+"""
+Claims and runs jobs until the queue is drained.
+
+Args:
+    queue: JobQueue to claim from.
+    worker: Identifier of the worker. Defaults to the host name and
+    process id.
+    stamp_store: Directory of a StampStore to share rendered stamps
+    through. Defaults to none.
+    output_cache: Directory of an OutputCache to reuse earlier outputs
+    through. Defaults to none.
+    wait_seconds: Time to keep polling an empty queue for new jobs,
+    e.g. ones whose leases may still run out. Defaults to 0 (Zero), so
+    the worker stops as soon as no job can be claimed.
+    poll_seconds: Time between polls of an empty queue. Defaults to 1
+    second.
+
+Returns:
+    ThroughputReport of the jobs this worker ran.
+"""
+def run_worker(queue, worker=None, stamp_store=None, output_cache=None,
+               wait_seconds=0.0, poll_seconds=1.0):
+
+    if worker is None:
+        worker = "{}:{}".format(socket.gethostname(), os.getpid())
+
+    if stamp_store is not None:
+        stamp_cache.use_store(StampStore(stamp_store))
+
+    if output_cache is not None:
+        output_cache = OutputCache(output_cache)
+
+    report = ThroughputReport()
+    started = default_timer()
+    idle_since = None
+
+    while True:
+        job = queue.claim(worker)
+
+        if job is None:
+            if idle_since is None:
+                idle_since = default_timer()
+            if default_timer() - idle_since >= wait_seconds:
+                break
+            time.sleep(poll_seconds)
+            continue
+
+        idle_since = None
+        result = _run_job(queue, worker, job, output_cache)
+        report.add(result)
+
+    report.seconds = default_timer() - started
+    return report
+
+
+'''
+Runs one claimed job while heartbeating its lease.
+
+Returns:
+    Result tuple as returned by watermark_path.
+'''
+def _run_job(queue, worker, job, output_cache):
+    heartbeat = _Heartbeat(queue, job.id, worker)
+    try:
+        result = watermark_path(job.input, job.output, job.spec,
+                                job.save_options, output_cache)
+    finally:
+        heartbeat.stop()
+
+    if result[3] is None:
+        queue.complete(job.id, worker)
+    else:
+        queue.fail(job.id, worker, result[3])
+
+    return result
+
+
+'''
+Runs a worker in a child process of the work command.
+'''
+def _work(path, lease_seconds, max_attempts, stamp_store, output_cache,
+          wait_seconds):
+    queue = JobQueue(path, lease_seconds, max_attempts)
+    run_worker(queue, stamp_store=stamp_store, output_cache=output_cache,
+               wait_seconds=wait_seconds)
+
+
+"""
+Parses the command line arguments.
+
+Args:
+    argv: Arguments excluding the program name.
+
+Returns:
+    argparse Namespace.
+"""
+def parse_args(argv):
+    parser = ArgumentParser(
+        prog="python -m project.job_queue",
+        description="Shares watermarking jobs between workers on any host"
+                    " through a queue file")
+    parser.add_argument("--lease-seconds", type=float, default=60.0,
+                        help="time a claim or heartbeat holds a job for")
+    parser.add_argument("--max-attempts", type=int, default=3,
+                        help="claims after which a job whose lease ran"
+                             " out is failed")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    submit = commands.add_parser("submit", help="adds jobs to the queue")
+    submit.add_argument("queue", help="SQLite queue file")
+    submit.add_argument("inputs", nargs="+",
+                        help="image files, directories or glob patterns")
+    submit.add_argument("-s", "--spec", required=True,
+                        help="watermark spec as a JSON file or inline JSON")
+    submit.add_argument("-o", "--output-dir", required=True,
+                        help="directory to write watermarked images to")
+    submit.add_argument("-q", "--quality", type=int, default=None,
+                        help="encoder quality for JPEG and WebP output")
+
+    work = commands.add_parser("work", help="runs workers on this host")
+    work.add_argument("queue", help="SQLite queue file")
+    work.add_argument("-w", "--workers", type=int, default=None,
+                      help="worker processes; defaults to the CPU count")
+    work.add_argument("--wait-seconds", type=float, default=0.0,
+                      help="time to keep polling an empty queue")
+    work.add_argument("--stamp-store", default=None,
+                      help="directory to share rendered stamps through")
+    work.add_argument("--output-cache", default=None,
+                      help="directory to reuse outputs of unchanged"
+                           " inputs from")
+
+    status = commands.add_parser("status", help="counts jobs by state")
+    status.add_argument("queue", help="SQLite queue file")
+
+    retry = commands.add_parser("retry", help="re-queues failed jobs")
+    retry.add_argument("queue", help="SQLite queue file")
+
+    args = parser.parse_args(argv)
+
+    if args.lease_seconds <= 0:
+        parser.error("--lease-seconds must be greater than 0 (Zero)")
+
+    if args.max_attempts < 1:
+        parser.error("--max-attempts must be 1 or greater")
+
+    if args.command == "work" and args.workers is not None \
+            and args.workers < 1:
+        parser.error("--workers must be 1 or greater")
+
+    return args
+
+
+"""
+Runs the command line tool.
+
+Args:
+    argv: Arguments excluding the program name. Defaults to sys.argv.
+
+Returns:
+    Exit status; 1 if any job has failed.
+"""
+def main(argv=None):
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+    queue = JobQueue(args.queue, args.lease_seconds, args.max_attempts)
+
+    if args.command == "submit":
+        save_options = {}
+        if args.quality is not None:
+            save_options["quality"] = args.quality
+
+        paths = find_images(args.inputs)
+        try:
+            spec = load_spec(args.spec)
+            count = queue.put(
+                (path, output_path, spec, save_options)
+                for path, output_path
+                in zip(paths, output_paths(paths, args.output_dir)))
+        except (WaterMarkerTypeError, WaterMarkerValueError,
+                OSError) as error:
+            print("error: {}".format(error), file=sys.stderr)
+            return 2
+
+        print("{} jobs added".format(count))
+        return 0
+
+    if args.command == "work":
+        workers = [Process(target=_work,
+                           args=(args.queue, args.lease_seconds,
+                                 args.max_attempts, args.stamp_store,
+                                 args.output_cache, args.wait_seconds))
+                   for _ in range(args.workers or os.cpu_count() or 1)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+    if args.command == "retry":
+        print("{} jobs re-queued".format(queue.retry_failed()))
+
+    counts = queue.counts()
+    print(", ".join("{} {}".format(count, state)
+                    for state, count in counts.items()))
+    for path, error in queue.failures():
+        print("FAILED {}: {}".format(path, error))
+
+    return 1 if counts["failed"] > 0 else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,293 @@
+"""
+This code is copyrighted work by Paul Williams.
+Distributed under the BSD-3-Clause license available:
+    https://opensource.org/licenses/BSD-3-Clause
+"""
+
+
+import math
+
+import numpy
+
+from PIL import Image
+
+from project.compositing import ink_colour
+from project.compositing import paste_layer
+from project.culling import border_counter
+from project.culling import whole_cells
+
+
+"""
+Largest transparent gap, in pixels, between two cells of a row strip
+before pasting cell by cell becomes cheaper than compositing the strip.
+Measured with benchmarks/lattice_benchmark.py.
+"""
+STRIP_GAP_PIXELS = 1024
+
+
+"""
+Side, in pixels, of the square tiles a rotated lattice is built in, so
+the memory it needs is bounded by the tile rather than the image.
+"""
+ROTATED_TILE_PIXELS = 512
+
+
+"""
+Builds a strip holding one row of lattice cells. The first cell is
+pasted once and the stamped part of the strip is then doubled until the
+strip is full, so only a logarithmic number of pastes are needed however
+many cells the row holds. Cells never overlap because the horizontal
+margin is at least 1px, so copying stamps into the strip is exact.
+
+Args:
+    stamp: RGBA stamp image to tile.
+    width: Width of the strip; the first cell starts at its left edge.
+    horizontal_margin: Space between cells.
+
+Returns:
+    RGBA strip as tall as the stamp.
+"""
+def lattice_row(stamp, width, horizontal_margin):
+    stamp_width, stamp_height = stamp.size
+
+    transparent = (0, 0, 0, 0)
+    row = Image.new('RGBA', (width, stamp_height), transparent)
+    row.paste(stamp, (0, 0))
+
+    pitch = stamp_width + horizontal_margin
+    filled = pitch
+    while filled < width:
+        block = row.crop((0, 0, filled, stamp_height))
+        row.paste(block, (filled, 0))
+        filled *= 2
+
+    return row
+
+
+"""
+Builds a layer tiled with a lattice of stamps. Cells never overlap since
+both margins are at least 1px, so one cell holding the stamp and its
+margins is repeated across the layer as a numpy array; for large layers
+this is several times quicker than pasting rows.
+
+Args:
+    stamp: RGBA stamp image, or L alpha mask of one, to tile.
+    size: (width, height) of the layer.
+    margins: (horizontal, vertical) space between cells.
+    offset: (x, y) position of the layer's top left corner within the
+    lattice, whose first cell is at (0, 0). Defaults to (0, 0).
+
+Returns:
+    Layer of the same mode as the stamp, transparent between cells.
+"""
+def lattice_layer(stamp, size, margins, offset=(0, 0)):
+    width, height = size
+    stamp_width, stamp_height = stamp.size
+
+    cell = Image.new(stamp.mode, (stamp_width + margins[0],
+                                  stamp_height + margins[1]))
+    cell.paste(stamp, (0, 0))
+
+    pixels = numpy.asarray(cell)
+    left = offset[0] % pixels.shape[1]
+    top = offset[1] % pixels.shape[0]
+    repeats = (-(-(top + height) // pixels.shape[0]),
+               -(-(left + width) // pixels.shape[1])) \
+        + (1,) * (pixels.ndim - 2)
+    tiled = numpy.tile(pixels, repeats)[top:top + height,
+                                        left:left + width]
+
+    return Image.fromarray(numpy.ascontiguousarray(tiled), stamp.mode)
+
+
+"""
+Builds an image sized layer holding a lattice rotated as a whole. The
+unrotated stamp is tiled over a layer just large enough to cover the
+image once rotated, and the layer is then rotated and cropped in a
+single affine transform. The cost is one transform of the image's size
+however many cells there are, and the rotated cells keep even spacing.
+Text stamps are inked in one colour, so for them only the alpha is
+tiled and transformed, which is a quarter of the pixels; the colour is
+filled in afterwards. Transparent pixels of the layer may then hold the
+ink colour, which pasting ignores.
+
+Given a box, only that part of the layer is built, from only the part
+of the unrotated lattice that rotates into it. Building the same box
+always gives the same pixels.
+
+Args:
+    stamp: Unrotated RGBA stamp image to tile.
+    margins: (horizontal, vertical) space between cells.
+    img_size: (width, height) of the image.
+    degrees: Rotation of the lattice anticlockwise in degrees.
+    box: (left, top, right, bottom) part of the image to build. Defaults
+    to the whole image.
+
+Returns:
+    RGBA layer the size of the box.
+"""
+def rotated_lattice(stamp, margins, img_size, degrees, box=None):
+    img_width, img_height = img_size
+    if box is None:
+        box = (0, 0, img_width, img_height)
+
+    left, top, right, bottom = box
+    size = (right - left, bottom - top)
+
+    if degrees % 360 == 0:
+        return lattice_layer(stamp, size, margins, (left, top))
+
+    radians = math.radians(degrees)
+    cos = abs(math.cos(radians))
+    sin = abs(math.sin(radians))
+    width = int(math.ceil(img_width * cos + img_height * sin)) + 2
+    height = int(math.ceil(img_width * sin + img_height * cos)) + 2
+
+    a = math.cos(-radians)
+    b = math.sin(-radians)
+    d = -b
+    e = a
+    c = width / 2.0 - a * img_width / 2.0 - b * img_height / 2.0
+    f = height / 2.0 - d * img_width / 2.0 - e * img_height / 2.0
+
+    xs = [a * x + b * y + c for x in (left, right) for y in (top, bottom)]
+    ys = [d * x + e * y + f for x in (left, right) for y in (top, bottom)]
+    source_left = max(int(math.floor(min(xs))) - 1, 0)
+    source_top = max(int(math.floor(min(ys))) - 1, 0)
+    source_size = (min(int(math.ceil(max(xs))) + 1, width) - source_left,
+                   min(int(math.ceil(max(ys))) + 1, height) - source_top)
+
+    matrix = (a, b, c + a * left + b * top - source_left,
+              d, e, f + d * left + e * top - source_top)
+
+    colour = ink_colour(stamp)
+    if colour is None:
+        layer = lattice_layer(stamp, source_size, margins,
+                              (source_left, source_top))
+        return layer.transform(size, Image.AFFINE, matrix)
+
+    alpha = lattice_layer(stamp.getchannel('A'), source_size, margins,
+                          (source_left, source_top))
+
+    layer = Image.new('RGBA', size, colour + (0,))
+    layer.putalpha(alpha.transform(size, Image.AFFINE, matrix))
+    return layer
+
+
+"""
+Pastes a lattice of stamps onto an image. Dense lattices build the row
+strip once and composite it a single time per lattice row, so the number
+of alpha composites grows with the rows rather than the cells. Sparse
+lattices paste cell by cell because blending the wide transparent gaps
+of a strip costs more than the per cell overhead it saves. Either way
+the result is pixel identical to pasting the stamp once per cell.
+
+Cells ending before the image begins are culled without being visited
+and cells crossing its border are counted as clipped by the
+border_counter.
+
+Args:
+    img: Pillow Image to paste onto.
+    stamp: RGBA stamp image to tile.
+    start: (x, y) position of the first cell.
+    margins: (horizontal, vertical) space between cells.
+    blit: Function applying a layer to the image at a position.
+    Defaults to pasting with the layer's alpha as the mask.
+"""
+def paste_lattice(img, stamp, start, margins, blit=paste_layer):
+    img_width, img_height = img.size
+    stamp_width, stamp_height = stamp.size
+    horizontal_margin, vertical_margin = margins
+
+    pitch_x = stamp_width + horizontal_margin
+    pitch_y = stamp_height + vertical_margin
+
+    start_x = _first_visible(start[0], stamp_width, pitch_x)
+    start_y = _first_visible(start[1], stamp_height, pitch_y)
+
+    width = img_width - start_x
+    if width <= 0 or start_y >= img_height:
+        return
+
+    _count_cells((start_x, start_y), start, stamp.size, (pitch_x, pitch_y),
+                 img.size)
+    start = (start_x, start_y)
+
+    if horizontal_margin * stamp_height > STRIP_GAP_PIXELS:
+        _paste_cells(img, stamp, start, margins, blit)
+        return
+
+    row = lattice_row(stamp, width, horizontal_margin)
+
+    y = start_y
+    while y < img_height:
+        blit(img, row, (start_x, y))
+        y += stamp_height + vertical_margin
+
+
+'''
+Pastes a lattice of stamps onto an image one cell at a time.
+
+Args:
+    img: Pillow Image to paste onto.
+    stamp: RGBA stamp image to tile.
+    start: (x, y) position of the first cell.
+    margins: (horizontal, vertical) space between cells.
+    blit: Function applying a layer to the image at a position.
+'''
+def _paste_cells(img, stamp, start, margins, blit):
+    img_width, img_height = img.size
+    stamp_width, stamp_height = stamp.size
+
+    y = start[1]
+    while y < img_height:
+
+        x = start[0]
+        while x < img_width:
+            blit(img, stamp, (x, y))
+            x += stamp_width + margins[0]
+
+        y += stamp_height + margins[1]
+
+
+'''
+Adds the cells of a lattice to the border counter.
+
+Args:
+    visible_start: (x, y) position of the first visible cell.
+    start: (x, y) position of the first cell.
+    stamp_size: (width, height) of the stamp.
+    pitches: (horizontal, vertical) distance between cell starts.
+    img_size: (width, height) of the image.
+'''
+def _count_cells(visible_start, start, stamp_size, pitches, img_size):
+    columns = -(-(img_size[0] - visible_start[0]) // pitches[0])
+    rows = -(-(img_size[1] - visible_start[1]) // pitches[1])
+    skipped_columns = (visible_start[0] - start[0]) // pitches[0]
+    skipped_rows = (visible_start[1] - start[1]) // pitches[1]
+
+    whole = whole_cells(visible_start[0], stamp_size[0], pitches[0],
+                        columns, img_size[0]) \
+        * whole_cells(visible_start[1], stamp_size[1], pitches[1],
+                      rows, img_size[1])
+    culled = (columns + skipped_columns) * (rows + skipped_rows) \
+        - columns * rows
+
+    border_counter.add(whole, columns * rows - whole, culled)
+
+
+'''
+Skips the cells along one axis that end before the image begins.
+
+Args:
+    start: Position of the first cell along the axis.
+    size: Size of the stamp along the axis.
+    pitch: Distance between the start of consecutive cells.
+
+Returns:
+    Position of the first cell that ends inside the image.
+'''
+def _first_visible(start, size, pitch):
+    if start + size > 0:
+        return start
+    return start + (-(start + size) // pitch + 1) * pitch
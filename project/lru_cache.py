@@ -0,0 +1,274 @@
+"""
+This code is copyrighted work by Paul Williams.
+Distributed under the BSD-3-Clause license available:
+    https://opensource.org/licenses/BSD-3-Clause
+"""
+
+
+from collections import namedtuple
+from collections import OrderedDict
+from threading import Event
+from threading import Lock
+
+from project.errors import WaterMarkerTypeError
+from project.errors import WaterMarkerValueError
+
+
+CacheStats = namedtuple("CacheStats", ["hits",
+                                       "misses",
+                                       "evictions",
+                                       "entries",
+                                       "weight",
+                                       "capacity"])
+
+
+class LRUCache(object):
+    """
+    Thread-safe least recently used cache bounded by the total weight of
+    its entries. By default every entry weighs 1 so the capacity is the
+    maximum number of entries.
+    """
+
+    """
+    Initialiser.
+
+    Args:
+        capacity: Maximum total weight of the cached entries.
+        weigher: Function returning the weight of a value. Defaults to
+        one per entry.
+
+    Raises:
+        WaterMarkerTypeError: If the capacity is none or not an integer.
+        WaterMarkerValueError: If the capacity is less than 1.
+    """
+    def __init__(self, capacity, weigher=None):
+        self._validate_capacity(capacity)
+
+        self._capacity = capacity
+        self._weigher = weigher
+        self._entries = OrderedDict()
+        self._weight = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._lock = Lock()
+        self._loading = {}
+
+    """
+    Gets the value cached against a key, loading and caching it on a
+    miss. The loader is invoked outside of the lock so a slow load does
+    not block readers of other keys. Concurrent misses on the same key
+    wait for the first load rather than repeating it.
+
+    Args:
+        key: Hashable key of the value.
+        loader: Function invoked without arguments to create the value
+        when it is not cached.
+
+    Returns:
+        The cached or newly loaded value.
+    """
+    def get(self, key, loader):
+        counted = False
+
+        while True:
+            with self._lock:
+                value = self._entries.get(key)
+                if value is not None:
+                    self._entries.move_to_end(key)
+                    if not counted:
+                        self._hits += 1
+                    return value
+
+                if not counted:
+                    self._misses += 1
+                    counted = True
+
+                loading = self._loading.get(key)
+                if loading is None:
+                    loading = self._loading[key] = Event()
+                    break
+
+            loading.wait()
+
+        try:
+            value = loader()
+            self.put(key, value)
+            return value
+        finally:
+            with self._lock:
+                del self._loading[key]
+            loading.set()
+
+    """
+    Gets the value cached against a key without loading it on a miss.
+
+    Args:
+        key: Hashable key of the value.
+
+    Returns:
+        The cached value or None if the key is not cached.
+    """
+    def peek(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self._hits += 1
+            else:
+                self._misses += 1
+            return value
+
+    """
+    Caches a value against a key, evicting the least recently used
+    entries until the cache fits within its capacity. Values heavier
+    than the whole capacity are not cached.
+
+    Args:
+        key: Hashable key of the value.
+        value: Value to cache; must not be None.
+    """
+    def put(self, key, value):
+        weight = self._weigh(value)
+        if weight > self._capacity:
+            return
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._weight -= self._weigh(previous)
+
+            self._entries[key] = value
+            self._weight += weight
+
+            while self._weight > self._capacity:
+                _, evicted = self._entries.popitem(last=False)
+                self._weight -= self._weigh(evicted)
+                self._evictions += 1
+
+    """
+    Removes a key from the cache.
+
+    Args:
+        key: Hashable key of the value.
+
+    Returns:
+        True if the key was cached.
+    """
+    def invalidate(self, key):
+        with self._lock:
+            value = self._entries.pop(key, None)
+            if value is None:
+                return False
+            self._weight -= self._weigh(value)
+            return True
+
+    """
+    Removes every key matching a predicate from the cache.
+
+    Args:
+        predicate: Function receiving a key and returning True if it
+        should be removed.
+
+    Returns:
+        Number of removed entries.
+    """
+    def invalidate_if(self, predicate):
+        with self._lock:
+            keys = [key for key in self._entries if predicate(key)]
+            for key in keys:
+                self._weight -= self._weigh(self._entries.pop(key))
+            return len(keys)
+
+    """
+    Removes every entry and resets the counters.
+    """
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._weight = 0
+            self._hits = 0
+            self._misses = 0
+            self._evictions = 0
+
+    """
+    Sets the capacity, evicting entries if the cache no longer fits.
+
+    Args:
+        capacity: Maximum total weight of the cached entries.
+
+    Raises:
+        WaterMarkerTypeError: If the capacity is none or not an integer.
+        WaterMarkerValueError: If the capacity is less than 1.
+    """
+    def resize(self, capacity):
+        self._validate_capacity(capacity)
+
+        with self._lock:
+            self._capacity = capacity
+            while self._weight > self._capacity:
+                _, evicted = self._entries.popitem(last=False)
+                self._weight -= self._weigh(evicted)
+                self._evictions += 1
+
+    """
+    Gets a snapshot of the cache counters.
+
+    Returns:
+        CacheStats of hits, misses, evictions, entries, weight and
+        capacity.
+    """
+    def stats(self):
+        with self._lock:
+            return CacheStats(self._hits,
+                              self._misses,
+                              self._evictions,
+                              len(self._entries),
+                              self._weight,
+                              self._capacity)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    '''
+    Weighs a value.
+
+    Args:
+        value: Value to weigh.
+
+    Returns:
+        Weight of the value.
+    '''
+    def _weigh(self, value):
+        if self._weigher is None:
+            return 1
+        return self._weigher(value)
+
+    '''
+    Validates a capacity argument.
+
+    Args:
+        capacity: The capacity to validate.
+
+    Raises:
+        WaterMarkerTypeError: If the capacity is none or not an integer.
+        WaterMarkerValueError: If the capacity is less than 1.
+    '''
+    @staticmethod
+    def _validate_capacity(capacity):
+        if capacity is None:
+            raise WaterMarkerTypeError(
+                "A cache capacity must be provided")
+
+        if not isinstance(capacity, int):
+            raise WaterMarkerTypeError(
+                "The cache capacity must be an integer")
+
+        if capacity < 1:
+            raise WaterMarkerValueError(
+                "The cache capacity must be 1 or greater")
@@ -0,0 +1,688 @@
+#!/usr/bin/env python
+
+"""
+This code is copyrighted work by Paul Williams.
+Distributed under the BSD-3-Clause license available:
+    https://opensource.org/licenses/BSD-3-Clause
+"""
+
+
+import csv
+import hashlib
+import json
+import os
+import sys
+from argparse import ArgumentParser
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import wait
+from itertools import islice
+from timeit import default_timer
+
+import numpy
+
+from project.cli import ThroughputReport
+from project.cli import watermark_path
+from project.errors import WaterMarkerTypeError
+from project.errors import WaterMarkerValueError
+from project.lru_cache import LRUCache
+from project.output_cache import OutputCache
+from project.spec import canonical_spec
+from project.spec import load_spec
+from project.spec import validate_spec
+from project.stamp_cache import stamp_cache
+from project.stamp_store import StampStore
+
+
+"""
+Size of the blocks a manifest is read in to fingerprint it, in bytes.
+"""
+FINGERPRINT_BUFFER_BYTES = 1024 * 1024
+
+
+"""
+One row of a manifest.
+
+Fields:
+    index: Position of the row in the manifest, from 0 (Zero); used to
+    checkpoint it.
+    input: Path of the image to watermark.
+    output: Path to write the watermarked image to.
+    style: Spec of the row as a dictionary, a spec file path or inline
+    JSON text, or None to use the run's spec.
+"""
+ManifestRow = namedtuple("ManifestRow", "index input output style")
+
+
+"""
+Reads the rows of a JSONL or CSV manifest one at a time, so manifests
+of millions of rows are never held in memory. JSONL manifests hold one
+object per line with 'input', 'output' and optional 'style' keys; blank
+lines are skipped. CSV manifests have a header naming 'input', 'output'
+and optionally 'style' columns.
+
+Args:
+    path: Path of a .jsonl or .csv manifest.
+
+Returns:
+    Generator of ManifestRows in file order.
+
+Raises:
+    WaterMarkerValueError: If the manifest is neither JSONL nor CSV, or a
+    row is not valid JSON or lacks its input or output.
+    OSError: If the manifest cannot be read.
+"""
+def read_manifest(path):
+    extension = os.path.splitext(path)[1].lower()
+
+    if extension in (".jsonl", ".ndjson"):
+        return _read_jsonl(path)
+
+    if extension == ".csv":
+        return _read_csv(path)
+
+    raise WaterMarkerValueError(
+        "The manifest must be a .jsonl or .csv file")
+
+
+"""
+Fingerprints the contents of a manifest, so a checkpoint can tell the
+manifest its row indices belong to.
+
+Args:
+    path: Path of the manifest.
+
+Returns:
+    Hexadecimal SHA-256 digest of the manifest.
+
+Raises:
+    OSError: If the manifest cannot be read.
+"""
+def manifest_fingerprint(path):
+    digest = hashlib.sha256()
+
+    with open(path, "rb") as manifest_file:
+        while True:
+            block = manifest_file.read(FINGERPRINT_BUFFER_BYTES)
+            if not block:
+                break
+            digest.update(block)
+
+    return digest.hexdigest()
+
+
+class Checkpoint(object):
+    """
+    Append-only file recording the manifest rows that were watermarked,
+    one row index per line, so a restarted run skips them. The first line
+    holds the fingerprint of the manifest, as row indices mean nothing
+    for any other manifest. Indices are flushed to disk as each batch of
+    rows completes; a line torn by a crash is ignored and its row simply
+    watermarked again. The indices are held as a bitmap, one bit per row.
+    """
+
+    """
+    Initialiser. Reads the rows recorded by earlier runs.
+
+    Args:
+        path: Path of the checkpoint file; created if missing.
+        manifest: Fingerprint of the manifest the rows belong to, as
+        returned by manifest_fingerprint. Defaults to none, recording
+        rows without checking which manifest they belong to.
+
+    Raises:
+        WaterMarkerValueError: If the file holds a line that is not a row
+        index, or was recorded for another manifest or without one.
+        OSError: If the file cannot be read or created.
+    """
+    def __init__(self, path, manifest=None):
+        self._done = bytearray()
+        self._count = 0
+
+        data = b""
+        if os.path.exists(path):
+            with open(path, "rb") as checkpoint_file:
+                data = checkpoint_file.read()
+            data = data[:data.rfind(b"\n") + 1]
+
+        if data == b"":
+            self._file = open(path, "wb")
+            if manifest is not None:
+                self._write([b"manifest %s\n" % manifest.encode("ascii")])
+            return
+
+        self._load(data, manifest)
+        self._file = open(path, "ab")
+
+    """
+    Gets whether a row was recorded as done.
+
+    Args:
+        index: Index of the row.
+
+    Returns:
+        True if the row was watermarked by this or an earlier run.
+    """
+    def done(self, index):
+        byte = index >> 3
+        return byte < len(self._done) \
+            and bool(self._done[byte] & (1 << (index & 7)))
+
+    """
+    Gets the number of rows recorded as done.
+
+    Returns:
+        Row count.
+    """
+    def count(self):
+        return self._count
+
+    """
+    Records rows as done and flushes them to disk.
+
+    Args:
+        indices: Iterable of row indices.
+    """
+    def record(self, indices):
+        lines = []
+        for index in indices:
+            if not self.done(index):
+                self._mark(index)
+                lines.append(b"%d\n" % index)
+
+        if len(lines) > 0:
+            self._write(lines)
+
+    """
+    Closes the checkpoint file.
+    """
+    def close(self):
+        self._file.close()
+
+    '''
+    Writes lines to the checkpoint file and flushes them to disk.
+    '''
+    def _write(self, lines):
+        self._file.write(b"".join(lines))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    '''
+    Builds the bitmap from the complete lines of a checkpoint file,
+    checking the manifest it was recorded for.
+    '''
+    def _load(self, data, manifest):
+        recorded = None
+        if data.startswith(b"manifest "):
+            header, data = data.split(b"\n", 1)
+            recorded = header[len(b"manifest "):].decode("ascii", "replace")
+
+        if manifest is not None and recorded != manifest:
+            raise WaterMarkerValueError(
+                "The checkpoint was not recorded for this manifest")
+
+        try:
+            indices = numpy.array(data.split(), dtype=numpy.int64)
+        except ValueError:
+            raise WaterMarkerValueError(
+                "The checkpoint holds a line that is not a row index")
+
+        if len(indices) == 0:
+            return
+
+        if indices.min() < 0:
+            raise WaterMarkerValueError(
+                "The checkpoint holds a negative row index")
+
+        bits = numpy.zeros(indices.max() + 1, dtype=bool)
+        bits[indices] = True
+        self._done = bytearray(numpy.packbits(bits, bitorder="little"))
+        self._count = int(numpy.count_nonzero(bits))
+
+    '''
+    Marks a row as done in the bitmap.
+    '''
+    def _mark(self, index):
+        byte = index >> 3
+        if byte >= len(self._done):
+            self._done.extend(bytes(max(byte + 1 - len(self._done),
+                                        len(self._done))))
+
+        bit = 1 << (index & 7)
+        if not self._done[byte] & bit:
+            self._done[byte] |= bit
+            self._count += 1
+
+
+class RunProgress(object):
+    """
+    Live progress of a manifest run: rows finished, throughput of this
+    run and the estimated time left.
+    """
+
+    """
+    Initialiser.
+
+    Args:
+        total: Number of rows in the manifest.
+        skipped: Number of rows finished by earlier runs.
+    """
+    def __init__(self, total, skipped=0):
+        self.total = total
+        self.skipped = skipped
+        self.succeeded = 0
+        self.failed = 0
+        self._started = default_timer()
+
+    """
+    Adds the rows finished by a batch.
+
+    Args:
+        succeeded: Number of rows watermarked.
+        failed: Number of rows that failed.
+    """
+    def add(self, succeeded, failed):
+        self.succeeded += succeeded
+        self.failed += failed
+
+    """
+    Gets the number of rows finished by this run per second.
+
+    Returns:
+        Rows per second.
+    """
+    def rows_per_second(self):
+        seconds = default_timer() - self._started
+        if seconds <= 0:
+            return 0.0
+        return (self.succeeded + self.failed) / seconds
+
+    """
+    Estimates the time left at this run's throughput.
+
+    Returns:
+        Seconds, or None before any row has finished.
+    """
+    def eta_seconds(self):
+        rate = self.rows_per_second()
+        if rate <= 0:
+            return None
+
+        remaining = self.total - self.skipped - self.succeeded - self.failed
+        return max(0, remaining) / rate
+
+    def __str__(self):
+        finished = self.skipped + self.succeeded + self.failed
+        percent = 100.0 * finished / self.total if self.total > 0 else 100.0
+
+        eta = self.eta_seconds()
+        if eta is None:
+            eta = "--:--:--"
+        else:
+            eta = int(round(eta))
+            eta = "{}:{:02d}:{:02d}".format(eta // 3600, eta // 60 % 60,
+                                            eta % 60)
+
+        return "{}/{} rows ({:.1f}%), {:.1f} rows/sec, ETA {}, {} failed" \
+            .format(finished, self.total, percent, self.rows_per_second(),
+                    eta, self.failed)
+
+
+"""
+Watermarks the rows of a manifest in a process pool, skipping rows a
+checkpoint records as done and recording each row as it succeeds. A
+crashed or interrupted run is resumed by running it again with the same
+checkpoint; a checkpoint recorded for another manifest is refused.
+Failed rows, including the rows of a chunk whose worker failed, are not
+recorded, so they are retried by the next run. Rows are read and sent to workers in chunks, with at most two
+chunks per worker outstanding, so memory does not grow with the
+manifest.
+
+Args:
+    manifest: Path of a .jsonl or .csv manifest.
+    checkpoint: Path of the checkpoint file.
+    spec: Valid spec dictionary for rows without a style. Defaults to
+    none, in which case such rows fail.
+    workers: Number of worker processes. Defaults to the number of CPUs.
+    chunksize: Number of rows sent to a worker per task. Defaults to 16.
+    save_options: Keyword arguments for Image.save, e.g. quality.
+    stamp_store: Directory of a StampStore the workers share rendered
+    stamps through. Defaults to none.
+    output_cache: Directory of an OutputCache the workers reuse earlier
+    outputs through. Defaults to none.
+    progress: Function invoked with the RunProgress as rows finish, at
+    most every progress_seconds and once at the end. Defaults to none.
+    progress_seconds: Least time between progress invocations. Defaults
+    to 5 seconds.
+
+Returns:
+    ThroughputReport of this run.
+
+Raises:
+    WaterMarkerTypeError: If the spec is invalid.
+    WaterMarkerValueError: If the spec or a manifest row is invalid, the
+    checkpoint was recorded for another manifest, or the worker count or
+    chunk size is less than 1.
+    OSError: If the manifest or checkpoint cannot be read.
+"""
+def run_manifest(manifest, checkpoint, spec=None, workers=None,
+                 chunksize=16, save_options=None, stamp_store=None,
+                 output_cache=None, progress=None, progress_seconds=5.0):
+
+    if spec is not None:
+        validate_spec(spec)
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    if workers < 1:
+        raise WaterMarkerValueError(
+            "The worker count must be 1 or greater")
+
+    if chunksize < 1:
+        raise WaterMarkerValueError(
+            "The chunk size must be 1 or greater")
+
+    done = Checkpoint(checkpoint, manifest_fingerprint(manifest))
+    total = skipped = 0
+    for row in read_manifest(manifest):
+        total += 1
+        skipped += done.done(row.index)
+
+    styles = _StyleResolver(spec)
+    save_options = save_options or {}
+
+    report = ThroughputReport()
+    status = RunProgress(total, skipped)
+    started = default_timer()
+    reported = started
+
+    rows = (row for row in read_manifest(manifest) if not done.done(row.index))
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers,
+                                 initializer=_init_manifest_worker,
+                                 initargs=(stamp_store,
+                                           output_cache)) as executor:
+            pending = {}
+
+            while True:
+                while len(pending) < 2 * workers:
+                    chunk = list(islice(rows, chunksize))
+                    if len(chunk) == 0:
+                        break
+                    tasks = [styles.task(row, save_options) for row in chunk]
+                    pending[executor.submit(_watermark_rows, tasks)] = tasks
+
+                if len(pending) == 0:
+                    break
+
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    _record(_chunk_results(future, pending.pop(future)),
+                            report, done, status)
+
+                if progress is not None \
+                        and default_timer() - reported >= progress_seconds:
+                    reported = default_timer()
+                    progress(status)
+    finally:
+        done.close()
+
+    report.seconds = default_timer() - started
+    if progress is not None:
+        progress(status)
+
+    return report
+
+
+class _StyleResolver(object):
+    '''
+    Turns manifest rows into worker tasks, loading and validating each
+    distinct style once.
+    '''
+
+    def __init__(self, spec):
+        self._spec = spec
+        self._specs = LRUCache(256)
+
+    '''
+    Creates the task of a row.
+
+    Returns:
+        (index, input, output, spec or error message, save options) tuple.
+    '''
+    def task(self, row, save_options):
+        try:
+            spec = self._resolve(row.style)
+        except (OSError, WaterMarkerTypeError, WaterMarkerValueError) \
+                as error:
+            spec = "Invalid style: {}".format(error)
+
+        return row.index, row.input, row.output, spec, save_options
+
+    '''
+    Gets the spec of a row style.
+    '''
+    def _resolve(self, style):
+        if style is None:
+            if self._spec is None:
+                raise WaterMarkerValueError(
+                    "The row has no style and the run has no spec")
+            return self._spec
+
+        if isinstance(style, dict):
+            def load():
+                validate_spec(style)
+                return style
+            return self._specs.get(canonical_spec(style), load)
+
+        return self._specs.get(style, lambda: load_spec(style))
+
+
+'''
+Gets the results of a finished chunk. A chunk that raised, e.g. because
+its worker died or its tasks could not be sent, fails each of its rows
+so the rows of other chunks are still recorded.
+
+Returns:
+    List of (index, result) tuples as returned by _watermark_rows.
+'''
+def _chunk_results(future, tasks):
+    try:
+        return future.result()
+    except Exception as error:
+        message = "The worker failed: {}".format(error)
+        return [(index, (path, 0, 0, message))
+                for index, path, _, _, _ in tasks]
+
+
+'''
+Adds the results of a chunk to the run's report, checkpoint and
+progress.
+'''
+def _record(results, report, done, status):
+    succeeded = []
+    for index, result in results:
+        report.add(result)
+        if result[3] is None:
+            succeeded.append(index)
+
+    done.record(succeeded)
+    status.add(len(succeeded), len(results) - len(succeeded))
+
+
+_worker_output_cache = None
+
+
+'''
+Initialises a worker process.
+'''
+def _init_manifest_worker(stamp_store, output_cache):
+    global _worker_output_cache
+
+    if stamp_store is not None:
+        stamp_cache.use_store(StampStore(stamp_store))
+
+    if output_cache is not None:
+        _worker_output_cache = OutputCache(output_cache)
+
+
+'''
+Watermarks a chunk of manifest rows.
+
+Returns:
+    List of (index, result) tuples, each result as returned by
+    watermark_path.
+'''
+def _watermark_rows(tasks):
+    results = []
+
+    for index, path, output_path, spec, save_options in tasks:
+        if isinstance(spec, str):
+            results.append((index, (path, 0, 0, spec)))
+            continue
+
+        results.append((index, watermark_path(path, output_path, spec,
+                                              save_options,
+                                              _worker_output_cache)))
+
+    return results
+
+
+'''
+Reads the rows of a JSONL manifest.
+'''
+def _read_jsonl(path):
+    with open(path, encoding="utf-8") as manifest_file:
+        index = 0
+        for number, line in enumerate(manifest_file, 1):
+            if line.strip() == "":
+                continue
+
+            try:
+                values = json.loads(line)
+            except ValueError as error:
+                raise WaterMarkerValueError(
+                    "Line {} of the manifest is not valid JSON: {}"
+                    .format(number, error))
+
+            if not isinstance(values, dict):
+                raise WaterMarkerValueError(
+                    "Line {} of the manifest is not a JSON object"
+                    .format(number))
+
+            yield _row(index, values, "Line {}".format(number))
+            index += 1
+
+
+'''
+Reads the rows of a CSV manifest.
+'''
+def _read_csv(path):
+    with open(path, encoding="utf-8", newline="") as manifest_file:
+        reader = csv.DictReader(manifest_file)
+        for index, values in enumerate(reader):
+            if values.get("style") == "":
+                values["style"] = None
+            yield _row(index, values, "Row {}".format(index + 1))
+
+
+'''
+Creates a manifest row from its values.
+'''
+def _row(index, values, where):
+    for key in ("input", "output"):
+        if not isinstance(values.get(key), str) or values[key] == "":
+            raise WaterMarkerValueError(
+                "{} of the manifest has no {} path".format(where, key))
+
+    return ManifestRow(index, values["input"], values["output"],
+                       values.get("style"))
+
+
+"""
+Parses the command line arguments.
+
+Args:
+    argv: Arguments excluding the program name.
+
+Returns:
+    argparse Namespace.
+"""
+def parse_args(argv):
+    parser = ArgumentParser(
+        prog="python -m project.manifest",
+        description="Watermarks the images of a manifest, resuming where"
+                    " an earlier run stopped")
+    parser.add_argument("manifest",
+                        help="JSONL or CSV manifest of input, output and"
+                             " style rows")
+    parser.add_argument("--checkpoint", default=None,
+                        help="checkpoint file; defaults to the manifest"
+                             " path plus '.checkpoint'")
+    parser.add_argument("-s", "--spec", default=None,
+                        help="spec for rows without a style, as a JSON"
+                             " file or inline JSON")
+    parser.add_argument("-w", "--workers", type=int, default=None,
+                        help="worker processes; defaults to the CPU count")
+    parser.add_argument("-c", "--chunksize", type=int, default=16,
+                        help="rows sent to a worker per task")
+    parser.add_argument("-q", "--quality", type=int, default=None,
+                        help="encoder quality for JPEG and WebP output")
+    parser.add_argument("--stamp-store", default=None,
+                        help="directory to share rendered stamps through"
+                             " across runs")
+    parser.add_argument("--output-cache", default=None,
+                        help="directory to reuse outputs of unchanged"
+                             " inputs from across runs")
+    parser.add_argument("--progress-seconds", type=float, default=5.0,
+                        help="seconds between progress lines")
+    args = parser.parse_args(argv)
+
+    if args.workers is not None and args.workers < 1:
+        parser.error("--workers must be 1 or greater")
+
+    if args.chunksize < 1:
+        parser.error("--chunksize must be 1 or greater")
+
+    if args.checkpoint is None:
+        args.checkpoint = args.manifest + ".checkpoint"
+
+    return args
+
+
+"""
+Runs the command line tool.
+
+Args:
+    argv: Arguments excluding the program name. Defaults to sys.argv.
+
+Returns:
+    Exit status; 1 if any row failed.
+"""
+def main(argv=None):
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+    spec = None if args.spec is None else load_spec(args.spec)
+
+    save_options = {}
+    if args.quality is not None:
+        save_options["quality"] = args.quality
+
+    report = run_manifest(args.manifest, args.checkpoint, spec,
+                          workers=args.workers,
+                          chunksize=args.chunksize,
+                          save_options=save_options,
+                          stamp_store=args.stamp_store,
+                          output_cache=args.output_cache,
+                          progress=lambda status: print(status,
+                                                        file=sys.stderr),
+                          progress_seconds=args.progress_seconds)
+    print(report)
+
+    return 1 if report.failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,247 @@
+"""
+This code is copyrighted work by Paul Williams.
+Distributed under the BSD-3-Clause license available:
+    https://opensource.org/licenses/BSD-3-Clause
+"""
+
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from collections import namedtuple
+from threading import Lock
+
+from project.errors import WaterMarkerTypeError
+from project.errors import WaterMarkerValueError
+from project.font_cache import font_cache
+from project.spec import canonical_spec
+from project.style import WatermarkStyle
+
+
+"""
+Version of the cache key and of the rendering; bumping it invalidates
+every cached output.
+"""
+OUTPUT_CACHE_VERSION = 1
+
+
+"""
+Bytes hashed per read of an input file.
+"""
+HASH_BUFFER_BYTES = 1024 * 1024
+
+
+OutputCacheStats = namedtuple("OutputCacheStats", ["hits",
+                                                   "misses",
+                                                   "stores",
+                                                   "bytes_saved"])
+
+
+class OutputCache(object):
+    """
+    Directory of watermarked outputs keyed by a hash of the input file's
+    bytes, the canonical spec, the save options, the output format and
+    the font files the spec uses, so re-running a job over unchanged
+    inputs copies the earlier outputs instead of decoding, stamping and
+    encoding them again. Outputs are hard linked where the file system
+    allows and copied otherwise, so like cached stamps they must never
+    be modified in place. Editing or replacing a font file, or changing
+    anything else in the key, misses the cache.
+    """
+
+    """
+    Initialiser.
+
+    Args:
+        directory: Directory holding the outputs; created if missing.
+
+    Raises:
+        WaterMarkerTypeError: If the directory is none or not a string.
+        WaterMarkerValueError: If the directory is empty.
+        OSError: If the directory cannot be created.
+    """
+    def __init__(self, directory):
+        if directory is None:
+            raise WaterMarkerTypeError(
+                "An output cache directory must be provided")
+
+        if not isinstance(directory, str):
+            raise WaterMarkerTypeError(
+                "The output cache directory must be a string")
+
+        if directory.strip() == "":
+            raise WaterMarkerValueError(
+                "The output cache directory cannot be empty")
+
+        self._directory = directory
+        self._root = os.path.join(directory,
+                                  "v{}".format(OUTPUT_CACHE_VERSION))
+        self._lock = Lock()
+        self._hits = 0
+        self._misses = 0
+        self._stores = 0
+        self._bytes_saved = 0
+        os.makedirs(self._root, exist_ok=True)
+
+    """
+    Gets the directory holding the outputs.
+
+    Returns:
+        Directory path.
+    """
+    def directory(self):
+        return self._directory
+
+    """
+    Creates the key of an output.
+
+    Args:
+        path: Path of the input image.
+        output_path: Path the output is written to; its extension picks
+        the output format.
+        spec: Valid spec dictionary.
+        save_options: Keyword arguments for Image.save.
+
+    Returns:
+        Hex digest.
+
+    Raises:
+        OSError: If the input or a font file cannot be read.
+    """
+    def key(self, path, output_path, spec, save_options):
+        digest = hashlib.sha256()
+
+        with open(path, "rb") as input_file:
+            while True:
+                chunk = input_file.read(HASH_BUFFER_BYTES)
+                if not chunk:
+                    break
+                digest.update(chunk)
+
+        fonts = []
+        for font_file in sorted(_font_files(spec)):
+            fonts.append(list(font_cache.identity(font_file)))
+
+        plan = json.dumps([OUTPUT_CACHE_VERSION,
+                           canonical_spec(spec),
+                           canonical_spec(save_options),
+                           os.path.splitext(output_path)[1].lower(),
+                           fonts])
+        digest.update(b"\0")
+        digest.update(plan.encode("utf-8"))
+
+        return digest.hexdigest()
+
+    """
+    Writes the cached output of a key to a path.
+
+    Args:
+        key: Key from key().
+        output_path: Path to write the output to; replaced if it exists.
+
+    Returns:
+        True on a hit; False if the key is not cached.
+    """
+    def fetch(self, key, output_path):
+        cached_path = self._path(key)
+
+        try:
+            size = os.path.getsize(cached_path)
+            _link_or_copy(cached_path, output_path)
+        except OSError:
+            with self._lock:
+                self._misses += 1
+            return False
+
+        with self._lock:
+            self._hits += 1
+            self._bytes_saved += size
+
+        return True
+
+    """
+    Caches an output against a key.
+
+    Args:
+        key: Key from key().
+        output_path: Path of the written output.
+
+    Raises:
+        OSError: If the output cannot be cached.
+    """
+    def store(self, key, output_path):
+        cached_path = self._path(key)
+        os.makedirs(os.path.dirname(cached_path), exist_ok=True)
+        _link_or_copy(output_path, cached_path)
+
+        with self._lock:
+            self._stores += 1
+
+    """
+    Gets the counts of this instance.
+
+    Returns:
+        OutputCacheStats; bytes_saved totals the outputs of the hits.
+    """
+    def stats(self):
+        with self._lock:
+            return OutputCacheStats(self._hits,
+                                    self._misses,
+                                    self._stores,
+                                    self._bytes_saved)
+
+    """
+    Removes every cached output, of every version.
+    """
+    def clear(self):
+        for name in os.listdir(self._directory):
+            path = os.path.join(self._directory, name)
+            if name.startswith("v") and os.path.isdir(path):
+                shutil.rmtree(path)
+
+        os.makedirs(self._root, exist_ok=True)
+
+    '''
+    Gets the file path of a cached output.
+    '''
+    def _path(self, key):
+        return os.path.join(self._root, key[:2], key)
+
+
+'''
+Gets the font files a spec uses.
+
+Returns:
+    Set of font file names.
+'''
+def _font_files(spec):
+    fonts = {spec.get("font", WatermarkStyle().font_file())}
+    for operation in spec["operations"]:
+        if "font" in operation:
+            fonts.add(operation["font"])
+    return fonts
+
+
+'''
+Hard links a file to a path, or copies it if it cannot be linked. The
+path is replaced atomically, so readers never see a partly written file.
+Renaming a link over another link to the same file does nothing, so
+the temporary link is removed afterwards if it is still there.
+'''
+def _link_or_copy(source, path):
+    directory = os.path.dirname(path) or "."
+    handle, temp_path = tempfile.mkstemp(dir=directory)
+    os.close(handle)
+    os.unlink(temp_path)
+
+    try:
+        try:
+            os.link(source, temp_path)
+        except OSError:
+            shutil.copyfile(source, temp_path)
+        os.replace(temp_path, path)
+    finally:
+        if os.path.lexists(temp_path):
+            os.unlink(temp_path)
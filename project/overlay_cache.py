@@ -0,0 +1,64 @@
+"""
+This code is copyrighted work by Paul Williams.
+Distributed under the BSD-3-Clause license available:
+    https://opensource.org/licenses/BSD-3-Clause
+"""
+
+
+from project.lru_cache import LRUCache
+
+
+class OverlayCache(LRUCache):
+    """
+    Process-wide cache of compiled plan overlays keyed by the plan key,
+    i.e. the image size and every operation, bounded by the memory their
+    pixels occupy. Images of a size already seen with the same plan then
+    cost one composite. Cached overlays are shared so they must never be
+    modified in place.
+    """
+
+    """
+    Initialiser.
+
+    Args:
+        max_bytes: Memory budget for the cached overlay pixels in bytes.
+        Defaults to 256MiB.
+    """
+    def __init__(self, max_bytes=256 * 1024 * 1024):
+        super(OverlayCache, self).__init__(
+            max_bytes, weigher=OverlayCache.overlay_bytes)
+
+    """
+    Removes every overlay of a plan using a font file, e.g. after the
+    file has changed on disk.
+
+    Args:
+        font_file: Font file name.
+
+    Returns:
+        Number of removed overlays.
+    """
+    def invalidate_font(self, font_file):
+        return self.invalidate_if(
+            lambda key: any(operation[0][0] == font_file
+                            for operation in key[1:]))
+
+    """
+    Gets the memory occupied by the pixels of a compiled overlay.
+
+    Args:
+        compiled: (overlay, (x, y)) tuple.
+
+    Returns:
+        Size of the overlay pixels in bytes.
+    """
+    @staticmethod
+    def overlay_bytes(compiled):
+        width, height = compiled[0].size
+        return width * height * len(compiled[0].getbands())
+
+
+"""
+Overlay cache shared by every WatermarkPlan in the process.
+"""
+overlay_cache = OverlayCache()
@@ -0,0 +1,169 @@
+"""
+This code is copyrighted work by Paul Williams.
+Distributed under the BSD-3-Clause license available:
+    https://opensource.org/licenses/BSD-3-Clause
+"""
+
+
+import os
+from io import BytesIO
+
+from PIL import Image
+
+from project.cli import open_for_watermarking
+from project.errors import WaterMarkerTypeError
+from project.errors import WaterMarkerValueError
+from project.spec import apply_spec
+from project.spec import validate_spec
+from project.textual_water_marker import TextualWaterMarker
+
+
+"""
+Formats that cannot hold an alpha channel; RGBA images are flattened
+to RGB before being encoded in them.
+"""
+_OPAQUE_FORMATS = ("JPEG", "BMP", "PPM")
+
+
+"""
+Decodes an image, shrinks it to fit a size, watermarks it at that size
+and encodes it, in one call. A JPEG is decoded straight to the smallest
+1/2, 1/4 or 1/8 scale that still covers the size using draft mode, so
+the full resolution is never decoded; other formats are decoded in full
+and shrunk with reduce() before the final resample. Stamps are applied
+to the shrunken image, so they keep their point size in the output
+rather than shrinking with the image.
+
+Args:
+    source: Path, encoded image bytes or a readable binary file.
+    spec: Valid spec dictionary.
+    max_size: (width, height) the output must fit within; the aspect
+    ratio is kept and images are never enlarged. Defaults to none, which
+    keeps the full size.
+    output_format: Pillow format name of the output, in any case, e.g.
+    'JPEG' or 'webp'; 'JPG' is taken as 'JPEG'. Defaults to the format
+    of the input.
+    quality: Encoder quality for JPEG and WebP output. Defaults to the
+    encoder's own.
+    save_options: Other keyword arguments for Image.save. Defaults to
+    none.
+
+Returns:
+    The encoded output as bytes.
+
+Raises:
+    WaterMarkerTypeError: If the source, spec, size or output format is
+    not of the correct type.
+    WaterMarkerValueError: If the spec is invalid, a size dimension is
+    less than 1 or Pillow cannot encode the output format.
+    OSError: If the source cannot be read or decoded.
+"""
+def watermark_encoded(source, spec, max_size=None, output_format=None,
+                      quality=None, save_options=None):
+    validate_spec(spec)
+    _validate_max_size(max_size)
+    output_format = _output_format(output_format)
+
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = BytesIO(source)
+    elif not isinstance(source, (str, os.PathLike)) \
+            and not hasattr(source, "read"):
+        raise WaterMarkerTypeError(
+            "The source must be a path, bytes or a readable file")
+
+    with Image.open(source) as image:
+        output_format = output_format or image.format
+
+        target = image.size
+        if max_size is not None:
+            target = fit_size(image.size, max_size)
+            image.draft('RGB' if image.mode == 'RGB' else None, target)
+
+        image = open_for_watermarking(image)
+
+        if image.size != target:
+            image = image.resize(target, Image.LANCZOS, reducing_gap=3.0)
+
+        apply_spec(TextualWaterMarker(image).defer(True), spec).collect()
+
+        if output_format in _OPAQUE_FORMATS and image.mode != 'RGB':
+            image = image.convert('RGB')
+
+        options = dict(save_options or {})
+        if quality is not None:
+            options["quality"] = quality
+
+        output = BytesIO()
+        image.save(output, output_format, **options)
+        return output.getvalue()
+
+
+"""
+Gets the largest size with an image's aspect ratio that fits within a
+bounding size, without enlarging the image.
+
+Args:
+    img_size: (width, height) of the image.
+    max_size: (width, height) to fit within.
+
+Returns:
+    (width, height) of at least 1x1.
+"""
+def fit_size(img_size, max_size):
+    width, height = img_size
+    scale = min(1.0, max_size[0] / width, max_size[1] / height)
+    return (max(1, min(max_size[0], int(round(width * scale)))),
+            max(1, min(max_size[1], int(round(height * scale)))))
+
+
+'''
+Validates a maximum size.
+
+Raises:
+    WaterMarkerTypeError: If the size is not a tuple of two integers.
+    WaterMarkerValueError: If a dimension is less than 1.
+'''
+def _validate_max_size(max_size):
+    if max_size is None:
+        return
+
+    if not isinstance(max_size, tuple) or len(max_size) != 2:
+        raise WaterMarkerTypeError(
+            "The maximum size must be a (width, height) tuple")
+
+    for dimension in max_size:
+        if not isinstance(dimension, int):
+            raise WaterMarkerTypeError(
+                "Each maximum size dimension must be an integer")
+        if dimension < 1:
+            raise WaterMarkerValueError(
+                "Each maximum size dimension must be 1 or greater")
+
+
+'''
+Normalises an output format name.
+
+Returns:
+    Upper case Pillow format name, or None to keep the input's format.
+
+Raises:
+    WaterMarkerTypeError: If the format is not a string.
+    WaterMarkerValueError: If Pillow cannot encode the format.
+'''
+def _output_format(output_format):
+    if output_format is None:
+        return None
+
+    if not isinstance(output_format, str):
+        raise WaterMarkerTypeError("The output format must be a string")
+
+    name = output_format.upper()
+    if name == "JPG":
+        name = "JPEG"
+
+    Image.init()
+    if name not in Image.SAVE:
+        raise WaterMarkerValueError(
+            "Unknown output format '{}'".format(output_format))
+
+    return name
@@ -0,0 +1,318 @@
+"""
+This code is copyrighted work by Paul Williams.
+Distributed under the BSD-3-Clause license available:
+    https://opensource.org/licenses/BSD-3-Clause
+"""
+
+
+import numpy
+
+from project.compositing import paste_layer
+from project.culling import border_counter
+from project.culling import classify_copies
+from project.lattice import ROTATED_TILE_PIXELS
+from project.lattice import paste_lattice
+from project.lattice import rotated_lattice
+from project.scatter import OVERLAY_PIXELS_PER_COPY
+from project.scatter import paste_scattered
+from project.scatter import uses_scattered_overlay
+from project.trim import paste_pieces
+from project.trim import trim_stamp
+
+
+class Placement(object):
+    """
+    Copies of a stamp at one or more positions on an image. The stamp is
+    trimmed to its visible pixels, and the positions moved to match, so
+    its transparent padding is never blended.
+    """
+
+    """
+    Initialiser.
+
+    Args:
+        stamp: RGBA stamp image.
+        positions: (x, y) top left position of each copy of the untrimmed
+        stamp as a sequence or an integer array of shape (N, 2).
+    """
+    def __init__(self, stamp, positions):
+        self._stamp, offset = trim_stamp(stamp)
+        self._positions = numpy.asarray(positions, dtype=numpy.int64)\
+            .reshape(-1, 2) + offset
+
+    """
+    Gets the trimmed stamp.
+
+    Returns:
+        RGBA stamp image.
+    """
+    def stamp(self):
+        return self._stamp
+
+    """
+    Gets the positions of the copies of the trimmed stamp.
+
+    Returns:
+        Integer array of shape (N, 2) holding (x, y) rows.
+    """
+    def positions(self):
+        return self._positions
+
+    """
+    Gets the box bounding every copy.
+
+    Returns:
+        (left, top, right, bottom) box or None if there are no copies.
+    """
+    def bbox(self):
+        if len(self._positions) == 0:
+            return None
+
+        left, top = self._positions.min(axis=0)
+        right, bottom = self._positions.max(axis=0) + self._stamp.size
+        return int(left), int(top), int(right), int(bottom)
+
+    """
+    Estimates the cost of pasting the copies directly onto an image, in
+    pixels blended plus a fixed overhead per paste.
+
+    Returns:
+        Estimated cost.
+    """
+    def direct_cost(self):
+        width, height = self._stamp.size
+        return len(self._positions) * (width * height
+                                       + OVERLAY_PIXELS_PER_COPY)
+
+    """
+    Renders the copies onto a target, culling copies that miss it and
+    counting them, and those crossing its border, with the
+    border_counter. A lone copy is pasted as ink pieces, so a diagonal
+    stamp only blends the band around its text. When the target is a
+    region of the watermarked image, whether the copies are accumulated
+    into an overlay is decided for the whole image, so every region is
+    rendered the way the whole image would be.
+
+    Args:
+        target: Pillow Image to render onto.
+        origin: (x, y) position of the target's top left corner within
+        the watermarked image. Defaults to (0, 0).
+        blit: Function applying a layer to the target at a position.
+        Defaults to pasting with the layer's alpha as the mask.
+        img_size: (width, height) of the watermarked image. Defaults to
+        none, deciding for the target alone.
+    """
+    def render(self, target, origin=(0, 0), blit=paste_layer,
+               img_size=None):
+        overlay = None
+        if img_size is not None:
+            overlay = self._uses_overlay(target, blit, img_size)
+
+        positions = self._positions - origin
+        visible, whole = classify_copies(positions, self._stamp.size,
+                                         target.size)
+        positions = positions[visible]
+
+        whole_count = int(whole.sum())
+        border_counter.add(whole_count, len(positions) - whole_count,
+                           len(visible) - len(positions))
+
+        if len(positions) == 0:
+            return
+
+        if len(positions) == 1 and not overlay:
+            x, y = positions[0].tolist()
+            paste_pieces(target, self._stamp, (x, y), blit)
+        else:
+            paste_scattered(target, self._stamp, positions, blit, overlay)
+
+    '''
+    Gets whether the copies are accumulated into an overlay when the
+    whole image is rendered.
+
+    Args:
+        target: Pillow Image, or region of one, to render onto.
+        blit: Function applying a layer to the target at a position.
+        img_size: (width, height) of the watermarked image.
+
+    Returns:
+        True if the copies are accumulated into an overlay.
+    '''
+    def _uses_overlay(self, target, blit, img_size):
+        visible, _ = classify_copies(self._positions, self._stamp.size,
+                                     img_size)
+        positions = self._positions[visible]
+
+        return len(positions) > 1 \
+            and uses_scattered_overlay(target, self._stamp, positions,
+                                       blit, img_size)
+
+
+class LatticePlacement(object):
+    """
+    A lattice of stamps from a start position to the far edges of an
+    image. The stamp is trimmed to its visible pixels; the start and
+    margins are adjusted so the cells keep their pitch.
+    """
+
+    """
+    Initialiser.
+
+    Args:
+        stamp: RGBA stamp image.
+        start: (x, y) position of the first cell.
+        margins: (horizontal, vertical) space between cells.
+        img_size: (width, height) of the watermarked image.
+    """
+    def __init__(self, stamp, start, margins, img_size):
+        self._stamp, offset = trim_stamp(stamp)
+        self._start = (start[0] + offset[0], start[1] + offset[1])
+        self._margins = (
+            margins[0] + stamp.size[0] - self._stamp.size[0],
+            margins[1] + stamp.size[1] - self._stamp.size[1])
+        self._img_size = img_size
+
+    """
+    Gets the trimmed stamp.
+
+    Returns:
+        RGBA stamp image.
+    """
+    def stamp(self):
+        return self._stamp
+
+    """
+    Gets the box bounding every cell that starts inside the image.
+
+    Returns:
+        (left, top, right, bottom) box or None if there are no cells.
+    """
+    def bbox(self):
+        img_width, img_height = self._img_size
+        start_x, start_y = self._start
+
+        if start_x >= img_width or start_y >= img_height:
+            return None
+
+        return (start_x, start_y,
+                img_width + self._stamp.size[0],
+                img_height + self._stamp.size[1])
+
+    """
+    Estimates the cost of pasting the cells directly onto an image, in
+    pixels blended; the row strips cover the rows but not the gaps
+    between them.
+
+    Returns:
+        Estimated cost.
+    """
+    def direct_cost(self):
+        bbox = self.bbox()
+        if bbox is None:
+            return 0
+
+        img_width, img_height = self._img_size
+        width = img_width - max(bbox[0], 0)
+        height = img_height - max(bbox[1], 0)
+        stamp_height = self._stamp.size[1]
+        return width * height * stamp_height \
+            // (stamp_height + self._margins[1])
+
+    """
+    Renders the cells onto a target.
+
+    Args:
+        target: Pillow Image to render onto.
+        origin: (x, y) position of the target's top left corner within
+        the watermarked image. Defaults to (0, 0).
+        blit: Function applying a layer to the target at a position.
+        Defaults to pasting with the layer's alpha as the mask.
+        img_size: Unused; the lattice already knows the size of the
+        watermarked image.
+    """
+    def render(self, target, origin=(0, 0), blit=paste_layer,
+               img_size=None):
+        start = (self._start[0] - origin[0], self._start[1] - origin[1])
+        paste_lattice(target, self._stamp, start, self._margins, blit)
+
+
+class RotatedLatticePlacement(object):
+    """
+    A lattice of stamps rotated as a whole, covering the image. The
+    rotated lattice is built one tile at a time on a grid fixed to the
+    image, so rendering a region only builds the tiles it crosses and
+    every region renders the same pixels as the whole image.
+    """
+
+    """
+    Initialiser.
+
+    Args:
+        stamp: Unrotated RGBA stamp image.
+        margins: (horizontal, vertical) space between cells.
+        img_size: (width, height) of the watermarked image.
+        degrees: Rotation of the lattice anticlockwise in degrees.
+    """
+    def __init__(self, stamp, margins, img_size, degrees):
+        self._stamp = stamp
+        self._margins = margins
+        self._img_size = img_size
+        self._degrees = degrees
+
+    """
+    Gets the unrotated stamp.
+
+    Returns:
+        RGBA stamp image.
+    """
+    def stamp(self):
+        return self._stamp
+
+    """
+    Gets the box bounding the lattice, i.e. the whole image.
+
+    Returns:
+        (left, top, right, bottom) box.
+    """
+    def bbox(self):
+        return (0, 0) + tuple(self._img_size)
+
+    """
+    Estimates the cost of pasting the lattice directly onto an image, in
+    pixels blended.
+
+    Returns:
+        Estimated cost.
+    """
+    def direct_cost(self):
+        return self._img_size[0] * self._img_size[1]
+
+    """
+    Renders the part of the lattice inside a target.
+
+    Args:
+        target: Pillow Image to render onto.
+        origin: (x, y) position of the target's top left corner within
+        the watermarked image. Defaults to (0, 0).
+        blit: Function applying a layer to the target at a position.
+        Defaults to pasting with the layer's alpha as the mask.
+        img_size: Unused; the lattice already knows the size of the
+        watermarked image.
+    """
+    def render(self, target, origin=(0, 0), blit=paste_layer,
+               img_size=None):
+        img_width, img_height = self._img_size
+        left, top = max(origin[0], 0), max(origin[1], 0)
+        right = min(origin[0] + target.size[0], img_width)
+        bottom = min(origin[1] + target.size[1], img_height)
+        tile = ROTATED_TILE_PIXELS
+
+        for tile_top in range(top - top % tile, bottom, tile):
+            for tile_left in range(left - left % tile, right, tile):
+                box = (tile_left, tile_top,
+                       min(tile_left + tile, img_width),
+                       min(tile_top + tile, img_height))
+                layer = rotated_lattice(self._stamp, self._margins,
+                                        self._img_size, self._degrees, box)
+                blit(target, layer,
+                     (tile_left - origin[0], tile_top - origin[1]))
@@ -0,0 +1,299 @@
+"""
+This code is copyrighted work by Paul Williams.
+Distributed under the BSD-3-Clause license available:
+    https://opensource.org/licenses/BSD-3-Clause
+"""
+
+
+from threading import Lock
+
+from PIL import Image
+
+from project.compositing import composite_layer
+from project.compositing import has_alpha
+from project.compositing import paste_layer
+from project.errors import WaterMarkerTypeError
+from project.errors import WaterMarkerValueError
+from project.overlay_cache import overlay_cache
+
+
+class WatermarkPlan(object):
+    """
+    Ordered watermark operations recorded for images of one size and
+    compiled into a single overlay, so applying a dense plan costs one
+    alpha composite however many operations it holds. A compiled plan
+    can be applied to every image with the same dimensions.
+    """
+
+    """
+    Initialiser.
+
+    Args:
+        img_size: (width, height) of the images the plan applies to.
+    """
+    def __init__(self, img_size):
+        self._img_size = tuple(img_size)
+        self._placements = []
+        self._operations = []
+        self._compiled = None
+        self._compile_lock = Lock()
+
+    """
+    Gets the size of the images the plan applies to.
+
+    Returns:
+        (width, height) tuple.
+    """
+    def img_size(self):
+        return self._img_size
+
+    """
+    Records an operation.
+
+    Args:
+        placement: Placement or LatticePlacement of the stamps to apply.
+        operation: Hashable description of the operation, or None if the
+        operation cannot be described reproducibly.
+
+    Returns:
+        Self; instance that received the invocation.
+    """
+    def add(self, placement, operation):
+        self._placements.append(placement)
+        self._operations.append(operation)
+        self._compiled = None
+        return self
+
+    """
+    Gets a hashable key identifying the plan, i.e. the image size and
+    the description of every operation.
+
+    Returns:
+        The key or None if any operation cannot be described
+        reproducibly.
+    """
+    def key(self):
+        if None in self._operations:
+            return None
+        return (self._img_size,) + tuple(self._operations)
+
+    """
+    Compiles the operations into one overlay cropped to the box bounding
+    every stamp inside the image. The overlay is kept until another
+    operation is recorded. Plans with a key share their overlay through
+    the overlay cache, so only the first plan of a size compiles it; the
+    overlay must not be modified. Concurrent calls compile only once.
+
+    Returns:
+        (overlay, (x, y)) tuple of the RGBA overlay and the position of its
+        top left corner, or None if no stamp lands on the image.
+    """
+    def compile(self):
+        with self._compile_lock:
+            if self._compiled is None:
+                key = self.key()
+                if key is not None:
+                    self._compiled = overlay_cache.peek(key)
+
+                if self._compiled is None:
+                    self._compiled = self._compile()
+                    if key is not None and self._compiled is not None:
+                        overlay_cache.put(key, self._compiled)
+
+            return self._compiled
+
+    """
+    Applies the plan to an image. The compiled overlay is composited
+    when blending its box costs less than pasting every stamp in turn;
+    otherwise, e.g. for a single operation, a few small stamps far apart
+    or an image with alpha, the stamps are pasted directly.
+
+    Args:
+        img: Pillow Image to watermark in place.
+
+    Returns:
+        The watermarked image.
+
+    Raises:
+        WaterMarkerTypeError: If the image is none or not a Pillow Image.
+        WaterMarkerValueError: If the image size differs from the plan.
+    """
+    def apply(self, img):
+        if img is None:
+            raise WaterMarkerTypeError(
+                "An image must be provided")
+
+        if not isinstance(img, Image.Image):
+            raise WaterMarkerTypeError(
+                "The image parameter must be a Pillow Image")
+
+        if img.size != self._img_size:
+            raise WaterMarkerValueError(
+                "The image size must match the size of the plan")
+
+        if self._bounds() is None:
+            return img
+
+        if not self.uses_overlay(img):
+            for placement in self._placements:
+                placement.render(img)
+            return img
+
+        compiled = self.compile()
+        if compiled is not None:
+            overlay, origin = compiled
+            paste_layer(img, overlay, origin)
+
+        return img
+
+    """
+    Renders the plan onto a region of an image, e.g. one tile of an
+    image too large to hold in memory. Every stamp is pasted in order,
+    deciding for the whole image whether scattered copies are
+    accumulated first, so the region matches the same region of the
+    whole image watermarked eagerly.
+
+    Args:
+        target: Pillow Image holding the region's pixels.
+        origin: (x, y) position of the region's top left corner within
+        the watermarked image.
+
+    Returns:
+        The target.
+    """
+    def render_region(self, target, origin):
+        right = origin[0] + target.size[0]
+        bottom = origin[1] + target.size[1]
+
+        for placement in self._placements:
+            bbox = placement.bbox()
+            if bbox is None \
+                    or bbox[0] >= right or bbox[2] <= origin[0] \
+                    or bbox[1] >= bottom or bbox[3] <= origin[1]:
+                continue
+
+            placement.render(target, origin, img_size=self._img_size)
+
+        return target
+
+    """
+    Applies the plan to a region of an image the way apply() applies it
+    to the whole image: through the compiled overlay when apply() would
+    use it, otherwise by pasting the stamps. Regions can be applied from
+    several threads at once, e.g. one band of a large image per thread.
+
+    Args:
+        target: Pillow Image holding the region's pixels.
+        origin: (x, y) position of the region's top left corner within
+        the watermarked image.
+
+    Returns:
+        The target.
+    """
+    def apply_region(self, target, origin):
+        if not self.uses_overlay(target):
+            return self.render_region(target, origin)
+
+        compiled = self.compile()
+        if compiled is not None:
+            overlay, (x, y) = compiled
+            paste_layer(target, overlay, (x - origin[0], y - origin[1]))
+        return target
+
+    """
+    Gets whether applying the plan composites the compiled overlay,
+    i.e. whether blending the overlay's box costs less than pasting
+    every stamp in turn. Images with alpha never use the overlay:
+    pasting it would blend their alpha differently from pasting each
+    stamp in turn.
+
+    Args:
+        img: Pillow Image, or region of one, the plan is applied to.
+        Defaults to none, for an image without alpha.
+
+    Returns:
+        True if the overlay is used; False if the stamps are pasted
+        directly or no stamp lands on the image.
+    """
+    def uses_overlay(self, img=None):
+        if img is not None and has_alpha(img):
+            return False
+
+        bounds = self._bounds()
+        return bounds is not None and len(self._placements) > 1 \
+            and _area(bounds) <= self._direct_cost()
+
+    def __len__(self):
+        return len(self._placements)
+
+    '''
+    Compiles the operations into one overlay.
+
+    Returns:
+        (overlay, (x, y)) tuple or None if no stamp lands on the image.
+    '''
+    def _compile(self):
+        bounds = self._bounds()
+        if bounds is None:
+            return None
+
+        left, top, right, bottom = bounds
+        transparent = (0, 0, 0, 0)
+        overlay = Image.new('RGBA', (right - left, bottom - top),
+                            transparent)
+
+        for placement in self._placements:
+            placement.render(overlay, (left, top), composite_layer)
+
+        return overlay, (left, top)
+
+    '''
+    Gets the box bounding every stamp inside the image.
+
+    Returns:
+        (left, top, right, bottom) box or None if no stamp lands on the
+        image.
+    '''
+    def _bounds(self):
+        img_width, img_height = self._img_size
+        left, top, right, bottom = img_width, img_height, 0, 0
+
+        for placement in self._placements:
+            bbox = placement.bbox()
+            if bbox is not None:
+                left = min(left, bbox[0])
+                top = min(top, bbox[1])
+                right = max(right, bbox[2])
+                bottom = max(bottom, bbox[3])
+
+        left, top = max(left, 0), max(top, 0)
+        right, bottom = min(right, img_width), min(bottom, img_height)
+
+        if left >= right or top >= bottom:
+            return None
+
+        return left, top, right, bottom
+
+    '''
+    Estimates the cost of pasting every stamp directly, in pixels
+    blended; each paste also carries a fixed overhead.
+
+    Returns:
+        Estimated cost.
+    '''
+    def _direct_cost(self):
+        return sum(placement.direct_cost()
+                   for placement in self._placements)
+
+
+'''
+Gets the area of a box.
+
+Args:
+    box: (left, top, right, bottom) box.
+
+Returns:
+    Area in pixels.
+'''
+def _area(box):
+    return (box[2] - box[0]) * (box[3] - box[1])
@@ -0,0 +1,276 @@
+"""
+This code is copyrighted work by Paul Williams.
+Distributed under the BSD-3-Clause license available:
+    https://opensource.org/licenses/BSD-3-Clause
+"""
+
+
+import numpy
+from PIL import Image
+
+from project.compositing import has_alpha
+from project.compositing import ink_colour
+from project.compositing import paste_layer
+from project.errors import WaterMarkerTypeError
+from project.errors import WaterMarkerValueError
+
+
+"""
+Bounding box pixels an overlay may cover per scattered copy before
+pasting the copies one by one becomes cheaper than building the overlay.
+"""
+OVERLAY_PIXELS_PER_COPY = 1024
+
+
+"""
+Creates a random number generator from a seed.
+
+Args:
+    seed: None for a freshly seeded generator, a non-negative integer
+    seed or an existing numpy Generator which is used as is.
+
+Returns:
+    numpy Generator.
+
+Raises:
+    WaterMarkerTypeError: If the seed is not None, an integer or a
+    numpy Generator.
+    WaterMarkerValueError: If the seed is a negative integer.
+"""
+def random_generator(seed):
+    if seed is None:
+        return numpy.random.default_rng()
+
+    if isinstance(seed, numpy.random.Generator):
+        return seed
+
+    if not isinstance(seed, int):
+        raise WaterMarkerTypeError(
+            "The seed must be an integer or a numpy Generator")
+
+    if seed < 0:
+        raise WaterMarkerValueError(
+            "The seed must be 0 (Zero) or greater")
+
+    return numpy.random.default_rng(seed)
+
+
+"""
+Generates random top left positions for the copies of a stamp.
+
+Args:
+    rng: numpy Generator to draw from.
+    quantity: Number of positions.
+    low: (x, y) lowest position, inclusive.
+    high: (x, y) highest position, inclusive.
+
+Returns:
+    Integer array of shape (quantity, 2) holding (x, y) rows.
+
+Raises:
+    WaterMarkerValueError: If the high position is less than the low
+    position, i.e. the stamp does not fit.
+"""
+def random_positions(rng, quantity, low, high):
+    if high[0] < low[0] or high[1] < low[1]:
+        raise WaterMarkerValueError(
+            "The watermark and margin do not fit inside the image")
+
+    return rng.integers(low, (high[0] + 1, high[1] + 1),
+                        size=(quantity, 2))
+
+
+"""
+Pastes copies of a stamp at many positions onto an image. When there
+are enough copies to pay for it, the copies are first accumulated into
+one overlay covering their bounding box, as if each copy had been pasted
+over the previous ones in order, and the overlay is pasted in a single
+alpha composite. The result matches pasting every copy separately up to
+rounding. A few copies spread over a large image are pasted one by one
+because blending their whole bounding box would cost more. Copies are
+also pasted one by one onto images with alpha, since pasting the
+overlay would blend their alpha differently from pasting each copy.
+
+Args:
+    img: Pillow Image to paste onto.
+    stamp: RGBA stamp image.
+    positions: Integer array of shape (N, 2) holding the (x, y) top left
+    position of each copy.
+    blit: Function applying a layer to the image at a position.
+    Defaults to pasting with the layer's alpha as the mask.
+    overlay: True to accumulate the copies into an overlay, False to
+    paste them one by one, e.g. as decided by uses_scattered_overlay for
+    the whole image when img is one region of it. Defaults to none,
+    deciding for img.
+"""
+def paste_scattered(img, stamp, positions, blit=paste_layer, overlay=None):
+    if len(positions) == 0:
+        return
+
+    positions = numpy.asarray(positions)
+    if overlay is None:
+        overlay = uses_scattered_overlay(img, stamp, positions, blit)
+
+    if not overlay:
+        for x, y in positions.tolist():
+            blit(img, stamp, (x, y))
+        return
+
+    left, top, right, bottom = _clipped_bounds(stamp, positions, img.size)
+    if left >= right or top >= bottom:
+        return
+
+    layer, origin = scattered_overlay(stamp, positions, img.size)
+    blit(img, layer, origin)
+
+
+"""
+Gets whether paste_scattered accumulates copies of a stamp into one
+overlay, i.e. whether blending the box bounding the copies costs less
+than pasting each copy, and pasting them would not blend the alpha of
+the image.
+
+Args:
+    img: Pillow Image, or region of one, pasted onto.
+    stamp: RGBA stamp image.
+    positions: Integer array of shape (N, 2) holding the (x, y) top left
+    position of each copy within the whole image.
+    blit: Function applying a layer to the image at a position.
+    Defaults to pasting with the layer's alpha as the mask.
+    img_size: (width, height) of the whole image. Defaults to the size
+    of img.
+
+Returns:
+    True if the copies are accumulated into an overlay.
+"""
+def uses_scattered_overlay(img, stamp, positions, blit=paste_layer,
+                           img_size=None):
+    if blit is paste_layer and has_alpha(img):
+        return False
+
+    if img_size is None:
+        img_size = img.size
+
+    positions = numpy.asarray(positions)
+    left, top, right, bottom = _clipped_bounds(stamp, positions, img_size)
+    area = max(right - left, 0) * max(bottom - top, 0)
+
+    return area <= len(positions) * OVERLAY_PIXELS_PER_COPY
+
+
+"""
+Accumulates copies of a stamp into one RGBA overlay covering the
+bounding box of the copies. When a clip size is given, the overlay only
+covers the part of the box inside it and copies crossing its border
+are cropped first, so no work is spent on pixels that are never seen.
+
+Args:
+    stamp: RGBA stamp image.
+    positions: Integer array of shape (N, 2) holding the (x, y) top left
+    position of each copy.
+    clip: (width, height) of the image the overlay is for. Defaults to
+    none, covering every copy whole.
+
+Returns:
+    (overlay, (x, y)) tuple of the RGBA overlay and the position of its
+    top left corner.
+"""
+def scattered_overlay(stamp, positions, clip=None):
+    pixels = numpy.asarray(stamp, dtype=numpy.float32) / 255.0
+    alpha = pixels[:, :, 3]
+
+    positions = numpy.asarray(positions)
+    left, top, right, bottom = _clipped_bounds(stamp, positions, clip)
+    width = right - left
+    height = bottom - top
+    regions = _copy_regions(stamp.size, positions - (left, top),
+                            (width, height))
+
+    colour = ink_colour(stamp)
+    transparency = 1.0 - alpha
+
+    transmittance = numpy.ones((height, width), dtype=numpy.float32)
+
+    if colour is not None:
+        for target, source in regions:
+            transmittance[target] *= transparency[source]
+
+        overlay = Image.new('RGBA', (width, height), colour + (0,))
+    else:
+        ink = pixels[:, :, :3] * alpha[:, :, None]
+        premultiplied = numpy.zeros((height, width, 3), dtype=numpy.float32)
+
+        for target, source in regions:
+            premultiplied[target] *= transparency[source][:, :, None]
+            premultiplied[target] += ink[source]
+            transmittance[target] *= transparency[source]
+
+        covered = transmittance < 1.0
+        straight = numpy.zeros((height, width, 3), dtype=numpy.uint8)
+        straight[covered] = numpy.rint(
+            premultiplied[covered] * 255.0
+            / (1.0 - transmittance[covered, None]))
+        overlay = Image.fromarray(straight, 'RGB').convert('RGBA')
+
+    coverage = numpy.subtract(1.0, transmittance, out=transmittance)
+    coverage *= 255.0
+    coverage = numpy.rint(coverage, out=coverage).astype(numpy.uint8)
+    overlay.putalpha(Image.fromarray(coverage, 'L'))
+
+    return overlay, (int(left), int(top))
+
+
+'''
+Gets the box bounding copies of a stamp, clipped to an image.
+
+Args:
+    stamp: RGBA stamp image.
+    positions: Integer array of shape (N, 2) of copy positions.
+    clip: (width, height) of the image or None to not clip.
+
+Returns:
+    (left, top, right, bottom) box; empty if no copy is visible.
+'''
+def _clipped_bounds(stamp, positions, clip):
+    left, top = positions.min(axis=0).tolist()
+    right, bottom = (positions.max(axis=0) + stamp.size).tolist()
+
+    if clip is not None:
+        left, top = max(left, 0), max(top, 0)
+        right, bottom = min(right, clip[0]), min(bottom, clip[1])
+
+    return left, top, right, bottom
+
+
+'''
+Works out which part of an overlay each copy covers and which part of
+the stamp lands there, cropping copies that cross the overlay's border
+and skipping those that miss it.
+
+Args:
+    stamp_size: (width, height) of the stamp.
+    offsets: Integer array of shape (N, 2) of copy positions relative to
+    the overlay.
+    size: (width, height) of the overlay.
+
+Returns:
+    List of (overlay slices, stamp slices) tuples in copy order.
+'''
+def _copy_regions(stamp_size, offsets, size):
+    stamp_width, stamp_height = stamp_size
+    width, height = size
+    regions = []
+
+    for x, y in offsets.tolist():
+        left, top = max(x, 0), max(y, 0)
+        right = min(x + stamp_width, width)
+        bottom = min(y + stamp_height, height)
+
+        if left >= right or top >= bottom:
+            continue
+
+        regions.append(((slice(top, bottom), slice(left, right)),
+                        (slice(top - y, bottom - y),
+                         slice(left - x, right - x))))
+
+    return regions
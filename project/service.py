@@ -0,0 +1,671 @@
+#!/usr/bin/env python
+
+"""
+This code is copyrighted work by Paul Williams.
+Distributed under the BSD-3-Clause license available:
+    https://opensource.org/licenses/BSD-3-Clause
+"""
+
+
+import json
+import shutil
+import sys
+from argparse import ArgumentParser
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+from tempfile import SpooledTemporaryFile
+from threading import BoundedSemaphore
+from threading import Lock
+from timeit import default_timer
+from urllib.parse import parse_qs
+from urllib.parse import urlsplit
+
+import numpy
+from PIL import Image
+
+from project.cli import open_for_watermarking
+from project.errors import WaterMarkerTypeError
+from project.errors import WaterMarkerValueError
+from project.spec import apply_spec
+from project.spec import load_spec
+from project.spec import validate_spec
+from project.spec import warm_spec
+from project.stamp_cache import stamp_cache
+from project.stamp_store import StampStore
+from project.textual_water_marker import TextualWaterMarker
+
+
+"""
+Request header carrying the JSON spec of a request.
+"""
+SPEC_HEADER = "X-Watermark-Spec"
+
+
+"""
+Bytes copied per read or write when streaming bodies.
+"""
+COPY_BUFFER_BYTES = 64 * 1024
+
+
+"""
+Content types of the output formats, by Pillow format name.
+"""
+CONTENT_TYPES = {
+    "BMP": "image/bmp",
+    "GIF": "image/gif",
+    "JPEG": "image/jpeg",
+    "PNG": "image/png",
+    "PPM": "image/x-portable-pixmap",
+    "TIFF": "image/tiff",
+    "WEBP": "image/webp",
+}
+
+
+class ServiceMetrics(object):
+    """
+    Thread-safe counters of a WatermarkService: requests by outcome, the
+    number of submitted requests waiting for and held by workers, and the
+    latency of recent requests.
+    """
+
+    """
+    Initialiser.
+
+    Args:
+        window: Number of recent latencies kept for the percentiles.
+        Defaults to 1024.
+    """
+    def __init__(self, window=1024):
+        self._lock = Lock()
+        self._outcomes = {"ok": 0, "rejected": 0, "client_error": 0,
+                          "server_error": 0}
+        self._queued = 0
+        self._running = 0
+        self._latencies = deque(maxlen=window)
+        self._latency_sum = 0.0
+        self._latency_count = 0
+
+    """
+    Counts a request submitted to the workers.
+    """
+    def queued(self):
+        with self._lock:
+            self._queued += 1
+
+    """
+    Counts a queued request picked up by a worker.
+    """
+    def started(self):
+        with self._lock:
+            self._queued -= 1
+            self._running += 1
+
+    """
+    Counts a request finished by a worker.
+    """
+    def stopped(self):
+        with self._lock:
+            self._running -= 1
+
+    """
+    Counts a request that has been answered.
+
+    Args:
+        outcome: 'ok', 'rejected', 'client_error' or 'server_error'.
+        seconds: Time from receiving the request to answering it.
+    """
+    def answered(self, outcome, seconds):
+        with self._lock:
+            self._outcomes[outcome] += 1
+            if outcome != "rejected":
+                self._latencies.append(seconds)
+                self._latency_sum += seconds
+                self._latency_count += 1
+
+    """
+    Gets the number of requests waiting for a worker.
+
+    Returns:
+        Queue depth.
+    """
+    def queue_depth(self):
+        with self._lock:
+            return self._queued
+
+    """
+    Gets the number of requests answered with an outcome.
+
+    Args:
+        outcome: 'ok', 'rejected', 'client_error' or 'server_error'.
+
+    Returns:
+        Request count.
+    """
+    def count(self, outcome):
+        with self._lock:
+            return self._outcomes[outcome]
+
+    """
+    Renders the counters in the Prometheus text format.
+
+    Args:
+        capacity: Number of requests the service admits at once.
+
+    Returns:
+        Metrics text.
+    """
+    def render(self, capacity):
+        with self._lock:
+            outcomes = dict(self._outcomes)
+            queued, running = self._queued, self._running
+            latencies = list(self._latencies)
+            latency_sum, latency_count = \
+                self._latency_sum, self._latency_count
+
+        lines = ["# TYPE watermark_requests_total counter"]
+        for outcome, count in outcomes.items():
+            lines.append('watermark_requests_total{{outcome="{}"}} {}'
+                         .format(outcome, count))
+
+        lines.append("# TYPE watermark_queue_depth gauge")
+        lines.append("watermark_queue_depth {}".format(queued))
+        lines.append("# TYPE watermark_in_flight gauge")
+        lines.append("watermark_in_flight {}".format(running))
+        lines.append("# TYPE watermark_capacity gauge")
+        lines.append("watermark_capacity {}".format(capacity))
+
+        lines.append("# TYPE watermark_latency_seconds summary")
+        if len(latencies) > 0:
+            quantiles = numpy.percentile(latencies, [50, 95, 99])
+            for quantile, seconds in zip(("0.5", "0.95", "0.99"),
+                                         quantiles):
+                lines.append(
+                    'watermark_latency_seconds{{quantile="{}"}} {:.6f}'
+                    .format(quantile, seconds))
+        lines.append("watermark_latency_seconds_sum {:.6f}"
+                     .format(latency_sum))
+        lines.append("watermark_latency_seconds_count {}"
+                     .format(latency_count))
+
+        return "\n".join(lines) + "\n"
+
+
+class WatermarkService(object):
+    """
+    Watermarks images posted over HTTP on a pool of worker threads. The
+    threads share the process's font, glyph and stamp caches, so once
+    warm no request renders a stamp another has rendered. A bounded
+    number of requests is admitted at once, those being worked on plus a
+    queue; beyond that requests are answered 503 without reading their
+    bodies. Bodies are streamed through spooled temporary files that
+    move to disk when large, so an upload is held at most once.
+    """
+
+    """
+    Initialiser.
+
+    Args:
+        spec: Spec applied to requests without a spec header. Defaults to
+        none, so every request must carry one.
+        workers: Number of worker threads. Defaults to 4.
+        queue_size: Number of admitted requests that may wait for a
+        worker. Defaults to 16.
+        max_body_bytes: Largest accepted upload. Defaults to 256MiB.
+        spool_bytes: Body size above which bodies are spooled to disk.
+        Defaults to 8MiB.
+
+    Raises:
+        WaterMarkerTypeError: If a count or size is not an integer.
+        WaterMarkerValueError: If the workers or a size is less than 1,
+        or the queue size is negative.
+    """
+    def __init__(self, spec=None, workers=4, queue_size=16,
+                 max_body_bytes=256 * 1024 * 1024,
+                 spool_bytes=8 * 1024 * 1024):
+
+        for name, value, minimum in (("workers", workers, 1),
+                                     ("queue size", queue_size, 0),
+                                     ("maximum body size",
+                                      max_body_bytes, 1),
+                                     ("spool size", spool_bytes, 1)):
+            if not isinstance(value, int):
+                raise WaterMarkerTypeError(
+                    "The {} must be an integer".format(name))
+            if value < minimum:
+                raise WaterMarkerValueError(
+                    "The {} must be {} or greater".format(name, minimum))
+
+        if spec is not None:
+            validate_spec(spec)
+
+        self._spec = spec
+        self._workers = workers
+        self._capacity = workers + queue_size
+        self._max_body_bytes = max_body_bytes
+        self._spool_bytes = spool_bytes
+        self._admission = BoundedSemaphore(self._capacity)
+        self._executor = ThreadPoolExecutor(max_workers=workers,
+                                            thread_name_prefix="watermark")
+        self._metrics = ServiceMetrics()
+
+    """
+    Renders the stamps of the default spec and starts every worker
+    thread, so the first requests do not pay for either.
+
+    Returns:
+        Self; instance that received the invocation.
+    """
+    def warm(self):
+        if self._spec is not None:
+            warm_spec(TextualWaterMarker(Image.new('RGB', (1, 1))),
+                      self._spec)
+
+        ready = [self._executor.submit(lambda: None)
+                 for _ in range(self._workers)]
+        for future in ready:
+            future.result()
+
+        return self
+
+    """
+    Gets the spec applied to requests without a spec header.
+
+    Returns:
+        The spec or None.
+    """
+    def spec(self):
+        return self._spec
+
+    """
+    Gets the number of requests admitted at once.
+
+    Returns:
+        Workers plus queue size.
+    """
+    def capacity(self):
+        return self._capacity
+
+    """
+    Gets the largest accepted upload.
+
+    Returns:
+        Size in bytes.
+    """
+    def max_body_bytes(self):
+        return self._max_body_bytes
+
+    """
+    Gets the service counters.
+
+    Returns:
+        The ServiceMetrics.
+    """
+    def metrics(self):
+        return self._metrics
+
+    """
+    Admits a request if there is room for it.
+
+    Returns:
+        True if admitted, in which case release() must follow.
+    """
+    def admit(self):
+        return self._admission.acquire(blocking=False)
+
+    """
+    Frees the room of an admitted request.
+    """
+    def release(self):
+        self._admission.release()
+
+    """
+    Creates the file a body is streamed into.
+
+    Returns:
+        SpooledTemporaryFile.
+    """
+    def spool(self):
+        return SpooledTemporaryFile(max_size=self._spool_bytes)
+
+    """
+    Watermarks an admitted request's image on a worker thread.
+
+    Args:
+        body: Readable file holding the encoded image.
+        spec: Valid spec to apply.
+        output_format: Pillow format name of the output, or None for the
+        format of the input.
+
+    Returns:
+        Future of a (file holding the encoded output, Pillow format name)
+        tuple.
+    """
+    def submit(self, body, spec, output_format=None):
+        self._metrics.queued()
+        return self._executor.submit(self._watermark, body, spec,
+                                     output_format)
+
+    """
+    Stops the worker threads once the admitted requests are done.
+    """
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+
+    '''
+    Watermarks one image.
+
+    Returns:
+        (file holding the encoded output, Pillow format name) tuple.
+    '''
+    def _watermark(self, body, spec, output_format):
+        self._metrics.started()
+        try:
+            with Image.open(body) as image:
+                output_format = output_format or image.format
+                image = open_for_watermarking(image)
+
+            apply_spec(TextualWaterMarker(image).defer(True), spec).collect()
+
+            if output_format == "JPEG" and image.mode != 'RGB':
+                image = image.convert('RGB')
+
+            output = self.spool()
+            image.save(output, output_format)
+            output.seek(0)
+            return output, output_format
+        finally:
+            self._metrics.stopped()
+
+
+class WatermarkRequestHandler(BaseHTTPRequestHandler):
+    """
+    Answers POST /watermark with the posted image watermarked, GET
+    /metrics with the service counters and GET /health with 'ok'. The
+    spec is given as JSON in the X-Watermark-Spec header and the output
+    format, defaulting to the input's, in a format query parameter.
+    """
+
+    protocol_version = "HTTP/1.1"
+    service = None
+
+    def do_GET(self):
+        path = urlsplit(self.path).path
+
+        if path == "/metrics":
+            text = self.service.metrics().render(self.service.capacity())
+            self._send_text(200, text,
+                            "text/plain; version=0.0.4; charset=utf-8")
+        elif path == "/health":
+            self._send_text(200, "ok\n")
+        else:
+            self._send_text(404, "Not found\n")
+
+    def do_POST(self):
+        started = default_timer()
+        url = urlsplit(self.path)
+
+        if url.path != "/watermark":
+            self._reject_body(404, "Not found\n")
+            return
+
+        try:
+            length, spec, output_format = self._parse_request(url)
+        except _RequestError as error:
+            self._answered("client_error", started)
+            self._reject_body(error.status, str(error) + "\n")
+            return
+
+        if not self.service.admit():
+            self._answered("rejected", started)
+            self._reject_body(503, "Too many requests are queued\n",
+                              {"Retry-After": "1"})
+            return
+
+        try:
+            outcome = self._watermark(length, spec, output_format)
+        finally:
+            self.service.release()
+
+        self._answered(outcome, started)
+
+    def log_message(self, format, *args):
+        pass
+
+    '''
+    Reads the length, spec and output format of a POST request.
+
+    Returns:
+        (body length, spec, output format) tuple.
+
+    Raises:
+        _RequestError: If any of them is missing or invalid.
+    '''
+    def _parse_request(self, url):
+        length = self.headers.get("Content-Length")
+        if length is None:
+            raise _RequestError(411, "A Content-Length is required")
+
+        try:
+            length = int(length)
+        except ValueError:
+            raise _RequestError(400, "The Content-Length is not a number")
+
+        if length < 1:
+            raise _RequestError(400, "An image must be posted")
+
+        if length > self.service.max_body_bytes():
+            raise _RequestError(413, "The image is too large")
+
+        spec = self.service.spec()
+        header = self.headers.get(SPEC_HEADER)
+        if header is not None:
+            try:
+                spec = json.loads(header)
+                validate_spec(spec)
+            except (ValueError, WaterMarkerTypeError) as error:
+                raise _RequestError(400, "Invalid spec: {}".format(error))
+
+        if spec is None:
+            raise _RequestError(
+                400, "A spec must be given in the {} header"
+                .format(SPEC_HEADER))
+
+        output_format = None
+        formats = parse_qs(url.query).get("format")
+        if formats:
+            output_format = formats[-1].upper()
+            if output_format == "JPG":
+                output_format = "JPEG"
+            if output_format not in CONTENT_TYPES:
+                raise _RequestError(400, "Unknown output format '{}'"
+                                    .format(formats[-1]))
+
+        return length, spec, output_format
+
+    '''
+    Streams the body to a worker and the result back to the client.
+
+    Returns:
+        Outcome of the request.
+    '''
+    def _watermark(self, length, spec, output_format):
+        with self.service.spool() as body:
+            remaining = length
+            while remaining > 0:
+                chunk = self.rfile.read(min(COPY_BUFFER_BYTES, remaining))
+                if not chunk:
+                    self.close_connection = True
+                    return "client_error"
+                body.write(chunk)
+                remaining -= len(chunk)
+            body.seek(0)
+
+            try:
+                output, output_format = \
+                    self.service.submit(body, spec, output_format).result()
+            except (WaterMarkerTypeError, WaterMarkerValueError) as error:
+                self._send_text(400, "Invalid spec: {}\n".format(error))
+                return "client_error"
+            except OSError as error:
+                self._send_text(400, "Unreadable image: {}\n".format(error))
+                return "client_error"
+            except Exception as error:
+                self._send_text(500, "Watermarking failed: {}\n"
+                                .format(error))
+                return "server_error"
+
+        with output:
+            output.seek(0, 2)
+            size = output.tell()
+            output.seek(0)
+
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPES[output_format])
+            self.send_header("Content-Length", str(size))
+            self.end_headers()
+            shutil.copyfileobj(output, self.wfile, COPY_BUFFER_BYTES)
+
+        return "ok"
+
+    '''
+    Answers without reading the request body; the connection is closed
+    since the unread body cannot be skipped.
+    '''
+    def _reject_body(self, status, text, headers=None):
+        self.close_connection = True
+        self._send_text(status, text, headers=headers)
+
+    '''
+    Sends a text response.
+    '''
+    def _send_text(self, status, text,
+                   content_type="text/plain; charset=utf-8", headers=None):
+        body = text.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        if self.close_connection:
+            self.send_header("Connection", "close")
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    '''
+    Counts an answered request.
+    '''
+    def _answered(self, outcome, started):
+        self.service.metrics().answered(outcome, default_timer() - started)
+
+
+class _RequestError(Exception):
+    '''
+    Invalid request, answered with its status.
+    '''
+
+    def __init__(self, status, message):
+        super(_RequestError, self).__init__(message)
+        self.status = status
+
+
+"""
+Creates an HTTP server for a service. The server handles each
+connection on its own thread; serve_forever() starts it.
+
+Args:
+    service: WatermarkService answering the requests.
+    host: Address to listen on. Defaults to 127.0.0.1.
+    port: Port to listen on; 0 picks a free port. Defaults to 8080.
+
+Returns:
+    ThreadingHTTPServer.
+"""
+def make_server(service, host="127.0.0.1", port=8080):
+    handler = type("BoundWatermarkRequestHandler",
+                   (WatermarkRequestHandler,), {"service": service})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+"""
+Parses the command line arguments.
+
+Args:
+    argv: Arguments excluding the program name.
+
+Returns:
+    argparse Namespace.
+"""
+def parse_args(argv):
+    parser = ArgumentParser(
+        prog="python -m project.service",
+        description="Serves watermarking over HTTP")
+    parser.add_argument("--host", default="127.0.0.1",
+                        help="address to listen on")
+    parser.add_argument("-p", "--port", type=int, default=8080,
+                        help="port to listen on")
+    parser.add_argument("-s", "--spec", default=None,
+                        help="default spec as a JSON file or inline JSON")
+    parser.add_argument("-w", "--workers", type=int, default=4,
+                        help="worker threads")
+    parser.add_argument("-q", "--queue-size", type=int, default=16,
+                        help="requests that may wait for a worker before"
+                             " new ones are answered 503")
+    parser.add_argument("--max-body-mb", type=int, default=256,
+                        help="largest accepted upload in MiB")
+    parser.add_argument("--stamp-store", default=None,
+                        help="directory to share rendered stamps through"
+                             " across runs")
+    args = parser.parse_args(argv)
+
+    if args.workers < 1:
+        parser.error("--workers must be 1 or greater")
+
+    if args.queue_size < 0:
+        parser.error("--queue-size must be 0 or greater")
+
+    if args.max_body_mb < 1:
+        parser.error("--max-body-mb must be 1 or greater")
+
+    return args
+
+
+"""
+Runs the service until interrupted.
+
+Args:
+    argv: Arguments excluding the program name. Defaults to sys.argv.
+
+Returns:
+    Exit status.
+"""
+def main(argv=None):
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+
+    if args.stamp_store is not None:
+        stamp_cache.use_store(StampStore(args.stamp_store))
+
+    spec = None if args.spec is None else load_spec(args.spec)
+    service = WatermarkService(spec, workers=args.workers,
+                               queue_size=args.queue_size,
+                               max_body_bytes=args.max_body_mb * 1024 * 1024)
+    service.warm()
+
+    server = make_server(service, args.host, args.port)
+    print("Serving on http://{}:{}".format(*server.server_address[:2]))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.shutdown()
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,236 @@
+"""
+This code is copyrighted work by Paul Williams.
+Distributed under the BSD-3-Clause license available:
+    https://opensource.org/licenses/BSD-3-Clause
+"""
+
+
+import os
+from collections import deque
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from multiprocessing import shared_memory
+
+import numpy
+from PIL import Image
+
+from project.cli import init_worker
+from project.cli import open_for_watermarking
+from project.cli import worker_spec
+from project.errors import WaterMarkerTypeError
+from project.errors import WaterMarkerValueError
+from project.spec import apply_spec
+from project.spec import validate_spec
+from project.textual_water_marker import TextualWaterMarker
+
+
+"""
+Describes an image held in a shared memory block; this is all that is
+sent to a worker process.
+
+Fields:
+    name: Name of the shared memory block.
+    mode: Mode of the image, 'RGB' or 'RGBA'.
+    size: (width, height) of the image.
+"""
+SharedImage = namedtuple("SharedImage", "name mode size")
+
+
+"""
+Modes the pixels of each image mode are stored in. Pillow keeps RGB
+pixels four bytes wide, so they are stored as RGBX and Pillow can use
+the block as the image's own memory.
+"""
+_STORAGE_MODES = {"RGB": "RGBX", "RGBA": "RGBA"}
+
+
+"""
+Copies an image into a new shared memory block. The caller owns the
+block and must close and unlink it once the image has been read back.
+
+Args:
+    image: Pillow Image; images not in RGB or RGBA are converted.
+
+Returns:
+    (SharedMemory, SharedImage) tuple.
+
+Raises:
+    WaterMarkerTypeError: If the image is none or not a Pillow Image.
+"""
+def share_image(image):
+    if not isinstance(image, Image.Image):
+        raise WaterMarkerTypeError(
+            "The image must be a Pillow Image")
+
+    image = open_for_watermarking(image)
+    width, height = image.size
+    block = shared_memory.SharedMemory(create=True,
+                                       size=max(1, width * height * 4))
+
+    try:
+        pixels = numpy.ndarray((height, width, 4), numpy.uint8, block.buf)
+        source = numpy.asarray(image)
+        pixels[:, :, :source.shape[2]] = source
+        if source.shape[2] == 3:
+            pixels[:, :, 3] = 255
+        del pixels, source
+    except BaseException:
+        block.close()
+        block.unlink()
+        raise
+
+    return block, SharedImage(block.name, image.mode, image.size)
+
+
+"""
+Attaches to a shared image and gives a Pillow Image whose pixels are
+the shared memory itself, so pasting onto it writes straight into the
+block. RGB images are given in RGBX mode. The image must not be used
+once the context exits.
+
+Args:
+    shared: SharedImage to attach to.
+
+Returns:
+    Context manager giving the Pillow Image.
+"""
+@contextmanager
+def attach_image(shared):
+    block = shared_memory.SharedMemory(name=shared.name)
+    image = _view(block, shared)
+    try:
+        yield image
+    finally:
+        image.close()
+        del image
+        block.close()
+
+
+"""
+Reads a shared image back into an image of its own memory.
+
+Args:
+    block: SharedMemory holding the image.
+    shared: SharedImage describing it.
+
+Returns:
+    Pillow Image in the shared image's mode.
+"""
+def read_image(block, shared):
+    view = _view(block, shared)
+    try:
+        if view.mode == shared.mode:
+            return view.copy()
+        return view.convert(shared.mode)
+    finally:
+        view.close()
+        del view
+
+
+"""
+Watermarks images on a pool of worker processes without pickling their
+pixels. Each image is copied into a shared memory block, the workers
+watermark the block in place and the result is copied back out, so only
+the block's name and the spec cross between processes. At most two
+blocks per worker are alive at once.
+
+Args:
+    images: Iterable of Pillow Images; it is only read as results are
+    consumed.
+    spec: Valid spec dictionary applied to every image.
+    workers: Number of worker processes. Defaults to the number of CPUs.
+    stamp_store: Directory of a StampStore the workers share rendered
+    stamps through. Defaults to none.
+
+Returns:
+    Generator of the watermarked images in input order, each RGB or
+    RGBA.
+
+Raises:
+    WaterMarkerTypeError: If the spec is invalid or an image is not a
+    Pillow Image.
+    WaterMarkerValueError: If the spec is invalid or the worker count is
+    less than 1.
+"""
+def watermark_shared(images, spec, workers=None, stamp_store=None):
+    validate_spec(spec)
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    if workers < 1:
+        raise WaterMarkerValueError(
+            "The worker count must be 1 or greater")
+
+    return _watermarked(iter(images), spec, workers, stamp_store)
+
+
+'''
+Watermarks a shared image in place with the worker's spec.
+'''
+def _watermark_shared(shared):
+    with attach_image(shared) as image:
+        apply_spec(TextualWaterMarker(image).defer(True),
+                   worker_spec()).collect()
+
+
+'''
+Generates the watermarked images of watermark_shared.
+'''
+def _watermarked(images, spec, workers, stamp_store):
+    with ProcessPoolExecutor(max_workers=workers,
+                             initializer=init_worker,
+                             initargs=(spec, stamp_store)) as executor:
+
+        limit = 2 * workers
+        pending = deque()
+
+        try:
+            while True:
+                while len(pending) < limit:
+                    image = next(images, None)
+                    if image is None:
+                        break
+                    block, shared = share_image(image)
+                    pending.append((block, shared, executor.submit(
+                        _watermark_shared, shared)))
+
+                if len(pending) == 0:
+                    return
+
+                block, shared, future = pending.popleft()
+                try:
+                    future.result()
+                    result = read_image(block, shared)
+                finally:
+                    _release(block)
+
+                yield result
+        finally:
+            for block, _, future in pending:
+                future.cancel()
+                try:
+                    future.result()
+                except BaseException:
+                    pass
+                _release(block)
+
+
+'''
+Creates a Pillow Image on the memory of a shared memory block.
+'''
+def _view(block, shared):
+    storage_mode = _STORAGE_MODES[shared.mode]
+    image = Image.frombuffer(storage_mode, shared.size, block.buf, "raw",
+                             storage_mode, 0, 1)
+    image.readonly = 0
+    return image
+
+
+'''
+Closes and removes a shared memory block.
+'''
+def _release(block):
+    block.close()
+    block.unlink()
@@ -0,0 +1,355 @@
+"""
+This code is copyrighted work by Paul Williams.
+Distributed under the BSD-3-Clause license available:
+    https://opensource.org/licenses/BSD-3-Clause
+"""
+
+
+import json
+
+from PIL import Image
+
+from project.errors import WaterMarkerTypeError
+from project.errors import WaterMarkerValueError
+from project.textual_water_marker import Corner
+from project.textual_water_marker import Edge
+from project.textual_water_marker import TextualWaterMarker
+
+
+"""
+Style keys of a spec mapped to the TextualWaterMarker setter they call.
+"""
+STYLE_SETTERS = {
+    "font": "font",
+    "size": "size",
+    "colour": "colour",
+    "rotation": "rotation",
+    "reverse": "reverse",
+    "margin": "margin",
+}
+
+
+"""
+Apply names of a spec mapped to the TextualWaterMarker method they call
+and the spec keys of that method's arguments after the text. Keys in
+brackets are optional.
+"""
+OPERATIONS = {
+    "centre": ("apply_centre", ()),
+    "corner": ("apply_corner", ("corner",)),
+    "edge": ("apply_edge", ("edge",)),
+    "absolute": ("apply_absolute", ("x", "y")),
+    "percent": ("apply_percent", ("x", "y")),
+    "random": ("apply_random", ("[quantity]", "[seed]")),
+    "lattice": ("apply_lattice", ("horizontal_margin",
+                                  "vertical_margin",
+                                  "[horizontal_start_margin]",
+                                  "[vertical_start_margin]")),
+    "rotated_lattice": ("apply_rotated_lattice", ("horizontal_margin",
+                                                  "vertical_margin")),
+}
+
+
+"""
+Size of the image a spec is checked against; large enough for any
+watermark to fit, so only the spec itself can fail the check.
+"""
+CHECK_IMAGE_SIZE = (1 << 16, 1 << 16)
+
+
+_CORNERS = {
+    "top_left": Corner.top_left(),
+    "top_right": Corner.top_right(),
+    "bottom_left": Corner.bottom_left(),
+    "bottom_right": Corner.bottom_right(),
+}
+
+_EDGES = {
+    "left": Edge.left(),
+    "right": Edge.right(),
+    "top": Edge.top(),
+    "bottom": Edge.bottom(),
+}
+
+
+"""
+Loads a spec from a JSON file or from inline JSON text.
+
+A spec is a JSON object holding optional style keys (font, size,
+colour, rotation, reverse and margin) and a list of operations. Each
+operation names its apply method, e.g. {"apply": "corner", "text":
+"(c) ACME", "corner": "bottom_right"}, and may carry style keys which
+are set before it is applied and stay set for later operations, just
+like the fluent setters.
+
+Args:
+    source: Path of a JSON file, or JSON text starting with '{'.
+
+Returns:
+    The spec as a dictionary.
+
+Raises:
+    WaterMarkerTypeError: If the source is none or not a string.
+    WaterMarkerValueError: If the source is not valid JSON or is not a
+    valid spec.
+    OSError: If the file cannot be read.
+"""
+def load_spec(source):
+    if source is None:
+        raise WaterMarkerTypeError(
+            "A spec file or JSON text must be provided")
+
+    if not isinstance(source, str):
+        raise WaterMarkerTypeError(
+            "The spec source must be a string")
+
+    try:
+        if source.lstrip().startswith("{"):
+            spec = json.loads(source)
+        else:
+            with open(source) as spec_file:
+                spec = json.load(spec_file)
+    except ValueError as error:
+        raise WaterMarkerValueError(
+            "The spec is not valid JSON: {}".format(error))
+
+    validate_spec(spec)
+    return spec
+
+
+"""
+Validates the structure of a spec. Style values and operation arguments
+are validated by TextualWaterMarker when the spec is applied.
+
+Args:
+    spec: Spec dictionary.
+
+Raises:
+    WaterMarkerTypeError: If the spec, its operations or an operation
+    is not of the correct type.
+    WaterMarkerValueError: If the spec has unknown keys, no operations,
+    an unknown apply name or is missing an operation argument.
+"""
+def validate_spec(spec):
+    if not isinstance(spec, dict):
+        raise WaterMarkerTypeError(
+            "The spec must be a JSON object")
+
+    for key in spec:
+        if key != "operations" and key not in STYLE_SETTERS:
+            raise WaterMarkerValueError(
+                "Unknown spec key '{}'".format(key))
+
+    operations = spec.get("operations")
+    if not isinstance(operations, list):
+        raise WaterMarkerTypeError(
+            "The spec operations must be a list")
+
+    if len(operations) == 0:
+        raise WaterMarkerValueError(
+            "The spec must have at least one operation")
+
+    for operation in operations:
+        _validate_operation(operation)
+
+
+"""
+Applies a spec to a water marker.
+
+Args:
+    water_marker: TextualWaterMarker to apply the spec with.
+    spec: Valid spec dictionary.
+
+Returns:
+    The water marker; collect() gets the watermarked image.
+
+Raises:
+    WaterMarkerTypeError: If a style value or operation argument is not
+    of the correct type.
+    WaterMarkerValueError: If a style value or operation argument is not
+    a valid value.
+"""
+def apply_spec(water_marker, spec):
+    apply_style(water_marker, spec)
+
+    for operation in spec["operations"]:
+        apply_style(water_marker, operation)
+
+        method, keys = OPERATIONS[operation["apply"]]
+        args = [operation["text"]]
+        kwargs = {}
+
+        for key in keys:
+            if key.startswith("["):
+                name = key[1:-1]
+                if name in operation:
+                    kwargs[name] = _argument(name, operation[name])
+            else:
+                args.append(_argument(key, operation[key]))
+
+        getattr(water_marker, method)(*args, **kwargs)
+
+    return water_marker
+
+
+"""
+Renders and caches every stamp of a spec, and so loads its fonts,
+without applying anything. Used to warm up worker processes.
+
+Args:
+    water_marker: TextualWaterMarker used to render the stamps; its style
+    is changed by the spec.
+    spec: Valid spec dictionary.
+"""
+def warm_spec(water_marker, spec):
+    apply_style(water_marker, spec)
+
+    for operation in spec["operations"]:
+        apply_style(water_marker, operation)
+        water_marker.warm(operation["text"])
+
+
+"""
+Checks every style value and operation argument of a spec by applying
+it, deferred, as if to an image large enough for any watermark to fit.
+Nothing is composited; the stamps are rendered and cached as by
+warm_spec. Errors that depend on an image, such as a watermark not
+fitting inside it, are left to the images themselves.
+
+Args:
+    spec: Valid spec dictionary.
+
+Raises:
+    WaterMarkerTypeError: If a style value or operation argument is not
+    of the correct type.
+    WaterMarkerValueError: If a style value or operation argument is not
+    valid.
+    OSError: If a font of the spec cannot be loaded.
+"""
+def check_spec(spec):
+    apply_spec(_CheckingWaterMarker(), spec)
+
+
+"""
+Serializes a spec canonically so equal specs give equal text.
+
+Args:
+    spec: Spec dictionary.
+
+Returns:
+    Canonical JSON text.
+"""
+def canonical_spec(spec):
+    return json.dumps(spec, sort_keys=True, separators=(",", ":"))
+
+
+"""
+Sets any style keys of a spec or operation on a water marker.
+
+Args:
+    water_marker: TextualWaterMarker to style.
+    values: Spec or operation dictionary.
+
+Raises:
+    WaterMarkerTypeError: If a style value is not of the correct type.
+    WaterMarkerValueError: If a style value is not a valid value.
+"""
+def apply_style(water_marker, values):
+    for key, setter in STYLE_SETTERS.items():
+        if key in values:
+            value = values[key]
+            if key == "colour" and isinstance(value, list):
+                value = tuple(value)
+            getattr(water_marker, setter)(value)
+
+
+'''
+Converts a spec argument to the value the apply method expects.
+
+Args:
+    key: Argument key.
+    value: Argument value from the spec.
+
+Returns:
+    The argument value.
+
+Raises:
+    WaterMarkerTypeError: If a corner or edge name is not a string.
+    WaterMarkerValueError: If a corner or edge name is unknown.
+'''
+def _argument(key, value):
+    if key in ("corner", "edge") and not isinstance(value, str):
+        raise WaterMarkerTypeError(
+            "The {} must be a string".format(key))
+
+    if key == "corner":
+        if value not in _CORNERS:
+            raise WaterMarkerValueError(
+                "Unknown corner '{}'".format(value))
+        return _CORNERS[value]
+
+    if key == "edge":
+        if value not in _EDGES:
+            raise WaterMarkerValueError(
+                "Unknown edge '{}'".format(value))
+        return _EDGES[value]
+
+    return value
+
+
+'''
+Validates the structure of one spec operation.
+
+Args:
+    operation: Operation dictionary.
+
+Raises:
+    WaterMarkerTypeError: If the operation is not a JSON object.
+    WaterMarkerValueError: If the apply name is unknown, an argument is
+    missing or a key is unknown.
+'''
+def _validate_operation(operation):
+    if not isinstance(operation, dict):
+        raise WaterMarkerTypeError(
+            "Each spec operation must be a JSON object")
+
+    name = operation.get("apply")
+    if name not in OPERATIONS:
+        raise WaterMarkerValueError(
+            "Unknown apply name '{}'".format(name))
+
+    if "text" not in operation:
+        raise WaterMarkerValueError(
+            "The '{}' operation must have some text".format(name))
+
+    _, keys = OPERATIONS[name]
+    allowed = {"apply", "text"} | set(STYLE_SETTERS)
+
+    for key in keys:
+        if key.startswith("["):
+            allowed.add(key[1:-1])
+        else:
+            allowed.add(key)
+            if key not in operation:
+                raise WaterMarkerValueError(
+                    "The '{}' operation must have a '{}'".format(name, key))
+
+    for key in operation:
+        if key not in allowed:
+            raise WaterMarkerValueError(
+                "Unknown key '{}' in the '{}' operation".format(key, name))
+
+
+class _CheckingWaterMarker(TextualWaterMarker):
+    '''
+    Water marker recording operations for an image of CHECK_IMAGE_SIZE
+    while holding only one pixel, as operations are always deferred and
+    never collected.
+    '''
+
+    def __init__(self):
+        super(_CheckingWaterMarker, self).__init__(Image.new('RGB', (1, 1)))
+        self.defer(True)
+
+    def _img_size(self):
+        return CHECK_IMAGE_SIZE
@@ -0,0 +1,128 @@
+"""
+This code is copyrighted work by Paul Williams.
+Distributed under the BSD-3-Clause license available:
+    https://opensource.org/licenses/BSD-3-Clause
+"""
+
+
+from project.font_cache import font_cache
+from project.lru_cache import LRUCache
+
+
+class StampCache(LRUCache):
+    """
+    Process-wide cache of finished RGBA text stamps keyed by the full
+    text style and the identity of the font file on disk, bounded by the memory their pixels occupy. Cached stamps
+    are shared so they must never be modified in place.
+    """
+
+    """
+    Initialiser.
+
+    Args:
+        max_bytes: Memory budget for the cached stamp pixels in bytes.
+        Defaults to 64MiB.
+    """
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        super(StampCache, self).__init__(max_bytes,
+                                         weigher=StampCache.stamp_bytes)
+        self._store = None
+
+    """
+    Sets the persistent store stamps missing from memory are looked up
+    in before being rendered, e.g. so new processes skip rendering.
+
+    Args:
+        store: StampStore or None to render every miss.
+
+    Returns:
+        Self; instance that received the invocation.
+    """
+    def use_store(self, store):
+        self._store = store
+        return self
+
+    """
+    Gets the persistent store.
+
+    Returns:
+        The StampStore or None if misses are rendered.
+    """
+    def store(self):
+        return self._store
+
+    """
+    Gets a stamp, loading it from the store or rendering it on a miss.
+
+    Args:
+        text: Watermark text.
+        font_file: Font file name.
+        size_pt: Font size in points (pt).
+        rgb_colour: Font colour as a (red, green, blue) tuple.
+        degrees: Rotation anticlockwise in degrees.
+        reverse: True if the text is reversed.
+        render: Function invoked without arguments to render the stamp.
+
+    Returns:
+        The RGBA stamp image.
+
+    Raises:
+        OSError: If the font file cannot be found.
+    """
+    def stamp(self, text, font_file, size_pt, rgb_colour, degrees, reverse,
+              render):
+        key = (text, font_file, size_pt, rgb_colour, degrees, reverse) \
+            + font_cache.identity(font_file)
+        store = self._store
+
+        if store is None:
+            return self.get(key, render)
+
+        return self.get(key, lambda: store.stamp(text, font_file, size_pt,
+                                                 rgb_colour, degrees,
+                                                 reverse, render))
+
+    """
+    Removes every stamp rendered with a font file, e.g. after the file
+    has changed on disk.
+
+    Args:
+        font_file: Font file name.
+
+    Returns:
+        Number of removed stamps.
+    """
+    def invalidate_font(self, font_file):
+        return self.invalidate_if(lambda key: key[1] == font_file)
+
+    """
+    Removes every stamp of a text regardless of style.
+
+    Args:
+        text: Watermark text.
+
+    Returns:
+        Number of removed stamps.
+    """
+    def invalidate_text(self, text):
+        return self.invalidate_if(lambda key: key[0] == text)
+
+    """
+    Gets the memory occupied by the pixels of a stamp.
+
+    Args:
+        stamp: Stamp image.
+
+    Returns:
+        Size of the stamp pixels in bytes.
+    """
+    @staticmethod
+    def stamp_bytes(stamp):
+        width, height = stamp.size
+        return width * height * len(stamp.getbands())
+
+
+"""
+Stamp cache shared by every TextualWaterMarker in the process.
+"""
+stamp_cache = StampCache()
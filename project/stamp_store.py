@@ -0,0 +1,202 @@
+"""
+This code is copyrighted work by Paul Williams.
+Distributed under the BSD-3-Clause license available:
+    https://opensource.org/licenses/BSD-3-Clause
+"""
+
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from threading import Lock
+
+import numpy
+from PIL import Image
+
+from project.errors import WaterMarkerTypeError
+from project.errors import WaterMarkerValueError
+from project.font_cache import font_cache
+
+
+"""
+Version of the stamp file format and of the rendering; bumping it
+invalidates every stored stamp.
+"""
+STORE_VERSION = 1
+
+
+class StampStore(object):
+    """
+    Directory of rendered RGBA stamps shared between processes, so a
+    freshly started worker can apply its first watermark without
+    rasterizing any text. Each stamp is a .npy file named by a hash of
+    its style and of the font file's path, size and modification time,
+    so editing or replacing a font file invalidates its stamps. Stamps
+    are memory mapped rather than read, and like cached stamps must
+    never be modified in place.
+    """
+
+    """
+    Initialiser.
+
+    Args:
+        directory: Directory holding the stamps; created if missing.
+
+    Raises:
+        WaterMarkerTypeError: If the directory is none or not a string.
+        WaterMarkerValueError: If the directory is empty.
+        OSError: If the directory cannot be created.
+    """
+    def __init__(self, directory):
+        if directory is None:
+            raise WaterMarkerTypeError(
+                "A stamp store directory must be provided")
+
+        if not isinstance(directory, str):
+            raise WaterMarkerTypeError(
+                "The stamp store directory must be a string")
+
+        if directory.strip() == "":
+            raise WaterMarkerValueError(
+                "The stamp store directory cannot be empty")
+
+        self._directory = directory
+        self._root = os.path.join(directory, "v{}".format(STORE_VERSION))
+        self._lock = Lock()
+        self._loads = 0
+        self._saves = 0
+        os.makedirs(self._root, exist_ok=True)
+
+    """
+    Gets the directory holding the stamps.
+
+    Returns:
+        Directory path.
+    """
+    def directory(self):
+        return self._directory
+
+    """
+    Gets a stamp from the store, rendering and storing it if missing.
+
+    Args:
+        text: Watermark text.
+        font_file: Font file name.
+        size_pt: Font size in points (pt).
+        rgb_colour: Font colour as a (red, green, blue) tuple.
+        degrees: Rotation anticlockwise in degrees.
+        reverse: True if the text is reversed.
+        render: Function invoked without arguments to render the stamp.
+
+    Returns:
+        The RGBA stamp image.
+    """
+    def stamp(self, text, font_file, size_pt, rgb_colour, degrees, reverse,
+              render):
+        path = self._path(text, font_file, size_pt, rgb_colour, degrees,
+                          reverse)
+
+        stamp = self._load(path)
+        if stamp is None:
+            stamp = render()
+            self._save(path, stamp)
+
+        return stamp
+
+    """
+    Gets the number of stamps loaded from and saved to disk by this
+    instance.
+
+    Returns:
+        (loads, saves) tuple.
+    """
+    def counts(self):
+        with self._lock:
+            return self._loads, self._saves
+
+    """
+    Removes every stored stamp, of every version.
+    """
+    def clear(self):
+        for name in os.listdir(self._directory):
+            path = os.path.join(self._directory, name)
+            if name.startswith("v") and os.path.isdir(path):
+                shutil.rmtree(path)
+
+        os.makedirs(self._root, exist_ok=True)
+
+    '''
+    Gets the file path of a stamp.
+
+    Returns:
+        Path of the stamp's .npy file.
+
+    Raises:
+        OSError: If the font file cannot be found.
+    '''
+    def _path(self, text, font_file, size_pt, rgb_colour, degrees,
+              reverse):
+        font_path, font_size, font_mtime_ns = font_cache.identity(font_file)
+
+        style = json.dumps([STORE_VERSION, text, font_path, font_size,
+                            font_mtime_ns, size_pt, list(rgb_colour),
+                            degrees, reverse])
+        digest = hashlib.sha256(style.encode("utf-8")).hexdigest()
+
+        return os.path.join(self._root, digest[:2], digest + ".npy")
+
+    '''
+    Memory maps a stored stamp.
+
+    Args:
+        path: Path of the stamp's .npy file.
+
+    Returns:
+        Read only RGBA image sharing the mapped memory, or None if the
+        stamp is not stored or cannot be read.
+    '''
+    def _load(self, path):
+        try:
+            pixels = numpy.load(path, mmap_mode="r")
+        except (OSError, ValueError):
+            return None
+
+        if pixels.ndim != 3 or pixels.shape[2] != 4 \
+                or pixels.dtype != numpy.uint8:
+            return None
+
+        height, width = pixels.shape[:2]
+        if width == 0 or height == 0:
+            return Image.new('RGBA', (width, height))
+
+        with self._lock:
+            self._loads += 1
+
+        return Image.frombuffer('RGBA', (width, height), pixels,
+                                'raw', 'RGBA', 0, 1)
+
+    '''
+    Stores a stamp. The file is written under a temporary name and then
+    renamed so other processes never map a partly written stamp.
+
+    Args:
+        path: Path of the stamp's .npy file.
+        stamp: RGBA stamp image.
+    '''
+    def _save(self, path, stamp):
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+
+        handle, temp_path = tempfile.mkstemp(suffix=".npy", dir=directory)
+        try:
+            with os.fdopen(handle, "wb") as temp_file:
+                numpy.save(temp_file, numpy.asarray(stamp.convert('RGBA')))
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+        with self._lock:
+            self._saves += 1
@@ -0,0 +1,332 @@
+"""
+This code is copyrighted work by Paul Williams.
+Distributed under the BSD-3-Clause license available:
+    https://opensource.org/licenses/BSD-3-Clause
+"""
+
+
+from project.errors import WaterMarkerTypeError
+from project.errors import WaterMarkerValueError
+
+
+_UNCHANGED = object()
+
+
+class WatermarkStyle(object):
+    """
+    Immutable text style of a watermark: font file, font size, colour,
+    rotation, reverse and margin. Every value is validated once when the
+    style is created, so a style can be shared between threads, sent to
+    worker processes and used as a cache key, and water markers given
+    one skip validating it again.
+    """
+
+    __slots__ = ("_font_file", "_size_pt", "_rgb_colour", "_degrees",
+                 "_reverse", "_margin", "_key", "_hash")
+
+    """
+    Initialiser.
+
+    Args:
+        font_file: Font file name. Defaults to 'Arial_Bold.ttf'.
+        size_pt: Font size in points (pt). Defaults to 20.
+        rgb_colour: Font colour as a (red, green, blue) tuple. Defaults
+        to black.
+        degrees: Rotation of the text anticlockwise in degrees, from 0
+        to 360 inclusive; 360 is stored as 0. Defaults to 0.
+        reverse: True if the text should be reversed. Defaults to False.
+        margin: Margin applied by the placements that use one. Defaults
+        to 0.
+
+    Raises:
+        WaterMarkerTypeError: If any value is none or is not of the
+        correct type.
+        WaterMarkerValueError: If the font file is empty, the font size
+        is less than 1pt, the colour tuple has the wrong number of
+        values or a value outside 0 to 255, or the rotation is negative
+        or greater than 360.
+    """
+    def __init__(self, font_file="Arial_Bold.ttf", size_pt=20,
+                 rgb_colour=(0, 0, 0), degrees=0, reverse=False,
+                 margin=0):
+
+        _validate_font_file(font_file)
+        _validate_size(size_pt)
+        _validate_colour(rgb_colour)
+        _validate_rotation(degrees)
+        _validate_reverse(reverse)
+        _validate_margin(margin)
+
+        if degrees == 360:
+            degrees = 0
+
+        key = (font_file, size_pt, rgb_colour, degrees, reverse, margin)
+
+        set_slot = object.__setattr__
+        set_slot(self, "_font_file", font_file)
+        set_slot(self, "_size_pt", size_pt)
+        set_slot(self, "_rgb_colour", rgb_colour)
+        set_slot(self, "_degrees", degrees)
+        set_slot(self, "_reverse", reverse)
+        set_slot(self, "_margin", margin)
+        set_slot(self, "_key", key)
+        set_slot(self, "_hash", hash(key))
+
+    """
+    Gets the font file name.
+
+    Returns:
+        Font file name.
+    """
+    def font_file(self):
+        return self._font_file
+
+    """
+    Gets the font size.
+
+    Returns:
+        Font size in points (pt).
+    """
+    def size_pt(self):
+        return self._size_pt
+
+    """
+    Gets the font colour.
+
+    Returns:
+        (red, green, blue) tuple.
+    """
+    def rgb_colour(self):
+        return self._rgb_colour
+
+    """
+    Gets the rotation of the text.
+
+    Returns:
+        Degrees anticlockwise, from 0 to 359.
+    """
+    def degrees(self):
+        return self._degrees
+
+    """
+    Gets whether the text is reversed.
+
+    Returns:
+        True if the text is reversed.
+    """
+    def reverse(self):
+        return self._reverse
+
+    """
+    Gets the margin.
+
+    Returns:
+        Margin in pixels.
+    """
+    def margin(self):
+        return self._margin
+
+    """
+    Gets every value of the style as a tuple, e.g. for keying caches.
+
+    Returns:
+        (font file, size, colour, degrees, reverse, margin) tuple.
+    """
+    def key(self):
+        return self._key
+
+    """
+    Creates a copy of the style with some values changed.
+
+    Args:
+        font_file: Font file name. Defaults to this style's.
+        size_pt: Font size in points (pt). Defaults to this style's.
+        rgb_colour: Font colour as a (red, green, blue) tuple. Defaults
+        to this style's.
+        degrees: Rotation of the text anticlockwise. Defaults to this
+        style's.
+        reverse: True if the text should be reversed. Defaults to this
+        style's.
+        margin: Margin. Defaults to this style's.
+
+    Returns:
+        The new WatermarkStyle.
+
+    Raises:
+        WaterMarkerTypeError: If a changed value is not of the correct
+        type.
+        WaterMarkerValueError: If a changed value is not valid.
+    """
+    def replace(self, font_file=_UNCHANGED, size_pt=_UNCHANGED,
+                rgb_colour=_UNCHANGED, degrees=_UNCHANGED,
+                reverse=_UNCHANGED, margin=_UNCHANGED):
+
+        changes = (font_file, size_pt, rgb_colour, degrees, reverse, margin)
+        return WatermarkStyle(*[current if change is _UNCHANGED else change
+                                for current, change in zip(self._key,
+                                                           changes)])
+
+    def __setattr__(self, name, value):
+        raise AttributeError("A WatermarkStyle cannot be modified")
+
+    def __delattr__(self, name):
+        raise AttributeError("A WatermarkStyle cannot be modified")
+
+    def __eq__(self, other):
+        if not isinstance(other, WatermarkStyle):
+            return NotImplemented
+        return self._key == other._key
+
+    def __ne__(self, other):
+        if not isinstance(other, WatermarkStyle):
+            return NotImplemented
+        return self._key != other._key
+
+    def __hash__(self):
+        return self._hash
+
+    def __reduce__(self):
+        return WatermarkStyle, self._key
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __repr__(self):
+        return "WatermarkStyle(font_file={!r}, size_pt={!r}, " \
+               "rgb_colour={!r}, degrees={!r}, reverse={!r}, " \
+               "margin={!r})".format(*self._key)
+
+
+'''
+Validates a font file name.
+
+Raises:
+    WaterMarkerTypeError: If the font file is none or not a string.
+    WaterMarkerValueError: If the font file is empty.
+'''
+def _validate_font_file(font_file):
+    if font_file is None:
+        raise WaterMarkerTypeError(
+            "A font file must be provided")
+
+    if not isinstance(font_file, str):
+        raise WaterMarkerTypeError(
+            "The font file must be a string")
+
+    if font_file.strip() == "":
+        raise WaterMarkerValueError(
+            "The font file cannot be empty")
+
+
+'''
+Validates a font size.
+
+Raises:
+    WaterMarkerTypeError: If the size is none or not an integer.
+    WaterMarkerValueError: If the size is less than 1pt.
+'''
+def _validate_size(size_pt):
+    if size_pt is None:
+        raise WaterMarkerTypeError(
+            "A font size must be provided")
+
+    if not isinstance(size_pt, int):
+        raise WaterMarkerTypeError(
+            "The font size parameter must be an integer")
+
+    if size_pt <= 0:
+        raise WaterMarkerValueError(
+            "The font size must be greater than 0 (Zero)")
+
+
+'''
+Validates a font colour.
+
+Raises:
+    WaterMarkerTypeError: If the colour is none, not a tuple or holds a
+    value that is not an integer.
+    WaterMarkerValueError: If the colour does not have 3 values or a
+    value is outside 0 to 255.
+'''
+def _validate_colour(rgb_colour):
+    if rgb_colour is None:
+        raise WaterMarkerTypeError(
+            "A colour tuple must be provided")
+
+    if not isinstance(rgb_colour, tuple):
+        raise WaterMarkerTypeError(
+            "The colour parameter must be a tuple")
+
+    if len(rgb_colour) != 3:
+        raise WaterMarkerValueError(
+            "The colour tuple must have a length of 3")
+
+    for colour in rgb_colour:
+        if not isinstance(colour, int):
+            raise WaterMarkerTypeError(
+                "Each tuple value must be an integer")
+        elif colour < 0 or colour > 255:
+            raise WaterMarkerValueError(
+                "Each tuple value must be between 0 (inclusive) and"
+                " 255 (inclusive)")
+
+
+'''
+Validates a rotation.
+
+Raises:
+    WaterMarkerTypeError: If the rotation is none or not an integer.
+    WaterMarkerValueError: If the rotation is negative or greater than
+    360.
+'''
+def _validate_rotation(degrees):
+    if degrees is None:
+        raise WaterMarkerTypeError(
+            "A rotation in degrees must be provided")
+
+    if not isinstance(degrees, int):
+        raise WaterMarkerTypeError(
+            "The rotation must be in degrees as an integer")
+
+    if degrees < 0:
+        raise WaterMarkerValueError(
+            "The rotation must be 0 (Zero) or greater")
+
+    if degrees > 360:
+        raise WaterMarkerValueError(
+            "The rotation must be 360 or less")
+
+
+'''
+Validates a reverse state.
+
+Raises:
+    WaterMarkerTypeError: If the reverse state is none or not a boolean.
+'''
+def _validate_reverse(reverse):
+    if reverse is None:
+        raise WaterMarkerTypeError(
+            "A True/False reverse state must be provided")
+
+    if not isinstance(reverse, bool):
+        raise WaterMarkerTypeError(
+            "The reverse must be a boolean")
+
+
+'''
+Validates a margin.
+
+Raises:
+    WaterMarkerTypeError: If the margin is none or not an integer.
+'''
+def _validate_margin(margin):
+    if margin is None:
+        raise WaterMarkerTypeError(
+            "Margin value must not be none")
+
+    if not isinstance(margin, int):
+        raise WaterMarkerTypeError(
+            "The margin must be an integer")
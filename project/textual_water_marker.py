@@ -7,22 +7,25 @@ Distributed under the BSD-3-Clause license available:
 """
 
 
-from PIL import Image
-from PIL import ImageDraw
-from PIL import ImageFont
-from random import randint
-
-
-class WaterMarkerTypeError(TypeError):
-    """
-    Raised to signal an invalid argument type to a function or method.
-    """
+import copy
 
+from PIL import Image
 
-class WaterMarkerValueError(ValueError):
-    """
-    Raised to signal an argument with an invalid argument value.
-    """
+from project.band_compositor import BandCompositor
+from project.errors import WaterMarkerTypeError
+from project.errors import WaterMarkerValueError
+from project.font_cache import font_cache
+from project.glyph_atlas import atlas_cache
+from project.instrumentation import StageRecorder
+from project.placement import LatticePlacement
+from project.placement import Placement
+from project.placement import RotatedLatticePlacement
+from project.plan import WatermarkPlan
+from project.scatter import random_generator
+from project.scatter import random_positions
+from project.stamp_cache import StampCache
+from project.stamp_cache import stamp_cache
+from project.style import WatermarkStyle
 
 
 class Corner:
@@ -197,43 +200,218 @@ class TextualWaterMarker(object):
     """
 
     _img = None
-    _font_file = "Arial_Bold.ttf"
-    _size_pt = 20
-    _rgb_colour = (0, 0, 0)
-    _degrees = 0
-    _reverse = False
-    _margin = 0
+    _style = WatermarkStyle()
+    _plan = None
+    _instrument = None
+    _recorder = None
+    _compositor = None
+    _stamps = stamp_cache
 
     """
     Initialiser.
     
     Args:
         img: Pillow Image to watermark.
+        style: WatermarkStyle to start with, already validated, so the
+        setters need not be called. Defaults to the default style.
         
+    Raises:
+        WaterMarkerTypeError: If the image parameter has not been
+        provided or is not of the correct type, or the style is not a
+        WatermarkStyle.
+    """
+    def __init__(self, img, style=None):
+        self._validate_img(img)
+        self._img = img
+
+        if style is not None:
+            if not isinstance(style, WatermarkStyle):
+                raise WaterMarkerTypeError(
+                    "The style must be a WatermarkStyle")
+            self._style = style
+
+    """
+    Gets the current style. Setters replace the style rather than modify
+    it, so the returned style can be kept and shared.
+
+    Returns:
+        The WatermarkStyle.
+    """
+    def style(self):
+        return self._style
+
+    """
+    Creates a water marker for another image in the same style, with
+    the same deferral and instrumentation, without running the style
+    setters and their validation again.
+
+    Args:
+        img: Pillow Image to watermark.
+
+    Returns:
+        The new TextualWaterMarker.
+
     Raises:
         WaterMarkerTypeError: If the image parameter has not been
         provided or is not of the correct type.
     """
-    def __init__(self, img):
-        if img is None:
-            raise WaterMarkerTypeError(
-                "An image must be provided")
+    def for_image(self, img):
+        self._validate_img(img)
 
-        if not isinstance(img, Image.Image):
-            raise WaterMarkerTypeError(
-                "The image parameter must be a Pillow Image")
+        water_marker = copy.copy(self)
+        water_marker._img = img
+        water_marker._recorder = None
+        if self._plan is not None:
+            water_marker._plan = WatermarkPlan(img.size)
 
-        self._img = img
+        return water_marker
 
     """
-    Gets the image with any applied watermarks.
+    Gets the image with any applied watermarks. Operations deferred
+    since the last collection are compiled into one overlay and
+    composited onto the image first.
 
     Returns:
         The image.
     """
     def collect(self):
+        if self._plan is not None and len(self._plan) > 0:
+            recorder = self._start_recording()
+            self._composite(self._plan)
+            self._plan = WatermarkPlan(self._img_size())
+
+            if recorder is not None:
+                recorder.lap("composite")
+                self._finish_recording("collect")
+
         return self._img
 
+    """
+    Gets the plan of the operations deferred since the last collection.
+    The plan can also be applied to other images of the same size.
+
+    Returns:
+        The WatermarkPlan or None if operations are not being deferred.
+    """
+    def plan(self):
+        return self._plan
+
+    """
+    Sets whether apply operations are deferred. Deferred operations only
+    record what to apply; collect() then composites all of them onto the
+    image in a single pass. Until then the apply methods return the
+    image without the deferred watermarks. Operations already deferred
+    are applied when deferral is turned off.
+
+    Args:
+        defer: True if apply operations should be deferred.
+
+    Returns:
+        Self; instance that received the invocation.
+
+    Raises:
+        WaterMarkerTypeError: If the defer parameter has not been
+        provided or is not of the correct type.
+    """
+    def defer(self, defer):
+        if defer is None:
+            raise WaterMarkerTypeError(
+                "A True/False defer state must be provided")
+
+        if not isinstance(defer, bool):
+            raise WaterMarkerTypeError(
+                "The defer state must be a boolean")
+
+        if defer and self._plan is None:
+            self._plan = WatermarkPlan(self._img_size())
+        elif not defer and self._plan is not None:
+            self.collect()
+            self._plan = None
+
+        return self
+
+    """
+    Sets the callback receiving the duration of each stage of every
+    apply and collect call: font_load, getsize, draw_text, transpose,
+    rotate, stamp (the stamp cache), layout, and paste or defer, or
+    composite for collect. Stamps found in the stamp cache skip the
+    rendering stages. Without a callback no timing is done at all.
+
+    Args:
+        callback: Function receiving an ApplyTimings per call, e.g. a
+        StageStats, or None to stop timing.
+
+    Returns:
+        Self; instance that received the invocation.
+
+    Raises:
+        WaterMarkerTypeError: If the callback is not callable.
+    """
+    def instrument(self, callback):
+        if callback is not None and not callable(callback):
+            raise WaterMarkerTypeError(
+                "The instrumentation callback must be callable")
+
+        self._instrument = callback
+        self._recorder = None
+        return self
+
+    """
+    Gets the callback receiving stage timings.
+
+    Returns:
+        The callback or None if timing is off.
+    """
+    def instrumentation(self):
+        return self._instrument
+
+    """
+    Sets the compositor applying watermarks on several threads, one
+    horizontal band of the image per thread. The output is identical to
+    compositing on the calling thread.
+
+    Args:
+        compositor: BandCompositor, or None to composite on the calling
+        thread.
+
+    Returns:
+        Self; instance that received the invocation.
+
+    Raises:
+        WaterMarkerTypeError: If the compositor is not a BandCompositor.
+    """
+    def compositor(self, compositor):
+        if compositor is not None \
+                and not isinstance(compositor, BandCompositor):
+            raise WaterMarkerTypeError(
+                "The compositor must be a BandCompositor")
+
+        self._compositor = compositor
+        return self
+
+    """
+    Sets the cache stamps are rendered into and reused from. A private
+    StampCache keeps texts used only once, e.g. serial numbers, from
+    evicting the stamps of the cache shared by the process.
+
+    Args:
+        cache: StampCache, or None to use the cache shared by the
+        process.
+
+    Returns:
+        Self; instance that received the invocation.
+
+    Raises:
+        WaterMarkerTypeError: If the cache is not a StampCache.
+    """
+    def use_stamp_cache(self, cache):
+        if cache is not None and not isinstance(cache, StampCache):
+            raise WaterMarkerTypeError(
+                "The stamp cache must be a StampCache")
+
+        self._stamps = stamp_cache if cache is None else cache
+        return self
+
     """
     Sets the font file name containing the font typeface to use.
     
@@ -249,19 +427,7 @@ class TextualWaterMarker(object):
         WaterMarkerValueError: If the font file parameter is empty. 
     """
     def font(self, font_file):
-        if font_file is None:
-            raise WaterMarkerTypeError(
-                "A font file must be provided")
-
-        if not isinstance(font_file, str):
-            raise WaterMarkerTypeError(
-                "The image parameter must be a Pillow Image")
-
-        if font_file.strip() == "":
-            raise WaterMarkerValueError(
-                "The font file cannot be empty")
-
-        self._font_file = font_file
+        self._style = self._style.replace(font_file=font_file)
         return self
 
     """
@@ -280,19 +446,7 @@ class TextualWaterMarker(object):
         1pt.
     """
     def size(self, size_pt):
-        if size_pt is None:
-            raise WaterMarkerTypeError(
-                "A font size must be provided")
-
-        if not isinstance(size_pt, int):
-            raise WaterMarkerTypeError(
-                "The font size parameter must be an integer")
-
-        if size_pt <= 0:
-            raise WaterMarkerValueError(
-                "The font size must be greater than 0 (Zero)")
-
-        self._size_pt = size_pt
+        self._style = self._style.replace(size_pt=size_pt)
         return self
 
     """
@@ -312,28 +466,7 @@ class TextualWaterMarker(object):
         is greater than 255.
     """
     def colour(self, rgb_colour):
-        if rgb_colour is None:
-            raise WaterMarkerTypeError(
-                "A colour tuple must be provided")
-
-        if not isinstance(rgb_colour, tuple):
-            raise WaterMarkerTypeError(
-                "The colour parameter must be a tuple")
-
-        if len(rgb_colour) != 3:
-            raise WaterMarkerValueError(
-                "The colour tuple must have a length of 3")
-
-        for colour in rgb_colour:
-            if not isinstance(colour, int):
-                raise WaterMarkerTypeError(
-                    "Each tuple value must be an integer")
-            elif colour < 0 or colour > 255:
-                raise WaterMarkerValueError(
-                    "Each tuple value must be between 0 (inclusive) and"
-                    " 255 (inclusive)")
-
-        self._rgb_colour = rgb_colour
+        self._style = self._style.replace(rgb_colour=rgb_colour)
         return self
 
     """
@@ -353,26 +486,7 @@ class TextualWaterMarker(object):
         than 360.
     """
     def rotation(self, degrees):
-        if degrees is None:
-            raise WaterMarkerTypeError(
-                "A rotation in degrees must be provided")
-
-        if not isinstance(degrees, int):
-            raise WaterMarkerTypeError(
-                "The rotation must be in degrees as an integer")
-
-        if degrees < 0:
-            raise WaterMarkerValueError(
-                "The rotation must be 0 (Zero) or greater")
-
-        if degrees > 360:
-            raise WaterMarkerValueError(
-                "The rotation must be 360 or less")
-
-        if degrees == 360:
-            degrees = 0
-
-        self._degrees = degrees
+        self._style = self._style.replace(degrees=degrees)
         return self
 
     """
@@ -391,15 +505,7 @@ class TextualWaterMarker(object):
         provided or is not of the correct type.
     """
     def reverse(self, reverse):
-        if reverse is None:
-            raise WaterMarkerTypeError(
-                "A True/False reverse state must be provided")
-
-        if not isinstance(reverse, bool):
-            raise WaterMarkerTypeError(
-                "The reverse must be a boolean")
-
-        self._reverse = reverse
+        self._style = self._style.replace(reverse=reverse)
         return self
 
     """
@@ -416,15 +522,29 @@ class TextualWaterMarker(object):
         of the correct type.
     """
     def margin(self, margin):
-        if margin is None:
-            raise WaterMarkerTypeError(
-                "Margin value must not be none")
+        self._style = self._style.replace(margin=margin)
+        return self
 
-        if not isinstance(margin, int):
-            raise WaterMarkerTypeError(
-                "The margin must be an integer")
+    """
+    Renders and caches the stamp of a text in the current style without
+    applying it, e.g. to warm up a worker process before its first
+    image.
+
+    Args:
+        text: Text of the watermark.
 
-        self._margin = margin
+    Returns:
+        Self; instance that received the invocation.
+
+    Raises:
+        WaterMarkerTypeError: If the text is none or is not a
+        string.
+        WaterMarkerValueError: If the text is empty or only contains
+        white space.
+    """
+    def warm(self, text):
+        self._validate_text(text)
+        self._prepare_text_img(text.strip())
         return self
 
     """
@@ -448,14 +568,14 @@ class TextualWaterMarker(object):
 
         text_img = self._prepare_text_img(text)
 
-        img_width, img_height = self._img.size
+        img_width, img_height = self._img_size()
         text_img_width, text_img_height = text_img.size
 
         pos_x = (img_width / 2) - (text_img_width / 2)
         pos_y = (img_height / 2) - (text_img_height / 2)
 
-        self._img.paste(text_img, (int(pos_x), int(pos_y)), text_img)
-        return self._img
+        placement = Placement(text_img, [(int(pos_x), int(pos_y))])
+        return self._apply("centre", placement, ("centre", text))
 
     """
     Applies the watermark at a corner of the image. The whole watermark
@@ -483,25 +603,26 @@ class TextualWaterMarker(object):
 
         text_img = self._prepare_text_img(text)
 
-        img_width, img_height = self._img.size
+        img_width, img_height = self._img_size()
         text_img_width, text_img_height = text_img.size
         x_fraction, y_fraction = corner
+        margin = self._style.margin()
 
         pos_x = (img_width * x_fraction)
         pos_y = (img_height * y_fraction)
 
         if pos_x > 0:
-            pos_x -= text_img_width + self._margin
+            pos_x -= text_img_width + margin
         else:
-            pos_x = self._margin
+            pos_x = margin
 
         if pos_y > 0:
-            pos_y -= text_img_height + self._margin
+            pos_y -= text_img_height + margin
         else:
-            pos_y = self._margin
+            pos_y = margin
 
-        self._img.paste(text_img, (int(pos_x), int(pos_y)), text_img)
-        return self._img
+        placement = Placement(text_img, [(int(pos_x), int(pos_y))])
+        return self._apply("corner", placement, ("corner", text, corner))
 
     """
     Applies the watermark at the edge of the image. The whole watermark
@@ -529,9 +650,10 @@ class TextualWaterMarker(object):
 
         text_img = self._prepare_text_img(text)
 
-        img_width, img_height = self._img.size
+        img_width, img_height = self._img_size()
         text_img_width, text_img_height = text_img.size
         x_fraction, y_fraction = edge
+        margin = self._style.margin()
 
         pos_x = (img_width * x_fraction)
         pos_y = (img_height * y_fraction)
@@ -539,19 +661,19 @@ class TextualWaterMarker(object):
         if x_fraction not in (0, 1):
             pos_x -= (text_img_width / 2)
         elif x_fraction == 1:
-            pos_x -= text_img_width + self._margin
+            pos_x -= text_img_width + margin
         else:
-            pos_x += self._margin
+            pos_x += margin
 
         if y_fraction not in (0, 1):
             pos_y -= (text_img_height / 2)
         elif y_fraction == 1:
-            pos_y -= text_img_height + self._margin
+            pos_y -= text_img_height + margin
         else:
-            pos_y += self._margin
+            pos_y += margin
 
-        self._img.paste(text_img, (int(pos_x), int(pos_y)), text_img)
-        return self._img
+        placement = Placement(text_img, [(int(pos_x), int(pos_y))])
+        return self._apply("edge", placement, ("edge", text, edge))
 
     """
     Applies the watermark at a point relative to the top left of the
@@ -596,9 +718,9 @@ class TextualWaterMarker(object):
 
         text_img = self._prepare_text_img(text)
 
-        self._img.paste(text_img, (int(x_pos_px), int(y_pos_px)),
-                        text_img)
-        return self._img
+        placement = Placement(text_img, [(x_pos_px, y_pos_px)])
+        return self._apply("absolute", placement,
+                           ("absolute", text, x_pos_px, y_pos_px))
 
     """
     Applies the watermark at a point relative to the top left of the
@@ -643,32 +765,39 @@ class TextualWaterMarker(object):
 
         text_img = self._prepare_text_img(text)
 
-        img_width, img_height = self._img.size
+        img_width, img_height = self._img_size()
 
         pos_x = (img_width / 100.0) * x_from_left
         pos_y = (img_height / 100.0) * y_from_top
 
-        self._img.paste(text_img, (int(pos_x), int(pos_y)), text_img)
-        return self._img
+        placement = Placement(text_img, [(int(pos_x), int(pos_y))])
+        return self._apply("percent", placement,
+                           ("percent", text, x_from_left, y_from_top))
 
     """
     Applies the watermark at a random point on the image without
-    overflowing any edges.
+    overflowing any edges. All positions are drawn at once and every
+    copy is composited onto the image in a single pass.
 
     Args:
         text: Text to apply as the watermark.
         quantity: Number of times to apply the watermark. Defaults to 1.
+        seed: Integer seed or numpy Generator used to draw positions so
+        results can be reproduced. Defaults to a freshly seeded
+        generator.
 
     Returns:
         Watermarked image.
         
     Raises:
         WaterMarkerTypeError: If the text is none, the text is not a
-        string, the quantity is none or the quantity is not an integer.
+        string, the quantity is none, the quantity is not an integer or
+        the seed is not an integer or numpy Generator.
         WaterMarkerValueError: If the text is empty, only contains
-        white space or the quantity is less than 1.
+        white space, the quantity is less than 1, the seed is negative
+        or the watermark does not fit inside the image.
     """
-    def apply_random(self, text, quantity=1):
+    def apply_random(self, text, quantity=1, seed=None):
         self._validate_text(text)
         text = text.strip()
 
@@ -683,22 +812,26 @@ class TextualWaterMarker(object):
             raise WaterMarkerValueError("The quantity must be 1 or "
                                         "greater")
 
+        rng = random_generator(seed)
         text_img = self._prepare_text_img(text)
 
-        img_width, img_height = self._img.size
+        img_width, img_height = self._img_size()
         text_img_width, text_img_height = text_img.size
 
-        max_x = (img_width - text_img_width) - self._margin
-        max_y = (img_height - text_img_height) - self._margin
+        margin = self._style.margin()
+        max_x = (img_width - text_img_width) - margin
+        max_y = (img_height - text_img_height) - margin
 
-        for count in range(quantity):
-            pos_x = randint(self._margin, int(max_x))
-            pos_y = randint(self._margin, int(max_y))
+        positions = random_positions(rng, quantity,
+                                     (margin, margin),
+                                     (max_x, max_y))
 
-            self._img.paste(text_img, (int(pos_x), int(pos_y)),
-                            text_img)
+        operation = None
+        if isinstance(seed, int):
+            operation = ("random", text, quantity, seed)
 
-        return self._img
+        return self._apply("random", Placement(text_img, positions),
+                           operation)
 
     """
     Applies the watermark, multiple times both horizontally and
@@ -732,30 +865,7 @@ class TextualWaterMarker(object):
 
         self._validate_text(text)
         text = text.strip()
-
-        if horizontal_margin is None:
-            raise WaterMarkerTypeError("Horizontal margin must not be "
-                                       "none")
-
-        if vertical_margin is None:
-            raise WaterMarkerTypeError("Vertical margin must not be "
-                                       "none")
-
-        if not isinstance(horizontal_margin, int):
-            raise WaterMarkerTypeError("Horizontal margin must be an "
-                                       "integer")
-
-        if not isinstance(vertical_margin, int):
-            raise WaterMarkerTypeError("Vertical margin must be an "
-                                       "integer")
-
-        if horizontal_margin < 1:
-            raise WaterMarkerValueError("Horizontal margin must be"
-                                        " greater than 0 (zero)")
-
-        if vertical_margin < 1:
-            raise WaterMarkerValueError("Vertical margin must be"
-                                        " greater than 0 (zero)")
+        self._validate_lattice_margins(horizontal_margin, vertical_margin)
 
         if horizontal_start_margin is None:
             horizontal_start_margin = horizontal_margin
@@ -773,49 +883,290 @@ class TextualWaterMarker(object):
 
         text_img = self._prepare_text_img(text)
 
-        img_width, img_height = self._img.size
-        text_img_width, text_img_height = text_img.size
+        placement = LatticePlacement(
+            text_img,
+            (horizontal_start_margin, vertical_start_margin),
+            (horizontal_margin, vertical_margin),
+            self._img_size())
+
+        return self._apply("lattice", placement, ("lattice", text,
+                                                  horizontal_margin,
+                                                  vertical_margin,
+                                                  horizontal_start_margin,
+                                                  vertical_start_margin))
+
+    """
+    Applies the watermark across the image as a lattice rotated as a
+    whole by the water marker's rotation, rather than a lattice of
+    rotated watermarks. The unrotated watermark is tiled and rotated one
+    square tile of the image at a time, so the cost does not grow with
+    the number of watermarks and the rows run along the rotation.
+
+    Args:
+        text: Text to apply as the watermark.
+        horizontal_margin: Space between watermarks along a row.
+        vertical_margin: Space between rows.
 
-        y = vertical_start_margin
-        while y < img_height:
+    Returns:
+        Watermarked image.
 
-            x = horizontal_start_margin
-            while x < img_width:
-                self._img.paste(text_img, (int(x), int(y)), text_img)
-                x += text_img_width + horizontal_margin
+    Raises:
+        WaterMarkerTypeError: If the text is none, the text is not a
+        string, any margin is none or any margin is not an integer.
+        WaterMarkerValueError: If the text is empty, only contains
+        white space, the horizontal margin is less than one or the
+        vertical margin is less than one.
+    """
+    def apply_rotated_lattice(self, text, horizontal_margin,
+                              vertical_margin):
+        self._validate_text(text)
+        text = text.strip()
+        self._validate_lattice_margins(horizontal_margin, vertical_margin)
+
+        text_img = self._prepare_text_img(text, degrees=0)
+
+        placement = RotatedLatticePlacement(
+            text_img,
+            (horizontal_margin, vertical_margin),
+            self._img_size(),
+            self._style.degrees())
+
+        return self._apply("rotated_lattice", placement,
+                           ("rotated_lattice", text, horizontal_margin,
+                            vertical_margin))
+
+    '''
+    Applies, or defers when deferral is on, the placement of an
+    operation.
+
+    Args:
+        name: Name of the apply method, e.g. 'centre'.
+        placement: Placement or LatticePlacement to apply.
+        operation: Tuple describing the operation and its arguments, or
+        None if it cannot be reproduced from a description.
+
+    Returns:
+        The image.
+    '''
+    def _apply(self, name, placement, operation):
+        recorder = self._recorder
+        if recorder is not None:
+            recorder.lap("layout")
+
+        if self._plan is None:
+            if self._compositor is None:
+                placement.render(self._img)
+            else:
+                self._composite(
+                    WatermarkPlan(self._img_size()).add(placement, None))
+            stage = "paste"
+        else:
+            if operation is not None:
+                operation = (self._style_key(),) + operation
+            self._plan.add(placement, operation)
+            stage = "defer"
 
-            y += text_img_height + vertical_margin
+        if recorder is not None:
+            recorder.lap(stage, stamp_cache.stamp_bytes(placement.stamp()))
+            self._finish_recording(name)
 
         return self._img
 
     '''
-    Prepares the text image that will overlay the user image.
+    Applies a plan to the image, on the compositor's threads if one is
+    set.
+
+    Args:
+        plan: WatermarkPlan to apply.
+    '''
+    def _composite(self, plan):
+        if self._compositor is None:
+            plan.apply(self._img)
+        else:
+            self._compositor.apply(self._img, plan)
+
+    '''
+    Starts recording the stages of a call if instrumented.
+
+    Returns:
+        The StageRecorder or None if timing is off.
+    '''
+    def _start_recording(self):
+        if self._instrument is None:
+            self._recorder = None
+        else:
+            self._recorder = StageRecorder()
+        return self._recorder
+
+    '''
+    Sends the recorded stages of a call to the instrumentation callback.
+
+    Args:
+        name: Name of the call.
+    '''
+    def _finish_recording(self, name):
+        recorder = self._recorder
+        self._recorder = None
+        self._instrument(recorder.timings(name))
+
+    '''
+    Gets the size of the image being watermarked.
+
+    Returns:
+        (width, height) tuple.
+    '''
+    def _img_size(self):
+        return self._img.size
+
+    '''
+    Gets a tuple of every style attribute and of the identity of the font
+    file on disk, so plans stop sharing overlays once the font changes.
+
+    Returns:
+        (font file, size, colour, degrees, reverse, margin, font path,
+        font size in bytes, font modification time in ns) tuple.
+    '''
+    def _style_key(self):
+        return self._style.key() \
+            + font_cache.identity(self._style.font_file())
+
+    '''
+    Prepares the text image that will overlay the user image. Stamps are
+    shared through the water marker's stamp cache so the returned image
+    must not be modified.
 
     Args:
         text: Text to apply as the watermark.
+        degrees: Rotation of the text in degrees. Defaults to the
+        rotation of the water marker.
 
     Returns:
         Text as an image. 
     '''
-    def _prepare_text_img(self, text):
-        font = ImageFont.truetype(self._font_file, self._size_pt)
-        text_width, text_height = font.getsize(text)
+    def _prepare_text_img(self, text, degrees=None):
+        recorder = self._start_recording()
+
+        style = self._style
+        if degrees is None:
+            degrees = style.degrees()
+
+        stamp = self._stamps.stamp(text,
+                                   style.font_file(),
+                                   style.size_pt(),
+                                   style.rgb_colour(),
+                                   degrees,
+                                   style.reverse(),
+                                   lambda: self._render_text_img(text,
+                                                                 degrees))
+
+        if recorder is not None:
+            recorder.lap("stamp", stamp_cache.stamp_bytes(stamp))
+
+        return stamp
+
+    '''
+    Renders the text image that will overlay the user image. The text
+    is assembled from the glyph atlas of the font so unique texts only
+    rasterize glyphs not seen before.
+
+    Args:
+        text: Text to apply as the watermark.
+        degrees: Rotation of the text in degrees. Defaults to the
+        rotation of the water marker.
+
+    Returns:
+        Text as an image.
+    '''
+    def _render_text_img(self, text, degrees=None):
+        recorder = self._recorder
 
-        transparent = (0, 0, 0, 0)
-        text_as_img = Image.new('RGBA',
-                                (text_width, text_height), transparent)
+        if degrees is None:
+            degrees = self._style.degrees()
+
+        style = self._style
+        atlas = atlas_cache.atlas(style.font_file(), style.size_pt())
+        if recorder is not None:
+            recorder.lap("font_load")
+
+        layout = atlas.layout(text)
+        if recorder is not None:
+            recorder.lap("getsize")
 
-        img_editor = ImageDraw.Draw(text_as_img)
-        img_editor.text((0, 0), text, self._rgb_colour, font=font)
+        text_as_img = atlas.draw(layout, style.rgb_colour())
+        if recorder is not None:
+            recorder.lap("draw_text", stamp_cache.stamp_bytes(text_as_img))
 
-        if self._reverse:
+        if style.reverse():
             text_as_img = text_as_img.transpose(Image.FLIP_LEFT_RIGHT)
+            if recorder is not None:
+                recorder.lap("transpose",
+                             stamp_cache.stamp_bytes(text_as_img))
 
-        if self._degrees is not 0:
-            text_as_img = text_as_img.rotate(self._degrees, expand=1)
+        if degrees != 0:
+            text_as_img = text_as_img.rotate(degrees, expand=1)
+            if recorder is not None:
+                recorder.lap("rotate", stamp_cache.stamp_bytes(text_as_img))
 
         return text_as_img
 
+    '''
+    Validates the image to watermark.
+
+    Args:
+        img: Image to validate.
+
+    Raises:
+        WaterMarkerTypeError: If the image is none or is not a Pillow
+        Image.
+    '''
+    @staticmethod
+    def _validate_img(img):
+        if img is None:
+            raise WaterMarkerTypeError(
+                "An image must be provided")
+
+        if not isinstance(img, Image.Image):
+            raise WaterMarkerTypeError(
+                "The image parameter must be a Pillow Image")
+
+    '''
+    Validates the margins between the watermarks of a lattice.
+
+    Args:
+        horizontal_margin: Space between watermarks horizontally.
+        vertical_margin: Space between watermarks vertically.
+
+    Raises:
+        WaterMarkerTypeError: If any margin is none or is not an
+        integer.
+        WaterMarkerValueError: If any margin is less than one.
+    '''
+    @staticmethod
+    def _validate_lattice_margins(horizontal_margin, vertical_margin):
+        if horizontal_margin is None:
+            raise WaterMarkerTypeError("Horizontal margin must not be "
+                                       "none")
+
+        if vertical_margin is None:
+            raise WaterMarkerTypeError("Vertical margin must not be "
+                                       "none")
+
+        if not isinstance(horizontal_margin, int):
+            raise WaterMarkerTypeError("Horizontal margin must be an "
+                                       "integer")
+
+        if not isinstance(vertical_margin, int):
+            raise WaterMarkerTypeError("Vertical margin must be an "
+                                       "integer")
+
+        if horizontal_margin < 1:
+            raise WaterMarkerValueError("Horizontal margin must be"
+                                        " greater than 0 (zero)")
+
+        if vertical_margin < 1:
+            raise WaterMarkerValueError("Vertical margin must be"
+                                        " greater than 0 (zero)")
+
     '''
     Validates the watermark text.
     
@@ -847,7 +1198,7 @@ Simple example of usage.
 """
 if __name__ == "__main__":
 
-    image_path = raw_input("Image file to watermark: ")
+    image_path = input("Image file to watermark: ")
     #image_path = "../../_temp/ae2.jpg"
 
     try:
@@ -0,0 +1,413 @@
+"""
+This code is copyrighted work by Paul Williams.
+Distributed under the BSD-3-Clause license available:
+    https://opensource.org/licenses/BSD-3-Clause
+"""
+
+
+from PIL import Image
+
+from project.errors import WaterMarkerTypeError
+from project.errors import WaterMarkerValueError
+from project.plan import WatermarkPlan
+from project.spec import apply_spec
+from project.textual_water_marker import TextualWaterMarker
+
+
+"""
+Bytes per pixel of the raw modes whose rows can be read without
+decoding when the row stride is left implicit.
+"""
+RAW_BYTES_PER_PIXEL = {
+    "L": 1,
+    "RGB": 3,
+    "BGR": 3,
+    "RGBA": 4,
+    "RGBX": 4,
+}
+
+
+class ImageStripSource(object):
+    """
+    Strip source over an image held in memory. Used for formats whose
+    pixels cannot be read a strip at a time, e.g. compressed formats.
+    """
+
+    """
+    Initialiser.
+
+    Args:
+        img: Pillow Image to read strips from.
+    """
+    def __init__(self, img):
+        self._img = img
+
+    """
+    Gets the size of the image.
+
+    Returns:
+        (width, height) tuple.
+    """
+    def size(self):
+        return self._img.size
+
+    """
+    Gets the mode of the image.
+
+    Returns:
+        Pillow mode string.
+    """
+    def mode(self):
+        return self._img.mode
+
+    """
+    Reads a horizontal strip of the image.
+
+    Args:
+        top: First row of the strip.
+        bottom: Row after the last row of the strip.
+
+    Returns:
+        Pillow Image of the strip.
+    """
+    def read_strip(self, top, bottom):
+        return self._img.crop((0, top, self._img.size[0], bottom))
+
+    def close(self):
+        self._img.close()
+
+
+class RawStripSource(object):
+    """
+    Strip source reading the rows of an uncompressed image file, such as
+    PPM, PGM, uncompressed TIFF or BMP, straight from disk so only one
+    strip is in memory at a time.
+    """
+
+    """
+    Initialiser.
+
+    Args:
+        path: Path of the image file.
+
+    Raises:
+        WaterMarkerValueError: If the file's pixels are not stored
+        uncompressed in full width rows, or are palette indices or
+        bilevel, which must be converted before stamps can be pasted.
+        OSError: If the file cannot be opened or is not an image.
+    """
+    def __init__(self, path):
+        img = Image.open(path)
+        try:
+            if img.mode in ("P", "1"):
+                raise WaterMarkerValueError(
+                    "Palette and bilevel images cannot be read as raw rows")
+
+            self._size = img.size
+            self._mode = img.mode
+            self._tiles = [self._parse_tile(tile, img.size)
+                           for tile in img.tile]
+        finally:
+            img.close()
+
+        if len(self._tiles) == 0:
+            raise WaterMarkerValueError(
+                "The image file has no pixel data")
+
+        self._file = open(path, "rb")
+
+    """
+    Gets the size of the image.
+
+    Returns:
+        (width, height) tuple.
+    """
+    def size(self):
+        return self._size
+
+    """
+    Gets the mode of the image.
+
+    Returns:
+        Pillow mode string.
+    """
+    def mode(self):
+        return self._mode
+
+    """
+    Reads a horizontal strip of the image from disk.
+
+    Args:
+        top: First row of the strip.
+        bottom: Row after the last row of the strip.
+
+    Returns:
+        Pillow Image of the strip.
+    """
+    def read_strip(self, top, bottom):
+        width = self._size[0]
+        strip = Image.new(self._mode, (width, bottom - top))
+
+        for tile_top, tile_bottom, offset, rawmode, stride, orientation \
+                in self._tiles:
+            first = max(top, tile_top)
+            last = min(bottom, tile_bottom)
+            if first >= last:
+                continue
+
+            if orientation > 0:
+                row = first - tile_top
+            else:
+                row = tile_bottom - last
+
+            self._file.seek(offset + row * stride)
+            data = self._file.read((last - first) * stride)
+
+            rows = Image.frombytes(self._mode, (width, last - first), data,
+                                   "raw", rawmode, stride, orientation)
+            strip.paste(rows, (0, first - top))
+
+        return strip
+
+    def close(self):
+        self._file.close()
+
+    '''
+    Parses a Pillow tile descriptor into the location of its rows.
+
+    Args:
+        tile: (decoder, box, offset, args) tile descriptor.
+        size: (width, height) of the image.
+
+    Returns:
+        (top, bottom, offset, raw mode, stride, orientation) tuple.
+
+    Raises:
+        WaterMarkerValueError: If the tile is not raw full width rows.
+    '''
+    @staticmethod
+    def _parse_tile(tile, size):
+        decoder, box, offset, args = tile
+
+        if isinstance(args, str):
+            args = (args, 0, 1)
+
+        if decoder != "raw" or box[0] != 0 or box[2] != size[0] \
+                or len(args) < 3:
+            raise WaterMarkerValueError(
+                "The image file is not stored as uncompressed rows")
+
+        rawmode, stride, orientation = args[:3]
+
+        if stride == 0:
+            if rawmode not in RAW_BYTES_PER_PIXEL:
+                raise WaterMarkerValueError(
+                    "The raw mode '{}' is not supported".format(rawmode))
+            stride = size[0] * RAW_BYTES_PER_PIXEL[rawmode]
+
+        return box[1], box[3], offset, rawmode, stride, orientation
+
+
+class PNMStripWriter(object):
+    """
+    Writes an image strip by strip to a binary PGM (greyscale) or PPM
+    (RGB) file so the whole image never needs to be in memory.
+    """
+
+    """
+    Initialiser.
+
+    Args:
+        path: Path of the file to write.
+        size: (width, height) of the image.
+        mode: Pillow mode of the image; 'L' or 'RGB'.
+
+    Raises:
+        WaterMarkerValueError: If the mode is not 'L' or 'RGB'.
+    """
+    def __init__(self, path, size, mode):
+        if mode not in ("L", "RGB"):
+            raise WaterMarkerValueError(
+                "Only 'L' and 'RGB' images can be written as PNM")
+
+        self._size = size
+        self._mode = mode
+        self._file = open(path, "wb")
+
+        magic = "P5" if mode == "L" else "P6"
+        header = "{}\n{} {}\n255\n".format(magic, size[0], size[1])
+        self._file.write(header.encode("ascii"))
+
+    """
+    Appends the next strip of the image.
+
+    Args:
+        strip: Pillow Image of the strip; full width and in the writer's
+        mode.
+    """
+    def write_strip(self, strip):
+        if strip.mode != self._mode:
+            strip = strip.convert(self._mode)
+        self._file.write(strip.tobytes())
+
+    def close(self):
+        self._file.close()
+
+
+class TiledWaterMarker(TextualWaterMarker):
+    """
+    Applies textual watermarks to an image one horizontal strip at a
+    time, so peak memory is bounded by the strip size rather than the
+    image size. Operations are always deferred; write() then works out
+    which stamps intersect each strip, composites them and writes the
+    strip out before reading the next.
+    """
+
+    """
+    Initialiser.
+
+    Args:
+        source: Strip source, e.g. a RawStripSource or
+        ImageStripSource.
+        strip_height: Number of rows per strip. Defaults to 256.
+
+    Raises:
+        WaterMarkerTypeError: If the source is none or the strip height
+        is not an integer.
+        WaterMarkerValueError: If the strip height is less than 1.
+    """
+    def __init__(self, source, strip_height=256):
+        if source is None:
+            raise WaterMarkerTypeError(
+                "A strip source must be provided")
+
+        if not isinstance(strip_height, int):
+            raise WaterMarkerTypeError(
+                "The strip height must be an integer")
+
+        if strip_height < 1:
+            raise WaterMarkerValueError(
+                "The strip height must be 1 or greater")
+
+        self._source = source
+        self._strip_height = strip_height
+        self._plan = WatermarkPlan(source.size())
+
+    """
+    Tiled watermarking is always deferred.
+
+    Args:
+        defer: Must be True.
+
+    Returns:
+        Self; instance that received the invocation.
+
+    Raises:
+        WaterMarkerValueError: If defer is not True.
+    """
+    def defer(self, defer):
+        if defer is not True:
+            raise WaterMarkerValueError(
+                "Tiled watermarking is always deferred")
+        return self
+
+    """
+    Tiled images are never held whole in memory; use write() instead.
+
+    Raises:
+        WaterMarkerValueError: Always.
+    """
+    def collect(self):
+        raise WaterMarkerValueError(
+            "Tiled images are written strip by strip with write()")
+
+    """
+    Reads, watermarks and writes the image one strip at a time.
+
+    Args:
+        writer: Strip writer, e.g. a PNMStripWriter, with a
+        write_strip(strip) method.
+
+    Returns:
+        Number of strips written.
+    """
+    def write(self, writer):
+        width, height = self._source.size()
+        strips = 0
+
+        for top in range(0, height, self._strip_height):
+            bottom = min(top + self._strip_height, height)
+            strip = self._source.read_strip(top, bottom)
+
+            self._plan.render_region(strip, (0, top))
+            writer.write_strip(strip)
+            strips += 1
+
+        return strips
+
+    '''
+    Gets the size of the image being watermarked.
+
+    Returns:
+        (width, height) tuple.
+    '''
+    def _img_size(self):
+        return self._source.size()
+
+
+"""
+Opens a strip source for an image file, reading rows straight from disk
+when the file is uncompressed and otherwise decoding it whole. Palette
+images are decoded whole and converted to RGB, and bilevel images to
+greyscale, so stamps keep their colours.
+
+Args:
+    path: Path of the image file.
+
+Returns:
+    RawStripSource or, for compressed formats, ImageStripSource.
+
+Raises:
+    OSError: If the file cannot be opened or is not an image.
+"""
+def open_strip_source(path):
+    try:
+        return RawStripSource(path)
+    except WaterMarkerValueError:
+        img = Image.open(path)
+
+    if img.mode == "P":
+        img = img.convert("RGB")
+    elif img.mode == "1":
+        img = img.convert("L")
+
+    return ImageStripSource(img)
+
+
+"""
+Watermarks an image file strip by strip with a spec and writes the
+result as PGM or PPM.
+
+Args:
+    path: Path of the image file to watermark.
+    output_path: Path of the PGM or PPM file to write.
+    spec: Valid spec dictionary.
+    strip_height: Number of rows per strip. Defaults to 256.
+
+Returns:
+    Number of strips written.
+"""
+def watermark_tiled(path, output_path, spec, strip_height=256):
+    source = open_strip_source(path)
+    try:
+        water_marker = TiledWaterMarker(source, strip_height)
+        apply_spec(water_marker, spec)
+
+        mode = "L" if source.mode() == "L" else "RGB"
+        writer = PNMStripWriter(output_path, source.size(), mode)
+        try:
+            return water_marker.write(writer)
+        finally:
+            writer.close()
+    finally:
+        source.close()
@@ -0,0 +1,202 @@
+"""
+This code is copyrighted work by Paul Williams.
+Distributed under the BSD-3-Clause license available:
+    https://opensource.org/licenses/BSD-3-Clause
+"""
+
+
+from threading import Lock
+from weakref import ref
+
+import numpy
+
+from project.compositing import paste_layer
+
+
+"""
+Fixed cost of one paste measured in pixels blended. A stamp is only
+split into another piece when that saves blending more pixels than
+this.
+"""
+PASTE_OVERHEAD_PIXELS = 1024
+
+
+_trimmed = {}
+_pieces = {}
+_lock = Lock()
+
+
+"""
+Crops a stamp to the box bounding its visible pixels. Rotated stamps
+are mostly transparent corners, which otherwise get blended on every
+paste. Results are remembered per stamp, so stamps must not be modified
+after they are first trimmed.
+
+Args:
+    stamp: RGBA stamp image.
+
+Returns:
+    (trimmed stamp, (x, y)) tuple where (x, y) is the position of the
+    trimmed stamp within the stamp. A stamp without transparent padding,
+    or without any visible pixel, is returned as is at (0, 0).
+"""
+def trim_stamp(stamp):
+    trimmed = _remembered(_trimmed, stamp, _trim)
+    if trimmed is None:
+        return stamp, (0, 0)
+    return trimmed
+
+
+"""
+Splits a stamp into horizontal bands, each cropped to the visible pixels
+of its rows. Rows are grouped greedily: a row joins the band above it
+unless pasting it separately saves more than PASTE_OVERHEAD_PIXELS, so
+a horizontal stamp stays whole while a diagonal one becomes a staircase
+of narrow pieces covering little more than its ink. Results are
+remembered per stamp.
+
+Args:
+    stamp: RGBA stamp image.
+
+Returns:
+    Tuple of (piece, (x, y)) tuples where (x, y) is the position of the
+    piece within the stamp. Pasting every piece gives the same pixels
+    as pasting the stamp.
+"""
+def ink_pieces(stamp):
+    pieces = _remembered(_pieces, stamp, _cut_pieces)
+    if pieces is None:
+        return ((stamp, (0, 0)),)
+    return pieces
+
+
+"""
+Pastes a stamp piece by piece so only the bands holding ink are
+blended.
+
+Args:
+    target: Pillow Image to paste onto.
+    stamp: RGBA stamp image.
+    position: (x, y) position of the stamp's top left corner.
+    blit: Function applying a layer to the target at a position.
+    Defaults to pasting with the layer's alpha as the mask.
+"""
+def paste_pieces(target, stamp, position, blit=paste_layer):
+    x, y = position
+    for piece, (dx, dy) in ink_pieces(stamp):
+        blit(target, piece, (x + dx, y + dy))
+
+
+'''
+Gets a result remembered for a stamp, working it out on first use. Pillow
+images are not hashable so results are held by the stamp's id until the
+stamp is garbage collected.
+
+Args:
+    results: Dictionary of (weak reference, result) tuples by stamp id.
+    stamp: RGBA stamp image.
+    work_out: Function receiving the stamp and returning the result.
+
+Returns:
+    The result.
+'''
+def _remembered(results, stamp, work_out):
+    key = id(stamp)
+
+    with _lock:
+        entry = results.get(key)
+        if entry is not None and entry[0]() is stamp:
+            return entry[1]
+
+    result = work_out(stamp)
+
+    def forget(_, results=results, key=key):
+        with _lock:
+            entry = results.get(key)
+            if entry is not None and entry[0]() is None:
+                del results[key]
+
+    with _lock:
+        results[key] = (ref(stamp, forget), result)
+
+    return result
+
+
+'''
+Crops a stamp to the box bounding its visible pixels.
+
+Args:
+    stamp: RGBA stamp image.
+
+Returns:
+    (trimmed stamp, (x, y)) tuple or None if there is nothing to trim;
+    the stamp itself is never held so it can be garbage collected.
+'''
+def _trim(stamp):
+    box = stamp.getchannel('A').getbbox()
+
+    if box is None or box == (0, 0) + stamp.size:
+        return None
+
+    return stamp.crop(box), box[:2]
+
+
+'''
+Cuts a stamp into its ink bands.
+
+Args:
+    stamp: RGBA stamp image.
+
+Returns:
+    Tuple of (piece, (x, y)) tuples or None if the stamp is one piece.
+'''
+def _cut_pieces(stamp):
+    bands = _ink_bands(stamp)
+
+    if len(bands) <= 1:
+        return None
+
+    return tuple((stamp.crop(box), box[:2]) for box in bands)
+
+
+'''
+Groups the rows of a stamp into bands bounding their visible pixels.
+
+Args:
+    stamp: RGBA stamp image.
+
+Returns:
+    List of (left, top, right, bottom) boxes.
+'''
+def _ink_bands(stamp):
+    visible = numpy.asarray(stamp.getchannel('A')) > 0
+    inked = visible.any(axis=1)
+    lefts = visible.argmax(axis=1)
+    rights = stamp.size[0] - visible[:, ::-1].argmax(axis=1)
+
+    bands = []
+    band = None
+
+    for row in numpy.flatnonzero(inked).tolist():
+        left, right = int(lefts[row]), int(rights[row])
+
+        if band is not None:
+            band_left, band_top, band_right, band_bottom = band
+            merged = (row + 1 - band_top) \
+                * (max(right, band_right) - min(left, band_left))
+            separate = (band_bottom - band_top) * (band_right - band_left) \
+                + (right - left) + PASTE_OVERHEAD_PIXELS
+
+            if merged <= separate:
+                band = (min(left, band_left), band_top,
+                        max(right, band_right), row + 1)
+                continue
+
+            bands.append(band)
+
+        band = (left, row, right, row + 1)
+
+    if band is not None:
+        bands.append(band)
+
+    return bands
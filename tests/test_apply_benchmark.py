@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+
+import json
+import os
+import tempfile
+import unittest
+from benchmarks.apply_benchmark import METHODS
+from benchmarks.apply_benchmark import benchmark_cases
+from benchmarks.apply_benchmark import find_regressions
+from benchmarks.apply_benchmark import image_size
+from benchmarks.apply_benchmark import main
+from benchmarks.apply_benchmark import run_benchmarks
+from benchmarks.apply_benchmark import time_case
+from PIL import Image
+from project.glyph_atlas import atlas_cache
+
+
+class Apply_Benchmark_Tester(unittest.TestCase):
+    """
+    Tests the apply method benchmark suite.
+    """
+
+    @staticmethod
+    def _result(method, best_s):
+        return {"method": method, "megapixels": 1, "font_size": 12,
+                "rotation": 0, "reverse": False, "best_s": best_s}
+
+    '''
+    image_size
+    '''
+    def test__image_size__megapixels__close_to_area(self):
+        width, height = image_size(12)
+        self.assertEqual((4000, 3000), (width, height))
+
+    '''
+    benchmark_cases
+    '''
+    def test__benchmark_cases__parameters__every_combination(self):
+        cases = list(benchmark_cases(["centre", "lattice"], [1, 2], [12],
+                                     [0, 45], [False, True]))
+        self.assertEqual(16, len(cases))
+
+    '''
+    run_benchmarks
+    '''
+    def test__run_benchmarks__every_method__timed(self):
+        cases = benchmark_cases(list(METHODS), [0.05], [12], [0, 45],
+                                [False, True])
+        results = run_benchmarks(cases, "Arial_Bold.ttf", 1)
+        self.assertEqual(len(METHODS) * 4, len(results))
+        for result in results:
+            self.assertGreater(result["best_s"], 0)
+
+    '''
+    time_case
+    '''
+    def test__time_case__cold__clears_atlas_cache(self):
+        case = next(benchmark_cases(["centre"], [0.05], [12], [0], [False]))
+        atlas_cache.put(("sentinel.ttf", 12), object())
+
+        time_case(case, Image.new('RGB', (100, 100)), "Arial_Bold.ttf", 1,
+                  cold=True)
+
+        self.assertNotIn(("sentinel.ttf", 12), atlas_cache)
+
+    '''
+    find_regressions
+    '''
+    def test__find_regressions__slower_past_threshold__reported(self):
+        baseline = {"results": [self._result("centre", 0.010),
+                                self._result("lattice", 0.010)]}
+        results = [self._result("centre", 0.011),
+                   self._result("lattice", 0.020)]
+        regressions = find_regressions(results, baseline, 0.25, 0.001)
+        self.assertEqual(["lattice"], [r[0]["method"] for r in regressions])
+
+    def test__find_regressions__slowdown_within_noise__ignored(self):
+        baseline = {"results": [self._result("centre", 0.0001)]}
+        results = [self._result("centre", 0.0005)]
+        self.assertEqual([], find_regressions(results, baseline, 0.25,
+                                              0.001))
+
+    def test__find_regressions__case_not_in_baseline__ignored(self):
+        baseline = {"results": [self._result("centre", 0.010)]}
+        results = [self._result("lattice", 1.0)]
+        self.assertEqual([], find_regressions(results, baseline, 0.25,
+                                              0.001))
+
+    '''
+    main
+    '''
+    def test__main__regressed_against_baseline__returns_1(self):
+        with tempfile.TemporaryDirectory() as temp:
+            baseline = os.path.join(temp, "baseline.json")
+            with open(baseline, "w") as output:
+                json.dump({"results": [dict(self._result("centre", 0.0),
+                                            megapixels=0.05)]}, output)
+
+            actual = main(["--methods", "centre", "--megapixels", "0.05",
+                           "--font-sizes", "12", "--rotations", "0",
+                           "--reverses", "false", "--repeats", "1",
+                           "--noise", "0", "--threshold", "0",
+                           "-o", os.path.join(temp, "run.json"),
+                           "--baseline", baseline])
+
+            self.assertEqual(1, actual)
+
+    def test__main__output__writes_json_report(self):
+        with tempfile.TemporaryDirectory() as temp:
+            path = os.path.join(temp, "run.json")
+            actual = main(["--methods", "corner", "--megapixels", "0.05",
+                           "--font-sizes", "12", "--rotations", "0",
+                           "--reverses", "false", "--repeats", "1",
+                           "-o", path])
+
+            with open(path) as report:
+                results = json.load(report)["results"]
+
+            self.assertEqual(0, actual)
+            self.assertEqual("corner", results[0]["method"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,198 @@
+#!/usr/bin/env python
+
+import asyncio
+import threading
+import time
+import unittest
+from PIL import Image
+from project.async_water_marker import AsyncTextualWaterMarker
+from project.async_water_marker import WatermarkExecutor
+from project.textual_water_marker import Corner
+from project.textual_water_marker import TextualWaterMarker
+from project.textual_water_marker import WaterMarkerTypeError
+from project.textual_water_marker import WaterMarkerValueError
+
+
+class Watermark_Executor_Tester(unittest.IsolatedAsyncioTestCase):
+    """
+    Tests the WatermarkExecutor class.
+    """
+
+    def setUp(self):
+        self._executor = WatermarkExecutor(2)
+
+    def tearDown(self):
+        self._executor.shutdown()
+
+    '''
+    __init__
+    '''
+    def test__init__max_workers_not_int__raises_wm_type_error(self):
+        self.assertRaises(WaterMarkerTypeError, WatermarkExecutor, "2")
+
+    def test__init__max_workers_lt_1__raises_wm_value_error(self):
+        self.assertRaises(WaterMarkerValueError, WatermarkExecutor, 0)
+
+    '''
+    run
+    '''
+    async def test__run__function__returns_result(self):
+        actual = await self._executor.run(pow, 2, 10)
+        self.assertEqual(1024, actual)
+
+    async def test__run__function_raises__exception_propagates(self):
+        with self.assertRaises(ZeroDivisionError):
+            await self._executor.run(lambda: 1 / 0)
+
+    async def test__run__many_calls__at_most_max_workers_at_once(self):
+        lock = threading.Lock()
+        running = [0]
+        peak = [0]
+
+        def work():
+            with lock:
+                running[0] += 1
+                peak[0] = max(peak[0], running[0])
+            time.sleep(0.02)
+            with lock:
+                running[0] -= 1
+
+        await asyncio.gather(*[self._executor.run(work)
+                               for _ in range(8)])
+        self.assertEqual(2, peak[0])
+
+    async def test__run__cancelled_while_queued__never_runs(self):
+        release = threading.Event()
+        started = []
+
+        blockers = [asyncio.ensure_future(self._executor.run(release.wait))
+                    for _ in range(2)]
+        queued = asyncio.ensure_future(
+            self._executor.run(started.append, 1))
+        await asyncio.sleep(0.05)
+
+        queued.cancel()
+        release.set()
+        await asyncio.gather(*blockers)
+
+        with self.assertRaises(asyncio.CancelledError):
+            await queued
+        self.assertEqual([], started)
+
+    async def test__run__cancelled_while_running__waits_for_function(self):
+        finished = []
+
+        def work():
+            time.sleep(0.05)
+            finished.append(1)
+
+        task = asyncio.ensure_future(self._executor.run(work))
+        await asyncio.sleep(0.01)
+        task.cancel()
+
+        with self.assertRaises(asyncio.CancelledError):
+            await task
+        self.assertEqual([1], finished)
+
+    async def test__run__cancelled_while_running__function_error_raised(self):
+        def work():
+            time.sleep(0.05)
+            raise ValueError("failed")
+
+        task = asyncio.ensure_future(self._executor.run(work))
+        await asyncio.sleep(0.01)
+        task.cancel()
+
+        with self.assertRaises(ValueError):
+            await task
+
+
+class Async_Water_Marker_Tester(unittest.IsolatedAsyncioTestCase):
+    """
+    Tests the AsyncTextualWaterMarker class.
+    """
+
+    _white = (255, 255, 255)
+
+    def setUp(self):
+        self._executor = WatermarkExecutor(4)
+
+    def tearDown(self):
+        self._executor.shutdown()
+
+    def _water_marker(self):
+        img = Image.new('RGB', (200, 120), self._white)
+        return AsyncTextualWaterMarker(img, self._executor)
+
+    '''
+    __init__
+    '''
+    def test__init__img_is_none__raises_wm_type_error(self):
+        self.assertRaises(WaterMarkerTypeError, AsyncTextualWaterMarker,
+                          None)
+
+    '''
+    apply
+    '''
+    async def test__apply_corner__same_as_sync(self):
+        expected = TextualWaterMarker(Image.new('RGB', (200, 120),
+                                                self._white))\
+            .size(16)\
+            .apply_corner("CORNER", Corner.bottom_right())
+
+        actual = await self._water_marker()\
+            .size(16)\
+            .apply_corner("CORNER", Corner.bottom_right())
+
+        self.assertEqual(expected.tobytes(), actual.tobytes())
+
+    async def test__apply_centre__empty_text__raises_wm_value_error(self):
+        with self.assertRaises(WaterMarkerValueError):
+            await self._water_marker().apply_centre(" ")
+
+    async def test__apply__gathered__style_captured_when_called(self):
+        expected = TextualWaterMarker(Image.new('RGB', (200, 120),
+                                                self._white))
+        expected.size(10).apply_absolute("SMALL", 5, 5)
+        expected.size(30).apply_absolute("LARGE", 5, 40)
+
+        wm = self._water_marker()
+        await asyncio.gather(wm.size(10).apply_absolute("SMALL", 5, 5),
+                             wm.size(30).apply_absolute("LARGE", 5, 40))
+
+        actual = await wm.collect()
+        self.assertEqual(expected.collect().tobytes(), actual.tobytes())
+
+    async def test__apply__many_images__all_watermarked(self):
+        expected = TextualWaterMarker(Image.new('RGB', (200, 120),
+                                                self._white))\
+            .apply_lattice("LATTICE", 10, 10)
+
+        water_markers = [self._water_marker() for _ in range(6)]
+        actual = await asyncio.gather(*[wm.apply_lattice("LATTICE", 10, 10)
+                                        for wm in water_markers])
+
+        for img in actual:
+            self.assertEqual(expected.tobytes(), img.tobytes())
+
+    '''
+    defer
+    '''
+    async def test__defer__collected__same_as_sync(self):
+        expected = TextualWaterMarker(Image.new('RGB', (200, 120),
+                                                self._white))
+        expected.apply_centre("CENTRE")
+        expected.apply_random("RANDOM", 5, 7)
+
+        wm = self._water_marker()
+        await wm.defer(True)
+        await wm.apply_centre("CENTRE")
+        await wm.apply_random("RANDOM", 5, 7)
+        self.assertEqual(2, len(wm.plan()))
+
+        actual = await wm.collect()
+        self.assertEqual(expected.collect().tobytes(), actual.tobytes())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+
+import numpy
+import unittest
+from PIL import Image
+from project.band_compositor import BandCompositor
+from project.errors import WaterMarkerTypeError
+from project.errors import WaterMarkerValueError
+from project.plan import WatermarkPlan
+from project.textual_water_marker import Corner
+from project.textual_water_marker import TextualWaterMarker
+
+
+class Band_Compositor_Tester(unittest.TestCase):
+    """
+    Tests the BandCompositor class against compositing on one thread.
+    """
+
+    @staticmethod
+    def _watermark(compositor, defer, mode='RGB'):
+        img = Image.new(mode, (640, 480), (20, 120, 200))
+        wm = TextualWaterMarker(img).compositor(compositor).defer(defer)
+        wm.colour((255, 255, 255)).size(14)
+        wm.apply_corner("CORNER", Corner.bottom_right())
+        wm.rotation(30).apply_lattice("LATTICE", 9, 7)
+        wm.apply_random("RANDOM", 25, 3)
+        wm.rotation(0).apply_centre("CENTRE")
+        return wm.collect()
+
+    def _assert_same_as_serial(self, threads, defer, mode='RGB'):
+        compositor = BandCompositor(threads, min_band_height=16)
+        try:
+            expected = self._watermark(None, defer, mode)
+            actual = self._watermark(compositor, defer, mode)
+        finally:
+            compositor.shutdown()
+
+        self.assertTrue(numpy.array_equal(numpy.asarray(expected),
+                                          numpy.asarray(actual)))
+
+    '''
+    apply
+    '''
+    def test__apply__eager_many_threads__identical_to_serial(self):
+        for threads in (2, 3, 7):
+            self._assert_same_as_serial(threads, False)
+
+    def test__apply__deferred_many_threads__identical_to_serial(self):
+        for threads in (2, 3, 7):
+            self._assert_same_as_serial(threads, True)
+
+    def test__apply__rgba_image__identical_to_serial(self):
+        self._assert_same_as_serial(4, True, 'RGBA')
+
+    def test__apply__crowded_random_stamps__identical_to_serial(self):
+        expected = Image.new('RGB', (640, 480), (20, 120, 200))
+        actual = expected.copy()
+        compositor = BandCompositor(8, min_band_height=16)
+        try:
+            for img, band_compositor in ((expected, None),
+                                         (actual, compositor)):
+                wm = TextualWaterMarker(img).compositor(band_compositor)
+                wm.colour((255, 255, 255)).size(14).rotation(30)
+                wm.apply_random("RANDOM", 250, 3)
+        finally:
+            compositor.shutdown()
+
+        self.assertTrue(numpy.array_equal(numpy.asarray(expected),
+                                          numpy.asarray(actual)))
+
+    def test__apply__size_mismatch__raises_wm_value_error(self):
+        compositor = BandCompositor(2)
+        try:
+            self.assertRaises(WaterMarkerValueError, compositor.apply,
+                              Image.new('RGB', (10, 10)),
+                              WatermarkPlan((20, 20)))
+        finally:
+            compositor.shutdown()
+
+    '''
+    bands
+    '''
+    def test__bands__tall_image__one_band_per_thread(self):
+        compositor = BandCompositor(3, min_band_height=10)
+        actual = compositor.bands((50, 100))
+        compositor.shutdown()
+        self.assertEqual([(0, 0, 50, 33), (0, 33, 50, 66),
+                          (0, 66, 50, 100)], actual)
+
+    def test__bands__short_image__fewer_bands(self):
+        compositor = BandCompositor(8, min_band_height=64)
+        actual = compositor.bands((50, 130))
+        compositor.shutdown()
+        self.assertEqual(2, len(actual))
+
+    '''
+    __init__
+    '''
+    def test__init__threads_not_int__raises_wm_type_error(self):
+        self.assertRaises(WaterMarkerTypeError, BandCompositor, "4")
+
+    def test__init__threads_lt_1__raises_wm_value_error(self):
+        self.assertRaises(WaterMarkerValueError, BandCompositor, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
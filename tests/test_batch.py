@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+
+import numpy
+import unittest
+from PIL import Image
+from project.batch import watermark_batch
+from project.errors import WaterMarkerTypeError
+from project.errors import WaterMarkerValueError
+from project.stamp_cache import stamp_cache
+from project.style import WatermarkStyle
+from project.textual_water_marker import Corner
+from project.textual_water_marker import TextualWaterMarker
+
+
+class Batch_Tester(unittest.TestCase):
+    """
+    Tests watermark_batch against watermarking each image on its own.
+    """
+
+    STYLE = {"size": 16, "colour": [255, 255, 255], "rotation": 30}
+
+    @staticmethod
+    def _jobs(count):
+        return [(Image.new('RGB', (120, 80), (10 * i, 60, 90)),
+                 "SERIAL-{:04d}".format(i)) for i in range(count)]
+
+    '''
+    watermark_batch
+    '''
+    def test__watermark_batch__many_jobs__same_as_one_by_one(self):
+        expected = []
+        for img, text in self._jobs(5):
+            wm = TextualWaterMarker(img).size(16).colour((255, 255, 255))
+            expected.append(wm.rotation(30)
+                            .apply_corner(text, Corner.bottom_right()))
+
+        actual = list(watermark_batch(self._jobs(5), self.STYLE, "corner",
+                                      (Corner.bottom_right(),),
+                                      chunk_size=2))
+
+        self.assertEqual(len(expected), len(actual))
+        for expected_img, actual_img in zip(expected, actual):
+            self.assertTrue(numpy.array_equal(numpy.asarray(expected_img),
+                                              numpy.asarray(actual_img)))
+
+    def test__watermark_batch__many_jobs__shared_stamp_cache_untouched(self):
+        stamp_cache.clear()
+        list(watermark_batch(self._jobs(5), self.STYLE, "centre",
+                             chunk_size=2))
+        self.assertEqual(0, len(stamp_cache))
+
+    def test__watermark_batch__watermark_style__same_as_dictionary(self):
+        style = WatermarkStyle(size_pt=16, rgb_colour=(255, 255, 255),
+                               degrees=30)
+        expected = watermark_batch(self._jobs(3), self.STYLE, "centre")
+        actual = watermark_batch(self._jobs(3), style, "centre")
+
+        for expected_img, actual_img in zip(expected, actual):
+            self.assertTrue(numpy.array_equal(numpy.asarray(expected_img),
+                                              numpy.asarray(actual_img)))
+
+    def test__watermark_batch__results_consumed__jobs_read_per_chunk(self):
+        read = []
+
+        def jobs():
+            for job in self._jobs(10):
+                read.append(job)
+                yield job
+
+        results = watermark_batch(jobs(), self.STYLE, "centre",
+                                  chunk_size=3)
+        self.assertEqual(0, len(read))
+
+        next(results)
+        self.assertEqual(3, len(read))
+
+    def test__watermark_batch__invalid_text__raises_at_its_job(self):
+        jobs = self._jobs(3)
+        jobs[1] = (jobs[1][0], " ")
+        results = watermark_batch(jobs, self.STYLE, "centre")
+
+        next(results)
+        self.assertRaises(WaterMarkerValueError, next, results)
+
+    def test__watermark_batch__style_not_dict__raises_wm_type_error(self):
+        self.assertRaises(WaterMarkerTypeError, watermark_batch,
+                          self._jobs(1), None, "centre")
+
+    def test__watermark_batch__unknown_style_key__raises_wm_value_error(self):
+        self.assertRaises(WaterMarkerValueError, watermark_batch,
+                          self._jobs(1), {"shadow": 1}, "centre")
+
+    def test__watermark_batch__invalid_style__raises_wm_value_error(self):
+        self.assertRaises(WaterMarkerValueError, watermark_batch,
+                          self._jobs(1), {"size": 0}, "centre")
+
+    def test__watermark_batch__unknown_apply__raises_wm_value_error(self):
+        self.assertRaises(WaterMarkerValueError, watermark_batch,
+                          self._jobs(1), self.STYLE, "middle")
+
+    def test__watermark_batch__chunk_size_lt_1__raises_wm_value_error(self):
+        self.assertRaises(WaterMarkerValueError, watermark_batch,
+                          self._jobs(1), self.STYLE, "centre",
+                          chunk_size=0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,193 @@
+#!/usr/bin/env python
+
+import json
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stderr
+from contextlib import redirect_stdout
+from io import StringIO
+from PIL import Image
+from project.cli import ThroughputReport
+from project.cli import find_images
+from project.cli import init_worker
+from project.cli import main
+from project.cli import output_paths
+from project.cli import watermark_path
+from project.cli import worker_spec
+from project.errors import WaterMarkerValueError
+from project.spec import apply_spec
+from project.textual_water_marker import TextualWaterMarker
+
+
+class CLI_Tester(unittest.TestCase):
+    """
+    Tests the batch watermarking command line tool.
+    """
+
+    _spec = {"operations": [{"apply": "centre", "text": "CENTRE"}]}
+
+    def setUp(self):
+        self._temp = tempfile.TemporaryDirectory()
+        self._input_dir = os.path.join(self._temp.name, "in")
+        self._output_dir = os.path.join(self._temp.name, "out")
+        os.makedirs(self._input_dir)
+
+        for index in range(5):
+            img = Image.new('RGB', (200, 100), (index * 40, 90, 160))
+            img.save(os.path.join(self._input_dir, "{}.png".format(index)))
+
+        with open(os.path.join(self._input_dir, "notes.txt"), "w") as notes:
+            notes.write("Not an image")
+
+    def tearDown(self):
+        self._temp.cleanup()
+
+    def _run(self, *args):
+        output = StringIO()
+        with redirect_stdout(output):
+            status = main(list(args))
+        return status, output.getvalue()
+
+    '''
+    find_images
+    '''
+    def test__find_images__directory__returns_image_files(self):
+        actual = find_images([self._input_dir])
+        self.assertEqual(5, len(actual))
+
+    def test__find_images__glob__returns_matches(self):
+        pattern = os.path.join(self._input_dir, "[0-1].png")
+        actual = find_images([pattern])
+        self.assertEqual(2, len(actual))
+
+    def test__find_images__duplicates__returned_once(self):
+        path = os.path.join(self._input_dir, "0.png")
+        actual = find_images([path, self._input_dir])
+        self.assertEqual(5, len(actual))
+
+    '''
+    main
+    '''
+    def test__main__directory_and_spec__writes_watermarked_images(self):
+        status, output = self._run(self._input_dir,
+                                   "--spec", json.dumps(self._spec),
+                                   "--output-dir", self._output_dir,
+                                   "--workers", "2",
+                                   "--chunksize", "2")
+        self.assertEqual(0, status)
+        self.assertEqual(5, len(os.listdir(self._output_dir)))
+        self.assertIn("images/sec", output)
+        self.assertIn("MB/sec", output)
+
+        original = Image.open(os.path.join(self._input_dir, "0.png"))
+        marked = Image.open(os.path.join(self._output_dir, "0.png"))
+        self.assertNotEqual(original.tobytes(), marked.tobytes())
+
+    def test__main__output_over_input__reports_failure(self):
+        status, output = self._run(self._input_dir,
+                                   "--spec", json.dumps(self._spec),
+                                   "--output-dir", self._input_dir,
+                                   "--workers", "1")
+        self.assertEqual(1, status)
+        self.assertIn("FAILED", output)
+
+    def test__main__same_names_in_two_directories__keeps_both(self):
+        for name in ("a", "b"):
+            directory = os.path.join(self._temp.name, name)
+            os.makedirs(directory)
+            Image.new('RGB', (200, 100)).save(
+                os.path.join(directory, "x.png"))
+
+        status, _ = self._run(os.path.join(self._temp.name, "a"),
+                              os.path.join(self._temp.name, "b"),
+                              "--spec", json.dumps(self._spec),
+                              "--output-dir", self._output_dir,
+                              "--workers", "1")
+        self.assertEqual(0, status)
+        self.assertTrue(os.path.isfile(
+            os.path.join(self._output_dir, "a", "x.png")))
+        self.assertTrue(os.path.isfile(
+            os.path.join(self._output_dir, "b", "x.png")))
+
+    def test__main__invalid_style_value__reports_error(self):
+        spec = {"size": -1, "operations": self._spec["operations"]}
+        errors = StringIO()
+        with redirect_stderr(errors):
+            status, _ = self._run(self._input_dir,
+                                  "--spec", json.dumps(spec),
+                                  "--output-dir", self._output_dir,
+                                  "--workers", "1")
+        self.assertEqual(2, status)
+        self.assertIn("font size", errors.getvalue())
+
+    def test__main__invalid_operation_argument__reports_error(self):
+        spec = {"operations": [{"apply": "corner", "text": "CORNER",
+                                "corner": "middle"}]}
+        errors = StringIO()
+        with redirect_stderr(errors):
+            status, _ = self._run(self._input_dir,
+                                  "--spec", json.dumps(spec),
+                                  "--output-dir", self._output_dir,
+                                  "--workers", "1")
+        self.assertEqual(2, status)
+        self.assertIn("Unknown corner", errors.getvalue())
+
+    '''
+    output_paths
+    '''
+    def test__output_paths__one_directory__keeps_names(self):
+        paths = [os.path.join("in", "a.png"), os.path.join("in", "b.png")]
+        self.assertEqual([os.path.join("out", "a.png"),
+                          os.path.join("out", "b.png")],
+                         output_paths(paths, "out"))
+
+    def test__output_paths__same_file_twice__raises_value_error(self):
+        paths = ["a.png", os.path.join(".", "a.png")]
+        self.assertRaises(WaterMarkerValueError, output_paths, paths, "out")
+
+    '''
+    watermark_path
+    '''
+    def test__watermark_path__rgba_image__identical_to_eager(self):
+        spec = {"colour": [200, 30, 30],
+                "operations": [{"apply": "random", "text": "RANDOM",
+                                "quantity": 20, "seed": 7},
+                               {"apply": "lattice", "text": "LATTICE",
+                                "horizontal_margin": 10,
+                                "vertical_margin": 10}]}
+        path = os.path.join(self._input_dir, "alpha.png")
+        Image.new('RGBA', (200, 100), (20, 90, 160, 100)).save(path)
+        output_path = os.path.join(self._output_dir, "alpha.png")
+
+        actual = watermark_path(path, output_path, spec, {})
+        expected = Image.open(path)
+        apply_spec(TextualWaterMarker(expected), spec)
+
+        self.assertIsNone(actual[3])
+        self.assertEqual(expected.tobytes(),
+                         Image.open(output_path).tobytes())
+
+    '''
+    init_worker
+    '''
+    def test__init_worker__spec__kept_as_worker_spec(self):
+        init_worker(self._spec)
+        self.assertEqual(self._spec, worker_spec())
+
+    '''
+    ThroughputReport
+    '''
+    def test__report__results__computes_rates(self):
+        report = ThroughputReport()
+        report.add(("a.png", 2000000, 1, None))
+        report.add(("b.png", 2000000, 1, None))
+        report.add(("c.png", 0, 0, "broken"))
+        report.seconds = 2.0
+        self.assertEqual(1.0, report.images_per_second())
+        self.assertEqual(2.0, report.megabytes_per_second())
+        self.assertEqual(1, len(report.failures))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+
+import numpy
+import unittest
+from PIL import Image
+from project.culling import BorderCounter
+from project.culling import border_counter
+from project.culling import classify_copies
+from project.culling import whole_cells
+from project.lattice import paste_lattice
+from project.placement import Placement
+from project.scatter import scattered_overlay
+
+
+class Culling_Tester(unittest.TestCase):
+    """
+    Tests culling and clipping stamps at the image border.
+    """
+
+    def setUp(self):
+        border_counter.clear()
+
+    @staticmethod
+    def _stamp(width=10, height=6):
+        stamp = Image.new('RGBA', (width, height), (200, 40, 90, 255))
+        stamp.putpixel((0, 0), (200, 40, 90, 128))
+        return stamp
+
+    @staticmethod
+    def _lattice_counts(start, stamp_size, margins, img_size):
+        whole, clipped, culled = 0, 0, 0
+
+        for y in range(start[1], img_size[1],
+                       stamp_size[1] + margins[1]):
+            for x in range(start[0], img_size[0],
+                           stamp_size[0] + margins[0]):
+                if x + stamp_size[0] <= 0 or y + stamp_size[1] <= 0:
+                    culled += 1
+                elif x >= 0 and y >= 0 \
+                        and x + stamp_size[0] <= img_size[0] \
+                        and y + stamp_size[1] <= img_size[1]:
+                    whole += 1
+                else:
+                    clipped += 1
+
+        return whole, clipped, culled
+
+    '''
+    classify_copies
+    '''
+    def test__classify_copies__around_border__visible_and_whole(self):
+        positions = numpy.array([(0, 0), (95, 10), (-10, 10), (50, 45),
+                                 (200, 0)])
+        visible, whole = classify_copies(positions, (10, 6), (100, 50))
+        self.assertEqual([True, True, False, True, False], visible.tolist())
+        self.assertEqual([True, False, False, False, False], whole.tolist())
+
+    '''
+    whole_cells
+    '''
+    def test__whole_cells__many_layouts__same_as_counting(self):
+        for start in range(-12, 12):
+            for count in range(1, 6):
+                expected = sum(1 for i in range(count)
+                               if start + i * 7 >= 0
+                               and start + i * 7 + 5 <= 30)
+                actual = whole_cells(start, 5, 7, count, 30)
+                self.assertEqual(expected, actual, (start, count))
+
+    '''
+    paste_lattice
+    '''
+    def test__paste_lattice__off_image_start__counts_match_cells(self):
+        for start in [(-37, -20), (3, 4), (-5, 0), (0, -100)]:
+            border_counter.clear()
+            img = Image.new('RGB', (97, 61))
+            paste_lattice(img, self._stamp(), start, (4, 3))
+
+            expected = self._lattice_counts(start, (10, 6), (4, 3),
+                                            img.size)
+            self.assertEqual(expected, tuple(border_counter.stats()), start)
+
+    def test__paste_lattice__sparse__counts_match_cells(self):
+        img = Image.new('RGB', (300, 200))
+        paste_lattice(img, self._stamp(), (-25, -9), (200, 40))
+        expected = self._lattice_counts((-25, -9), (10, 6), (200, 40),
+                                        img.size)
+        self.assertEqual(expected, tuple(border_counter.stats()))
+
+    '''
+    Placement.render
+    '''
+    def test__render__copies_around_border__counted(self):
+        placement = Placement(self._stamp(), [(0, 0), (95, 10), (-10, 10),
+                                              (200, 0)])
+        placement.render(Image.new('RGB', (100, 50)))
+        self.assertEqual((1, 1, 2), tuple(border_counter.stats()))
+
+    '''
+    scattered_overlay
+    '''
+    def test__scattered_overlay__clipped__same_pixels_inside(self):
+        positions = numpy.array([(-4, -3), (5, 5), (92, 46), (40, 20),
+                                 (44, 22)])
+        stamp = self._stamp()
+
+        overlay, origin = scattered_overlay(stamp, positions)
+        expected = Image.new('RGB', (100, 50))
+        expected.paste(overlay, origin, overlay)
+
+        overlay, origin = scattered_overlay(stamp, positions, (100, 50))
+        actual = Image.new('RGB', (100, 50))
+        actual.paste(overlay, origin, overlay)
+
+        self.assertEqual(origin, (0, 0))
+        self.assertEqual((100, 50), overlay.size)
+        self.assertEqual(expected.tobytes(), actual.tobytes())
+
+    '''
+    BorderCounter
+    '''
+    def test__border_counter__added__totals_and_clear(self):
+        counter = BorderCounter()
+        counter.add(3, 2, 1)
+        counter.add(1, 0, 4)
+        self.assertEqual((4, 2, 5), tuple(counter.stats()))
+        counter.clear()
+        self.assertEqual((0, 0, 0), tuple(counter.stats()))
+
+
+if __name__ == '__main__':
+    unittest.main()
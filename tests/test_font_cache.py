@@ -0,0 +1,220 @@
+#!/usr/bin/env python
+
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from threading import Thread
+from PIL import ImageFont
+from project.font_cache import FontCache
+from project.lru_cache import LRUCache
+from project.textual_water_marker import WaterMarkerTypeError
+from project.textual_water_marker import WaterMarkerValueError
+
+
+class LRU_Cache_Tester(unittest.TestCase):
+    """
+    Tests the LRUCache class.
+    """
+
+    '''
+    __init__
+    '''
+    def test__init__capacity_is_none__raises_wm_type_error(self):
+        self.assertRaises(WaterMarkerTypeError, LRUCache, None)
+
+    def test__init__capacity_not_int__raises_wm_type_error(self):
+        self.assertRaises(WaterMarkerTypeError, LRUCache, "NOT INT")
+
+    def test__init__capacity_lt_1__raises_wm_value_error(self):
+        self.assertRaises(WaterMarkerValueError, LRUCache, 0)
+
+    '''
+    get
+    '''
+    def test__get__repeated_key__loads_once(self):
+        cache = LRUCache(4)
+        loads = []
+        cache.get("a", lambda: loads.append(1) or "A")
+        actual = cache.get("a", lambda: loads.append(1) or "A")
+        self.assertEqual("A", actual)
+        self.assertEqual(1, len(loads))
+
+    def test__get__concurrent_misses__loads_once(self):
+        cache = LRUCache(4)
+        loads = []
+
+        def load():
+            loads.append(1)
+            time.sleep(0.05)
+            return "A"
+
+        threads = [Thread(target=cache.get, args=("a", load))
+                   for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(1, len(loads))
+        self.assertEqual("A", cache.get("a", load))
+
+    def test__get__loader_raises__next_get_loads_again(self):
+        cache = LRUCache(4)
+        self.assertRaises(ZeroDivisionError, cache.get, "a", lambda: 1 / 0)
+        self.assertEqual("A", cache.get("a", lambda: "A"))
+
+    def test__get__hit_and_miss__counted(self):
+        cache = LRUCache(4)
+        cache.get("a", lambda: "A")
+        cache.get("a", lambda: "A")
+        stats = cache.stats()
+        self.assertEqual((1, 1), (stats.hits, stats.misses))
+
+    def test__get__over_capacity__evicts_least_recently_used(self):
+        cache = LRUCache(2)
+        cache.get("a", lambda: "A")
+        cache.get("b", lambda: "B")
+        cache.get("a", lambda: "A")
+        cache.get("c", lambda: "C")
+        self.assertIn("a", cache)
+        self.assertNotIn("b", cache)
+        self.assertEqual(1, cache.stats().evictions)
+
+    '''
+    put
+    '''
+    def test__put__weighed_values__bounded_by_weight(self):
+        cache = LRUCache(10, weigher=len)
+        cache.put("a", "xxxx")
+        cache.put("b", "xxxx")
+        cache.put("c", "xxxx")
+        self.assertEqual(8, cache.stats().weight)
+        self.assertNotIn("a", cache)
+
+    def test__put__value_heavier_than_capacity__not_cached(self):
+        cache = LRUCache(3, weigher=len)
+        cache.put("a", "xxxx")
+        self.assertNotIn("a", cache)
+
+    '''
+    invalidate
+    '''
+    def test__invalidate__cached_key__removed(self):
+        cache = LRUCache(2)
+        cache.put("a", "A")
+        self.assertTrue(cache.invalidate("a"))
+        self.assertNotIn("a", cache)
+
+    def test__invalidate_if__predicate__removes_matches(self):
+        cache = LRUCache(4)
+        cache.put(("x", 1), "A")
+        cache.put(("x", 2), "B")
+        cache.put(("y", 1), "C")
+        self.assertEqual(2, cache.invalidate_if(lambda key: key[0] == "x"))
+        self.assertEqual(1, len(cache))
+
+
+class Font_Cache_Tester(unittest.TestCase):
+    """
+    Tests the FontCache class.
+    """
+
+    @staticmethod
+    def _copy_font(directory):
+        font_file = os.path.join(directory, "font.ttf")
+        shutil.copyfile(ImageFont.truetype("Arial_Bold.ttf", 20).path,
+                        font_file)
+        return font_file
+
+    @staticmethod
+    def _touch(font_file):
+        stat = os.stat(font_file)
+        os.utime(font_file, ns=(stat.st_atime_ns,
+                                stat.st_mtime_ns + 10 ** 9))
+
+    '''
+    font
+    '''
+    def test__font__same_font_and_size__returns_same_font(self):
+        cache = FontCache()
+        expected = cache.font("Arial_Bold.ttf", 20)
+        actual = cache.font("Arial_Bold.ttf", 20)
+        self.assertIs(expected, actual)
+
+    def test__font__different_size__returns_different_font(self):
+        cache = FontCache()
+        small = cache.font("Arial_Bold.ttf", 10)
+        large = cache.font("Arial_Bold.ttf", 20)
+        self.assertIsNot(small, large)
+
+    def test__font__missing_font_file__raises_os_error(self):
+        cache = FontCache()
+        self.assertRaises(OSError, cache.font, "Not_A_Font.ttf", 20)
+
+    def test__font__font_file_changed__loaded_again(self):
+        cache = FontCache()
+        with tempfile.TemporaryDirectory() as directory:
+            font_file = self._copy_font(directory)
+            before = cache.font(font_file, 20)
+            self._touch(font_file)
+            after = cache.font(font_file, 20)
+        self.assertIsNot(before, after)
+
+    def test__font__concurrent_threads__all_hit_one_entry(self):
+        cache = FontCache()
+        cache.font("Arial_Bold.ttf", 20)
+        threads = [Thread(target=cache.font, args=("Arial_Bold.ttf", 20))
+                   for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(8, cache.stats().hits)
+        self.assertEqual(1, len(cache))
+
+    '''
+    identity
+    '''
+    def test__identity__font_name__resolved_to_font_path(self):
+        cache = FontCache()
+        path = ImageFont.truetype("Arial_Bold.ttf", 20).path
+        actual = cache.identity("Arial_Bold.ttf")
+        self.assertEqual((os.path.abspath(path), os.stat(path).st_size),
+                         actual[:2])
+
+    def test__identity__font_file_changed__changed(self):
+        cache = FontCache()
+        with tempfile.TemporaryDirectory() as directory:
+            font_file = self._copy_font(directory)
+            before = cache.identity(font_file)
+            self._touch(font_file)
+            after = cache.identity(font_file)
+        self.assertEqual(before[:2], after[:2])
+        self.assertNotEqual(before, after)
+
+    def test__identity__missing_font_file__raises_os_error(self):
+        cache = FontCache()
+        self.assertRaises(OSError, cache.identity, "Not_A_Font.ttf")
+
+    '''
+    warm
+    '''
+    def test__warm__fonts__loaded_without_hits(self):
+        cache = FontCache()
+        cache.warm([("Arial_Bold.ttf", 12), ("Arial_Bold.ttf", 14)])
+        stats = cache.stats()
+        self.assertEqual((0, 2, 2), (stats.hits, stats.misses,
+                                     stats.entries))
+
+    '''
+    invalidate_font
+    '''
+    def test__invalidate_font__cached_sizes__all_removed(self):
+        cache = FontCache()
+        cache.warm([("Arial_Bold.ttf", 12), ("Arial_Bold.ttf", 14)])
+        self.assertEqual(2, cache.invalidate_font("Arial_Bold.ttf"))
+
+
+if __name__ == '__main__':
+    unittest.main()
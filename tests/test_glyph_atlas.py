@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+
+import numpy
+import unittest
+from PIL import Image
+from PIL import ImageDraw
+from project.font_cache import font_cache
+from project.glyph_atlas import AtlasCache
+from project.glyph_atlas import GlyphAtlas
+
+
+class Glyph_Atlas_Tester(unittest.TestCase):
+    """
+    Tests the GlyphAtlas and AtlasCache classes against ImageDraw.text.
+    """
+
+    @staticmethod
+    def _drawn(font, text, colour):
+        img = Image.new('RGBA', font.getsize(text), (0, 0, 0, 0))
+        ImageDraw.Draw(img).text((0, 0), text, colour, font=font)
+        return img
+
+    def _assert_identical(self, size_pt, text):
+        font = font_cache.font("Arial_Bold.ttf", size_pt)
+        atlas = GlyphAtlas(font)
+        colour = (200, 40, 90)
+
+        expected = self._drawn(font, text, colour)
+        actual = atlas.draw(atlas.layout(text), colour)
+
+        self.assertEqual(expected.size, actual.size)
+        self.assertTrue(numpy.array_equal(numpy.asarray(expected),
+                                          numpy.asarray(actual)))
+
+    '''
+    layout & draw
+    '''
+    def test__draw__serial_number__identical_to_draw_text(self):
+        self._assert_identical(20, "Order #A-10293-XZ")
+
+    def test__draw__kerned_pairs__identical_to_draw_text(self):
+        self._assert_identical(37, "AV To Wa ff 1234567890")
+
+    def test__draw__glyphs_left_of_origin__identical_to_draw_text(self):
+        self._assert_identical(64, "jgyq_/\\")
+
+    def test__draw__small_font__identical_to_draw_text(self):
+        self._assert_identical(8, "WATERMARK (c) 2024")
+
+    def test__draw__only_spaces__identical_to_draw_text(self):
+        self._assert_identical(20, "   ")
+
+    def test__layout__multiline_text__drawn_whole(self):
+        atlas = GlyphAtlas(font_cache.font("Arial_Bold.ttf", 20))
+        self.assertIsNone(atlas.layout("TWO\nLINES").glyphs)
+
+    def test__layout__repeated_characters__rasterized_once(self):
+        atlas = GlyphAtlas(font_cache.font("Arial_Bold.ttf", 20))
+        atlas.layout("ABABAB")
+        atlas.layout("BABA")
+        self.assertEqual(2, atlas.glyph_count())
+
+    def test__layout__more_glyphs_than_kept__bounded(self):
+        font = font_cache.font("Arial_Bold.ttf", 20)
+        atlas = GlyphAtlas(font, max_glyphs=4, max_kerning_pairs=4)
+        text = "ABCDEFGHIJ"
+
+        actual = atlas.draw(atlas.layout(text), (200, 40, 90))
+
+        self.assertEqual((4, 4), (atlas.glyph_count(),
+                                  atlas.kerning_count()))
+        self.assertTrue(numpy.array_equal(
+            numpy.asarray(self._drawn(font, text, (200, 40, 90))),
+            numpy.asarray(actual)))
+
+    '''
+    atlas
+    '''
+    def test__atlas__same_font__returns_same_atlas(self):
+        cache = AtlasCache()
+        expected = cache.atlas("Arial_Bold.ttf", 20)
+        actual = cache.atlas("Arial_Bold.ttf", 20)
+        self.assertIs(expected, actual)
+
+    def test__atlas__unknown_font__raises_os_error(self):
+        cache = AtlasCache()
+        self.assertRaises(OSError, cache.atlas, "Missing.ttf", 20)
+
+    '''
+    invalidate_font
+    '''
+    def test__invalidate_font__cached_font__removed(self):
+        cache = AtlasCache()
+        cache.atlas("Arial_Bold.ttf", 20)
+        cache.atlas("Arial_Bold.ttf", 30)
+        self.assertEqual(2, cache.invalidate_font("Arial_Bold.ttf"))
+        self.assertEqual(0, cache.invalidate_font("Arial_Bold.ttf"))
+
+
+if __name__ == '__main__':
+    unittest.main()
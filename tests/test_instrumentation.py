@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+
+import unittest
+from PIL import Image
+from project.instrumentation import ApplyTimings
+from project.instrumentation import StageStats
+from project.instrumentation import StageTiming
+from project.instrumentation import instrumented
+from project.stamp_cache import stamp_cache
+from project.textual_water_marker import Corner
+from project.trim import trim_stamp
+from project.textual_water_marker import TextualWaterMarker
+from project.textual_water_marker import WaterMarkerTypeError
+
+
+class Instrumentation_Tester(unittest.TestCase):
+    """
+    Tests the stage timing hooks of TextualWaterMarker.
+    """
+
+    def setUp(self):
+        stamp_cache.clear()
+        self._timings = []
+
+    def _water_marker(self):
+        img = Image.new('RGB', (120, 80), (255, 255, 255))
+        return TextualWaterMarker(img).instrument(self._timings.append)
+
+    @staticmethod
+    def _stages(timings):
+        return [timing.stage for timing in timings.stages]
+
+    '''
+    instrument
+    '''
+    def test__instrument__not_callable__raises_wm_type_error(self):
+        wm = TextualWaterMarker(Image.new('RGB', (8, 8)))
+        self.assertRaises(WaterMarkerTypeError, wm.instrument, "NOT FUNC")
+
+    def test__instrument__cold_stamp__every_render_stage_timed(self):
+        self._water_marker()\
+            .reverse(True)\
+            .rotation(45)\
+            .apply_centre("CENTRE")
+
+        timings = self._timings[0]
+        self.assertEqual("centre", timings.operation)
+        self.assertEqual(["font_load", "getsize", "draw_text", "transpose",
+                          "rotate", "stamp", "layout", "paste"],
+                         self._stages(timings))
+        for timing in timings.stages:
+            self.assertGreaterEqual(timing.seconds, 0)
+
+    def test__instrument__cached_stamp__render_stages_skipped(self):
+        wm = self._water_marker()
+        wm.apply_centre("CENTRE")
+        wm.apply_corner("CENTRE", Corner.bottom_right())
+        self.assertEqual(["stamp", "layout", "paste"],
+                         self._stages(self._timings[1]))
+
+    def test__instrument__pasted_stamp__bytes_reported(self):
+        wm = self._water_marker()
+        wm.apply_centre("CENTRE")
+        stamp, _ = trim_stamp(wm._prepare_text_img("CENTRE"))
+        paste = self._timings[0].stages[-1]
+        self.assertEqual(stamp.size[0] * stamp.size[1] * 4, paste.nbytes)
+
+    def test__instrument__deferred__defer_and_composite_timed(self):
+        wm = self._water_marker().defer(True)
+        wm.apply_lattice("LATTICE", 5, 5)
+        wm.collect()
+        self.assertEqual("defer", self._timings[0].stages[-1].stage)
+        self.assertEqual("collect", self._timings[1].operation)
+        self.assertEqual(["composite"], self._stages(self._timings[1]))
+
+    def test__instrument__none__stops_timing(self):
+        wm = self._water_marker().instrument(None)
+        wm.apply_centre("CENTRE")
+        self.assertEqual([], self._timings)
+
+    '''
+    instrumented
+    '''
+    def test__instrumented__with_block__callback_restored(self):
+        wm = TextualWaterMarker(Image.new('RGB', (120, 80)))
+        with instrumented(wm) as stats:
+            wm.apply_centre("CENTRE")
+        wm.apply_centre("CENTRE")
+        self.assertIsNone(wm.instrumentation())
+        self.assertEqual(1, stats.summaries()[-1].count)
+
+    '''
+    StageStats
+    '''
+    def test__stage_stats__timings__percentiles_per_stage(self):
+        stats = StageStats()
+        for millis in range(1, 101):
+            stats(ApplyTimings("centre", (
+                StageTiming("paste", millis / 1000.0, 10),)))
+
+        summary = stats.summaries()[0]
+        self.assertEqual(("paste", 100, 1000), (summary.stage,
+                                                summary.count,
+                                                summary.total_bytes))
+        self.assertAlmostEqual(0.0505, summary.p50)
+        self.assertAlmostEqual(0.09505, summary.p95)
+        self.assertAlmostEqual(0.09901, summary.p99)
+
+    def test__stage_stats__str__row_per_stage(self):
+        stats = StageStats()
+        stats(ApplyTimings("centre", (StageTiming("stamp", 0.001, 0),
+                                      StageTiming("paste", 0.002, 0))))
+        self.assertEqual(3, len(str(stats).splitlines()))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,202 @@
+#!/usr/bin/env python
+
+import os
+import tempfile
+import time
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+from PIL import Image
+from project.errors import WaterMarkerValueError
+from project.job_queue import JobQueue
+from project.job_queue import main
+from project.job_queue import run_worker
+
+
+class Job_Queue_Tester(unittest.TestCase):
+    """
+    Tests the SQLite job queue and its workers.
+    """
+
+    _spec = {"operations": [{"apply": "centre", "text": "CENTRE"}]}
+
+    def setUp(self):
+        self._temp = tempfile.TemporaryDirectory()
+        self._queue_path = self._path("queue.db")
+        self._queue = JobQueue(self._queue_path, lease_seconds=30)
+
+        self._inputs = []
+        for index in range(6):
+            path = self._path("in", "{}.png".format(index))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            Image.new('RGB', (200, 100), (255, 255, 255)).save(path)
+            self._inputs.append(path)
+
+    def tearDown(self):
+        self._temp.cleanup()
+
+    def _path(self, *names):
+        return os.path.join(self._temp.name, *names)
+
+    def _put(self, queue=None, count=6):
+        return (queue or self._queue).put(
+            (path, self._path("out", os.path.basename(path)), self._spec)
+            for path in self._inputs[:count])
+
+    '''
+    put & claim
+    '''
+    def test__claim__queued_jobs__claimed_in_order_once(self):
+        self._put(count=2)
+
+        first = self._queue.claim("a")
+        second = self._queue.claim("b")
+
+        self.assertEqual(self._inputs[0], first.input)
+        self.assertEqual(self._inputs[1], second.input)
+        self.assertEqual(self._spec, first.spec)
+        self.assertEqual(1, first.attempts)
+        self.assertIsNone(self._queue.claim("c"))
+
+    def test__put__invalid_spec__adds_nothing(self):
+        jobs = [("a.png", "b.png", self._spec),
+                ("c.png", "d.png", {"operations": []})]
+        self.assertRaises(WaterMarkerValueError, self._queue.put, jobs)
+        self.assertEqual(0, self._queue.counts()["pending"])
+
+    '''
+    leases
+    '''
+    def test__claim__lease_ran_out__reclaimed_by_other_worker(self):
+        queue = JobQueue(self._queue_path, lease_seconds=0.05)
+        self._put(queue, count=1)
+
+        dead = queue.claim("dead")
+        time.sleep(0.1)
+        alive = queue.claim("alive")
+
+        self.assertEqual(dead.id, alive.id)
+        self.assertEqual(2, alive.attempts)
+        self.assertFalse(queue.complete(dead.id, "dead"))
+        self.assertTrue(queue.complete(alive.id, "alive"))
+        self.assertEqual(1, queue.counts()["done"])
+
+    def test__claim__pending_and_expired_jobs__pending_claimed_first(self):
+        queue = JobQueue(self._queue_path, lease_seconds=0.05)
+        self._put(queue, count=2)
+
+        dead = queue.claim("dead")
+        time.sleep(0.1)
+
+        self.assertEqual(self._inputs[1], queue.claim("a").input)
+        self.assertEqual(dead.id, queue.claim("b").id)
+
+    def test__heartbeat__held_job__keeps_lease(self):
+        queue = JobQueue(self._queue_path, lease_seconds=0.2)
+        self._put(queue, count=1)
+
+        job = queue.claim("a")
+        for _ in range(3):
+            time.sleep(0.1)
+            self.assertTrue(queue.heartbeat(job.id, "a"))
+
+        self.assertIsNone(queue.claim("b"))
+
+    def test__heartbeat__job_not_held__returns_false(self):
+        self._put(count=1)
+        job = self._queue.claim("a")
+        self.assertFalse(self._queue.heartbeat(job.id, "b"))
+
+    def test__claim__lease_ran_out_every_attempt__job_failed(self):
+        queue = JobQueue(self._queue_path, lease_seconds=0.05,
+                         max_attempts=2)
+        self._put(queue, count=1)
+
+        for worker in ("a", "b"):
+            self.assertIsNotNone(queue.claim(worker))
+            time.sleep(0.1)
+
+        self.assertIsNone(queue.claim("c"))
+        self.assertEqual(1, queue.counts()["failed"])
+
+    '''
+    fail & retry_failed
+    '''
+    def test__retry_failed__failed_job__claimable_again(self):
+        self._put(count=1)
+        job = self._queue.claim("a")
+        self.assertTrue(self._queue.fail(job.id, "a", "broken"))
+        self.assertIsNone(self._queue.claim("a"))
+        self.assertEqual([(job.input, "broken")], self._queue.failures())
+
+        self.assertEqual(1, self._queue.retry_failed())
+        self.assertEqual(job.id, self._queue.claim("a").id)
+
+    '''
+    run_worker
+    '''
+    def test__run_worker__queued_jobs__watermarks_every_image(self):
+        self._put()
+        report = run_worker(self._queue, "a")
+
+        self.assertEqual(6, report.images)
+        self.assertEqual(6, self._queue.counts()["done"])
+        with Image.open(self._path("out", "0.png")) as img:
+            self.assertNotEqual((255, 255, 255), img.getpixel((100, 50)))
+
+    def test__run_worker__missing_input__job_failed(self):
+        self._queue.put([(self._path("missing.png"), self._path("out.png"),
+                          self._spec)])
+        report = run_worker(self._queue, "a")
+
+        self.assertEqual(1, len(report.failures))
+        self.assertEqual(1, self._queue.counts()["failed"])
+
+    def test__run_worker__output_parent_is_file__job_failed(self):
+        with open(self._path("blocker"), "w") as blocker:
+            blocker.write("Not a directory")
+        self._queue.put([(self._inputs[0], self._path("blocker", "0.png"),
+                          self._spec)])
+        report = run_worker(self._queue, "a")
+
+        self.assertEqual(1, len(report.failures))
+        self.assertEqual(1, self._queue.counts()["failed"])
+
+    '''
+    main
+    '''
+    def test__main__several_local_workers__every_job_done_once(self):
+        output_dir = self._path("out")
+        with redirect_stdout(StringIO()):
+            main(["submit", self._queue_path, self._path("in"),
+                  "--spec", '{"operations": [{"apply": "centre",'
+                            ' "text": "CENTRE"}]}',
+                  "--output-dir", output_dir])
+            status = main(["work", self._queue_path, "--workers", "3"])
+
+        self.assertEqual(0, status)
+        self.assertEqual({"pending": 0, "running": 0, "done": 6,
+                          "failed": 0}, self._queue.counts())
+        self.assertEqual(6, len(os.listdir(output_dir)))
+
+    def test__main__same_names_in_two_directories__keeps_both(self):
+        other = self._path("other", "0.png")
+        os.makedirs(os.path.dirname(other))
+        Image.new('RGB', (200, 100)).save(other)
+
+        output_dir = self._path("out")
+        with redirect_stdout(StringIO()):
+            main(["submit", self._queue_path, self._inputs[0], other,
+                  "--spec", '{"operations": [{"apply": "centre",'
+                            ' "text": "CENTRE"}]}',
+                  "--output-dir", output_dir])
+            main(["work", self._queue_path, "--workers", "1"])
+
+        self.assertTrue(os.path.isfile(os.path.join(output_dir, "in",
+                                                    "0.png")))
+        self.assertTrue(os.path.isfile(os.path.join(output_dir, "other",
+                                                    "0.png")))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,156 @@
+#!/usr/bin/env python
+
+import unittest
+from PIL import Image
+from PIL import ImageChops
+from benchmarks.lattice_benchmark import paste_lattice_per_cell
+from project.lattice import lattice_layer
+from project.lattice import lattice_row
+from project.lattice import paste_lattice
+from project.lattice import rotated_lattice
+from project.textual_water_marker import TextualWaterMarker
+
+
+class Lattice_Tester(unittest.TestCase):
+    """
+    Tests the lattice engine against the per cell reference loop.
+    """
+
+    @staticmethod
+    def _stamp(degrees=0, reverse=False):
+        img = Image.new('RGB', (8, 8))
+        wm = TextualWaterMarker(img).colour((200, 40, 90))
+        wm.rotation(degrees).reverse(reverse)
+        return wm._prepare_text_img("LATTICE")
+
+    def _assert_identical(self, img, stamp, start, margins):
+        expected = img.copy()
+        paste_lattice_per_cell(expected, stamp, start, margins)
+
+        actual = img.copy()
+        paste_lattice(actual, stamp, start, margins)
+
+        difference = ImageChops.difference(expected, actual)
+        self.assertIsNone(difference.getbbox())
+
+    '''
+    paste_lattice
+    '''
+    def test__paste_lattice__rgb_image__identical_to_per_cell(self):
+        img = Image.new('RGB', (640, 480), (20, 120, 200))
+        self._assert_identical(img, self._stamp(), (10, 10), (5, 7))
+
+    def test__paste_lattice__rgba_image__identical_to_per_cell(self):
+        img = Image.new('RGBA', (640, 480), (20, 120, 200, 128))
+        self._assert_identical(img, self._stamp(), (3, 1), (1, 1))
+
+    def test__paste_lattice__rotated_stamp__identical_to_per_cell(self):
+        img = Image.new('RGB', (500, 333), (255, 255, 255))
+        self._assert_identical(img, self._stamp(45, True), (0, 0), (2, 3))
+
+    def test__paste_lattice__negative_start__identical_to_per_cell(self):
+        img = Image.new('RGB', (300, 200), (0, 0, 0))
+        self._assert_identical(img, self._stamp(), (-37, -5), (9, 4))
+
+    def test__paste_lattice__sparse_lattice__identical_to_per_cell(self):
+        img = Image.new('RGB', (640, 480), (20, 120, 200))
+        self._assert_identical(img, self._stamp(), (10, 10), (200, 50))
+
+    def test__paste_lattice__stamp_larger_than_image__identical(self):
+        img = Image.new('RGB', (20, 10), (0, 0, 0))
+        self._assert_identical(img, self._stamp(), (2, 2), (1, 1))
+
+    '''
+    lattice_row
+    '''
+    def test__lattice_row__valid_params__as_tall_as_stamp(self):
+        stamp = self._stamp()
+        actual = lattice_row(stamp, 100, 1)
+        self.assertEqual((100, stamp.size[1]), actual.size)
+
+    def test__lattice_row__two_cells__second_cell_after_margin(self):
+        stamp = self._stamp()
+        width, height = stamp.size
+        row = lattice_row(stamp, width * 2 + 5, 5)
+        second = row.crop((width + 5, 0, width * 2 + 5, height))
+        self.assertIsNone(ImageChops.difference(stamp, second).getbbox())
+
+
+    '''
+    lattice_layer
+    '''
+    def test__lattice_layer__valid_params__cell_copied_at_each_pitch(self):
+        stamp = self._stamp()
+        width, height = stamp.size
+        expected = Image.new('RGBA', (300, 200), (0, 0, 0, 0))
+        for y in range(0, 200, height + 7):
+            for x in range(0, 300, width + 5):
+                expected.paste(stamp, (x, y))
+
+        actual = lattice_layer(stamp, (300, 200), (5, 7))
+        self.assertIsNone(ImageChops.difference(expected, actual).getbbox())
+
+    '''
+    rotated_lattice
+    '''
+    def _assert_rotated(self, degrees, footprint):
+        stamp = self._stamp()
+        width, height = footprint
+        layer = lattice_layer(stamp, footprint, (5, 7))
+        left, top = (width - 300) // 2, (height - 200) // 2
+        expected = layer.rotate(degrees)\
+            .crop((left, top, left + 300, top + 200))
+
+        actual = rotated_lattice(stamp, (5, 7), (300, 200), degrees)
+        self._assert_same_when_pasted(expected, actual)
+
+    def _assert_same_when_pasted(self, expected_layer, actual_layer):
+        expected = Image.new('RGB', (300, 200), (20, 120, 200))
+        expected.paste(expected_layer, (0, 0), expected_layer)
+
+        actual = Image.new('RGB', (300, 200), (20, 120, 200))
+        actual.paste(actual_layer, (0, 0), actual_layer)
+
+        self.assertIsNone(ImageChops.difference(expected, actual).getbbox())
+
+    def test__rotated_lattice__30_degrees__identical_to_rotated_layer(self):
+        self._assert_rotated(30, (362, 326))
+
+    def test__rotated_lattice__45_degrees__identical_to_rotated_layer(self):
+        self._assert_rotated(45, (356, 356))
+
+    def test__rotated_lattice__multicoloured_stamp__identical(self):
+        stamp = self._stamp().copy()
+        stamp.paste((0, 255, 0, 255), (0, 0, 3, 3))
+        layer = lattice_layer(stamp, (362, 326), (5, 7))
+        expected = layer.rotate(30).crop((31, 63, 331, 263))
+
+        actual = rotated_lattice(stamp, (5, 7), (300, 200), 30)
+        self.assertIsNone(ImageChops.difference(expected, actual).getbbox())
+
+    def test__rotated_lattice__box__same_as_crop_of_whole(self):
+        stamp = self._stamp()
+        whole = rotated_lattice(stamp, (5, 7), (300, 200), 30)
+
+        for box in [(0, 0, 128, 96), (128, 96, 300, 200), (40, 150, 90, 151)]:
+            expected = whole.crop(box)
+            actual = rotated_lattice(stamp, (5, 7), (300, 200), 30, box)
+            self.assertEqual(expected.getchannel('A').tobytes(),
+                             actual.getchannel('A').tobytes())
+
+    def test__lattice_layer__offset__same_as_crop(self):
+        stamp = self._stamp()
+        expected = lattice_layer(stamp, (300, 200), (5, 7))\
+            .crop((70, 45, 270, 145))
+        actual = lattice_layer(stamp, (200, 100), (5, 7), (70, 45))
+        self.assertIsNone(ImageChops.difference(expected, actual).getbbox())
+
+    def test__rotated_lattice__no_rotation__same_as_lattice_layer(self):
+        stamp = self._stamp()
+        expected = lattice_layer(stamp, (300, 200), (5, 7))
+        actual = rotated_lattice(stamp, (5, 7), (300, 200), 360)
+        self.assertIsNone(ImageChops.difference(expected, actual).getbbox())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,251 @@
+#!/usr/bin/env python
+
+import json
+import os
+import tempfile
+import unittest
+from PIL import Image
+from project.errors import WaterMarkerValueError
+from project.manifest import Checkpoint
+from project.manifest import RunProgress
+from project.manifest import manifest_fingerprint
+from project.manifest import read_manifest
+from project.manifest import run_manifest
+
+
+class Manifest_Tester(unittest.TestCase):
+    """
+    Tests the resumable manifest batch runner.
+    """
+
+    _spec = {"operations": [{"apply": "centre", "text": "CENTRE"}]}
+
+    def setUp(self):
+        self._temp = tempfile.TemporaryDirectory()
+        self._checkpoint = self._path("run.checkpoint")
+
+        self._rows = []
+        for index in range(6):
+            path = self._path("in", "{}.png".format(index))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            Image.new('RGB', (200, 100), (255, 255, 255)).save(path)
+            self._rows.append({"input": path,
+                               "output": self._path("out", "{}.png"
+                                                    .format(index))})
+
+    def tearDown(self):
+        self._temp.cleanup()
+
+    def _path(self, *names):
+        return os.path.join(self._temp.name, *names)
+
+    def _write_jsonl(self, rows):
+        path = self._path("manifest.jsonl")
+        with open(path, "w") as manifest_file:
+            for row in rows:
+                manifest_file.write(json.dumps(row) + "\n")
+        return path
+
+    def _outputs(self):
+        return [os.path.exists(row["output"]) for row in self._rows]
+
+    '''
+    read_manifest
+    '''
+    def test__read_manifest__jsonl__reads_rows_in_order(self):
+        rows = [{"input": "a.png", "output": "b.png"},
+                {"input": "c.png", "output": "d.png",
+                 "style": self._spec}]
+        path = self._path("manifest.jsonl")
+        with open(path, "w") as manifest_file:
+            manifest_file.write(json.dumps(rows[0]) + "\n\n")
+            manifest_file.write(json.dumps(rows[1]) + "\n")
+
+        actual = list(read_manifest(path))
+        self.assertEqual([0, 1], [row.index for row in actual])
+        self.assertEqual("c.png", actual[1].input)
+        self.assertIsNone(actual[0].style)
+        self.assertEqual(self._spec, actual[1].style)
+
+    def test__read_manifest__csv__reads_rows_in_order(self):
+        path = self._path("manifest.csv")
+        with open(path, "w") as manifest_file:
+            manifest_file.write("input,output,style\n")
+            manifest_file.write("a.png,b.png,\n")
+            manifest_file.write('c.png,d.png,"{}"\n'.format(
+                json.dumps(self._spec).replace('"', '""')))
+
+        actual = list(read_manifest(path))
+        self.assertEqual(["a.png", "c.png"], [row.input for row in actual])
+        self.assertIsNone(actual[0].style)
+        self.assertEqual(self._spec, json.loads(actual[1].style))
+
+    def test__read_manifest__row_without_output__raises_value_error(self):
+        path = self._write_jsonl([{"input": "a.png"}])
+        self.assertRaises(WaterMarkerValueError, list, read_manifest(path))
+
+    def test__read_manifest__unknown_extension__raises_value_error(self):
+        self.assertRaises(WaterMarkerValueError, read_manifest,
+                          self._path("manifest.txt"))
+
+    '''
+    Checkpoint
+    '''
+    def test__checkpoint__reopened__remembers_recorded_rows(self):
+        checkpoint = Checkpoint(self._checkpoint)
+        checkpoint.record([0, 3, 17])
+        checkpoint.close()
+
+        checkpoint = Checkpoint(self._checkpoint)
+        self.assertEqual(3, checkpoint.count())
+        self.assertTrue(checkpoint.done(17))
+        self.assertFalse(checkpoint.done(1))
+        self.assertFalse(checkpoint.done(1000))
+        checkpoint.close()
+
+    def test__checkpoint__torn_last_line__ignored(self):
+        with open(self._checkpoint, "w") as checkpoint_file:
+            checkpoint_file.write("4\n12")
+
+        checkpoint = Checkpoint(self._checkpoint)
+        self.assertTrue(checkpoint.done(4))
+        self.assertFalse(checkpoint.done(12))
+        self.assertEqual(1, checkpoint.count())
+        checkpoint.close()
+
+    def test__checkpoint__other_manifest__raises_value_error(self):
+        checkpoint = Checkpoint(self._checkpoint, "a" * 64)
+        checkpoint.record([0])
+        checkpoint.close()
+
+        self.assertRaises(WaterMarkerValueError, Checkpoint,
+                          self._checkpoint, "b" * 64)
+
+    def test__checkpoint__rows_without_manifest__raises_value_error(self):
+        checkpoint = Checkpoint(self._checkpoint)
+        checkpoint.record([0])
+        checkpoint.close()
+
+        self.assertRaises(WaterMarkerValueError, Checkpoint,
+                          self._checkpoint, "a" * 64)
+
+    '''
+    RunProgress
+    '''
+    def test__run_progress__before_any_row__no_eta(self):
+        status = RunProgress(100, 40)
+        self.assertIsNone(status.eta_seconds())
+        self.assertIn("40/100 rows (40.0%)", str(status))
+
+    '''
+    run_manifest
+    '''
+    def test__run_manifest__new_run__watermarks_every_row(self):
+        manifest = self._write_jsonl(self._rows)
+        report = run_manifest(manifest, self._checkpoint, self._spec,
+                              workers=2, chunksize=2)
+
+        self.assertEqual(6, report.images)
+        self.assertEqual([True] * 6, self._outputs())
+        with Image.open(self._rows[0]["output"]) as img:
+            self.assertNotEqual((255, 255, 255), img.getpixel((100, 50)))
+
+    def test__run_manifest__checkpointed_rows__skipped(self):
+        manifest = self._write_jsonl(self._rows)
+        checkpoint = Checkpoint(self._checkpoint,
+                                manifest_fingerprint(manifest))
+        checkpoint.record([1, 4])
+        checkpoint.close()
+
+        report = run_manifest(manifest, self._checkpoint, self._spec,
+                              workers=1)
+
+        self.assertEqual(4, report.images)
+        self.assertEqual([True, False, True, True, False, True],
+                         self._outputs())
+
+    def test__run_manifest__rerun__does_nothing(self):
+        manifest = self._write_jsonl(self._rows)
+        run_manifest(manifest, self._checkpoint, self._spec, workers=1)
+        report = run_manifest(manifest, self._checkpoint, self._spec,
+                              workers=1)
+        self.assertEqual(0, report.images)
+
+    def test__run_manifest__failed_row__retried_next_run(self):
+        self._rows[2]["input"] = self._path("missing.png")
+        manifest = self._write_jsonl(self._rows)
+
+        report = run_manifest(manifest, self._checkpoint, self._spec,
+                              workers=1)
+        self.assertEqual(5, report.images)
+        self.assertEqual(1, len(report.failures))
+
+        checkpoint = Checkpoint(self._checkpoint)
+        self.assertFalse(checkpoint.done(2))
+        self.assertEqual(5, checkpoint.count())
+        checkpoint.close()
+
+    def test__run_manifest__manifest_changed__raises_value_error(self):
+        manifest = self._write_jsonl(self._rows)
+        run_manifest(manifest, self._checkpoint, self._spec, workers=1)
+
+        self._write_jsonl(self._rows[1:])
+        self.assertRaises(WaterMarkerValueError, run_manifest, manifest,
+                          self._checkpoint, self._spec, workers=1)
+
+    def test__run_manifest__chunk_raises__rows_failed_and_run_finished(self):
+        manifest = self._write_jsonl(self._rows)
+        report = run_manifest(manifest, self._checkpoint, self._spec,
+                              workers=1, chunksize=2,
+                              save_options={"unpicklable": lambda: None})
+
+        self.assertEqual(0, report.images)
+        self.assertEqual(6, len(report.failures))
+
+    def test__run_manifest__output_parent_is_file__row_fails(self):
+        with open(self._path("blocker"), "w") as blocker:
+            blocker.write("Not a directory")
+        self._rows[3]["output"] = self._path("blocker", "3.png")
+        manifest = self._write_jsonl(self._rows)
+
+        report = run_manifest(manifest, self._checkpoint, self._spec,
+                              workers=1)
+
+        self.assertEqual(5, report.images)
+        self.assertEqual(self._rows[3]["input"], report.failures[0][0])
+
+    def test__run_manifest__row_styles__override_run_spec(self):
+        self._rows[0]["style"] = {"colour": [255, 0, 0],
+                                  "operations": [{"apply": "centre",
+                                                  "text": "RED"}]}
+        self._rows[1]["style"] = '{"operations": []}'
+        manifest = self._write_jsonl(self._rows)
+
+        report = run_manifest(manifest, self._checkpoint, self._spec,
+                              workers=1)
+
+        self.assertEqual(5, report.images)
+        self.assertEqual(self._rows[1]["input"], report.failures[0][0])
+        with Image.open(self._rows[0]["output"]) as img:
+            colours = [colour for _, colour in img.getcolors(20000)]
+            self.assertIn((255, 0, 0), colours)
+
+    def test__run_manifest__no_spec_or_style__row_fails(self):
+        manifest = self._write_jsonl(self._rows[:1])
+        report = run_manifest(manifest, self._checkpoint, workers=1)
+        self.assertEqual(0, report.images)
+        self.assertEqual(1, len(report.failures))
+
+    def test__run_manifest__progress__reported_at_end(self):
+        manifest = self._write_jsonl(self._rows)
+        reports = []
+        run_manifest(manifest, self._checkpoint, self._spec, workers=1,
+                     progress=lambda status: reports.append(str(status)),
+                     progress_seconds=3600)
+        self.assertEqual(1, len(reports))
+        self.assertIn("6/6 rows (100.0%)", reports[0])
+        self.assertIn("ETA 0:00:00", reports[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,166 @@
+#!/usr/bin/env python
+
+import os
+import tempfile
+import unittest
+from PIL import Image
+from project.cli import ThroughputReport
+from project.cli import watermark_path
+from project.errors import WaterMarkerValueError
+from project.output_cache import OutputCache
+
+
+class Output_Cache_Tester(unittest.TestCase):
+    """
+    Tests the OutputCache class and its use by watermark_path.
+    """
+
+    _spec = {"operations": [{"apply": "centre", "text": "CENTRE"}]}
+
+    def setUp(self):
+        self._temp = tempfile.TemporaryDirectory()
+        self._cache = OutputCache(self._path("cache"))
+        self._input = self._path("in.png")
+        Image.new('RGB', (200, 100), (255, 255, 255)).save(self._input)
+
+    def tearDown(self):
+        self._temp.cleanup()
+
+    def _path(self, *names):
+        return os.path.join(self._temp.name, *names)
+
+    @staticmethod
+    def _read(path):
+        with open(path, "rb") as data:
+            return data.read()
+
+    '''
+    key
+    '''
+    def test__key__same_job__same_key(self):
+        expected = self._cache.key(self._input, "a.png", self._spec, {})
+        actual = self._cache.key(self._input, "b.png", dict(self._spec), {})
+        self.assertEqual(expected, actual)
+
+    def test__key__changed_job__different_keys(self):
+        other_input = self._path("other.png")
+        Image.new('RGB', (200, 100), (255, 255, 254)).save(other_input)
+        other_spec = {"size": 30, "operations": self._spec["operations"]}
+
+        keys = {self._cache.key(self._input, "a.png", self._spec, {}),
+                self._cache.key(other_input, "a.png", self._spec, {}),
+                self._cache.key(self._input, "a.png", other_spec, {}),
+                self._cache.key(self._input, "a.png", self._spec,
+                                {"quality": 80}),
+                self._cache.key(self._input, "a.jpg", self._spec, {})}
+        self.assertEqual(5, len(keys))
+
+    '''
+    fetch & store
+    '''
+    def test__fetch__not_stored__misses(self):
+        key = self._cache.key(self._input, "a.png", self._spec, {})
+        self.assertFalse(self._cache.fetch(key, self._path("a.png")))
+        self.assertFalse(os.path.exists(self._path("a.png")))
+        self.assertEqual(1, self._cache.stats().misses)
+
+    def test__fetch__stored__writes_output(self):
+        key = self._cache.key(self._input, "a.png", self._spec, {})
+        self._cache.store(key, self._input)
+
+        self.assertTrue(self._cache.fetch(key, self._path("a.png")))
+        self.assertEqual(self._read(self._input),
+                         self._read(self._path("a.png")))
+
+        stats = self._cache.stats()
+        self.assertEqual(1, stats.hits)
+        self.assertEqual(1, stats.stores)
+        self.assertEqual(os.path.getsize(self._input), stats.bytes_saved)
+
+    def test__init__empty_directory__raises_value_error(self):
+        self.assertRaises(WaterMarkerValueError, OutputCache, " ")
+
+    '''
+    watermark_path
+    '''
+    def test__watermark_path__rerun__reuses_output(self):
+        output = self._path("out.png")
+        first = watermark_path(self._input, output, self._spec, {},
+                               self._cache)
+        expected = self._read(output)
+        os.unlink(output)
+
+        second = watermark_path(self._input, output, self._spec, {},
+                                self._cache)
+
+        self.assertEqual((None, False), first[3:])
+        self.assertEqual((None, True), second[3:])
+        self.assertEqual(expected, self._read(output))
+
+    def test__watermark_path__new_spec__leaves_cached_output_intact(self):
+        output = self._path("out.png")
+        watermark_path(self._input, output, self._spec, {}, self._cache)
+        expected = self._read(output)
+
+        other_spec = {"operations": [{"apply": "centre", "text": "OTHER"}]}
+        result = watermark_path(self._input, output, other_spec, {},
+                                self._cache)
+        self.assertEqual((None, False), result[3:])
+        self.assertNotEqual(expected, self._read(output))
+
+        watermark_path(self._input, output, self._spec, {}, self._cache)
+        self.assertEqual(expected, self._read(output))
+
+    def test__watermark_path__rerun_without_cache__leaves_cached_output_intact(self):
+        output = self._path("out.png")
+        watermark_path(self._input, output, self._spec, {}, self._cache)
+        expected = self._read(output)
+
+        other_spec = {"operations": [{"apply": "centre", "text": "OTHER"}]}
+        watermark_path(self._input, output, other_spec, {})
+        os.unlink(output)
+
+        result = watermark_path(self._input, output, self._spec, {},
+                                self._cache)
+        self.assertEqual((None, True), result[3:])
+        self.assertEqual(expected, self._read(output))
+
+    def test__watermark_path__output_already_cached__no_files_left(self):
+        output = self._path("out", "out.png")
+        for _ in range(2):
+            watermark_path(self._input, output, self._spec, {}, self._cache)
+
+        self.assertEqual(["out.png"], os.listdir(self._path("out")))
+
+    def test__watermark_path__new_output__usual_permissions(self):
+        with open(self._path("plain.txt"), "w"):
+            pass
+        expected = os.stat(self._path("plain.txt")).st_mode & 0o777
+
+        output = self._path("out.png")
+        watermark_path(self._input, output, self._spec, {}, self._cache)
+        self.assertEqual(expected, os.stat(output).st_mode & 0o777)
+
+    def test__watermark_path__missing_input__fails(self):
+        result = watermark_path(self._path("missing.png"),
+                                self._path("out.png"), self._spec, {},
+                                self._cache)
+        self.assertIsNotNone(result[3])
+
+    '''
+    ThroughputReport
+    '''
+    def test__report__cached_results__counts_hits(self):
+        report = ThroughputReport()
+        report.add(("a.png", 10, 400, None, True))
+        report.add(("b.png", 10, 600, None, False))
+        report.add(("c.png", 10, 600, None, True))
+
+        self.assertEqual(2, report.cache_hits)
+        self.assertEqual(1000, report.bytes_saved)
+        self.assertAlmostEqual(2 / 3, report.cache_hit_rate())
+        self.assertIn("2 cached (66.7% hit rate)", str(report))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+
+import unittest
+from PIL import Image
+from project.overlay_cache import OverlayCache
+from project.overlay_cache import overlay_cache
+from project.textual_water_marker import TextualWaterMarker
+
+
+class Overlay_Cache_Tester(unittest.TestCase):
+    """
+    Tests the OverlayCache class and its use by WatermarkPlan.
+    """
+
+    def setUp(self):
+        overlay_cache.clear()
+
+    @staticmethod
+    def _plan(seed=1, font_file="Arial_Bold.ttf", size=(200, 150)):
+        wm = TextualWaterMarker(Image.new('RGB', size)).defer(True)
+        wm.font(font_file).apply_random("RANDOM", 20, seed)
+        wm.apply_lattice("LATTICE", 5, 5)
+        return wm.plan()
+
+    @staticmethod
+    def _overlay(width, height):
+        return Image.new('RGBA', (width, height)), (0, 0)
+
+    '''
+    WatermarkPlan.compile
+    '''
+    def test__compile__same_plan_twice__overlay_shared(self):
+        expected, _ = self._plan().compile()
+        actual, _ = self._plan().compile()
+        self.assertIs(expected, actual)
+        self.assertEqual(1, overlay_cache.stats().hits)
+
+    def test__compile__other_image_size__compiled_again(self):
+        small, _ = self._plan().compile()
+        large, _ = self._plan(size=(300, 150)).compile()
+        self.assertIsNot(small, large)
+
+    def test__compile__unseeded_random__not_cached(self):
+        wm = TextualWaterMarker(Image.new('RGB', (200, 150))).defer(True)
+        wm.apply_random("RANDOM", 20)
+        wm.apply_random("RANDOM", 20)
+        wm.plan().compile()
+        self.assertEqual(0, len(overlay_cache))
+
+    def test__apply__cached_overlay__same_as_compiled(self):
+        expected = self._plan().apply(Image.new('RGB', (200, 150)))
+        actual = self._plan().apply(Image.new('RGB', (200, 150)))
+        self.assertEqual(expected.tobytes(), actual.tobytes())
+
+    '''
+    OverlayCache
+    '''
+    def test__put__over_budget__evicts_least_recently_used(self):
+        cache = OverlayCache(max_bytes=1000)
+        cache.put("a", self._overlay(15, 15))
+        cache.put("b", self._overlay(15, 15))
+        self.assertEqual((1, 900), (len(cache), cache.stats().weight))
+
+    def test__invalidate_font__plans_using_font__removed(self):
+        self._plan().compile()
+        self.assertEqual(0, overlay_cache.invalidate_font("Other.ttf"))
+        self.assertEqual(1, overlay_cache.invalidate_font("Arial_Bold.ttf"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+
+import os
+import tempfile
+import unittest
+from io import BytesIO
+from PIL import Image
+from project.errors import WaterMarkerTypeError
+from project.errors import WaterMarkerValueError
+from project.pipeline import fit_size
+from project.pipeline import watermark_encoded
+from project.spec import apply_spec
+from project.textual_water_marker import TextualWaterMarker
+
+
+class Pipeline_Tester(unittest.TestCase):
+    """
+    Tests the fused decode, watermark and encode pipeline.
+    """
+
+    _spec = {"operations": [{"apply": "centre", "text": "CENTRE"}]}
+
+    @staticmethod
+    def _encode(img, output_format):
+        data = BytesIO()
+        img.save(data, output_format)
+        return data.getvalue()
+
+    @staticmethod
+    def _decode(data):
+        img = Image.open(BytesIO(data))
+        img.load()
+        return img
+
+    '''
+    watermark_encoded
+    '''
+    def test__watermark_encoded__jpeg__decoded_small_and_stamped(self):
+        data = self._encode(Image.new('RGB', (1600, 1200), (255, 255, 255)),
+                            "JPEG")
+        img = self._decode(watermark_encoded(data, self._spec, (400, 400)))
+
+        self.assertEqual("JPEG", img.format)
+        self.assertEqual((400, 300), img.size)
+        self.assertLess(sum(img.getpixel((200, 150))), 3 * 200)
+
+    def test__watermark_encoded__png__stamps_at_target_size(self):
+        source = Image.new('RGB', (800, 400), (255, 255, 255))
+        expected = source.resize((200, 100), Image.LANCZOS)
+        apply_spec(TextualWaterMarker(expected).defer(True),
+                   self._spec).collect()
+
+        actual = self._decode(watermark_encoded(
+            self._encode(source, "PNG"), self._spec, (200, 200)))
+
+        self.assertEqual("PNG", actual.format)
+        self.assertEqual(list(expected.getdata()), list(actual.getdata()))
+
+    def test__watermark_encoded__no_max_size__keeps_size(self):
+        data = self._encode(Image.new('RGB', (300, 200)), "PNG")
+        img = self._decode(watermark_encoded(data, self._spec))
+        self.assertEqual((300, 200), img.size)
+
+    def test__watermark_encoded__rgba_to_jpeg__flattened(self):
+        data = self._encode(Image.new('RGBA', (300, 200), (0, 0, 0, 0)),
+                            "PNG")
+        img = self._decode(watermark_encoded(data, self._spec,
+                                             output_format="jpeg",
+                                             quality=70))
+        self.assertEqual("JPEG", img.format)
+        self.assertEqual('RGB', img.mode)
+
+    def test__watermark_encoded__jpg__encoded_as_jpeg(self):
+        data = self._encode(Image.new('RGB', (300, 200)), "PNG")
+        img = self._decode(watermark_encoded(data, self._spec,
+                                             output_format="jpg"))
+        self.assertEqual("JPEG", img.format)
+
+    def test__watermark_encoded__unknown_format__raises_value_error(self):
+        data = self._encode(Image.new('RGB', (300, 200)), "PNG")
+        self.assertRaises(WaterMarkerValueError, watermark_encoded, data,
+                          self._spec, output_format="NOT A FORMAT")
+
+    def test__watermark_encoded__path__reads_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "in.png")
+            Image.new('RGB', (300, 200)).save(path)
+            img = self._decode(watermark_encoded(path, self._spec,
+                                                 (150, 150), "WEBP"))
+        self.assertEqual("WEBP", img.format)
+        self.assertEqual((150, 100), img.size)
+
+    def test__watermark_encoded__not_an_image__raises_os_error(self):
+        self.assertRaises(OSError, watermark_encoded, b"not an image",
+                          self._spec)
+
+    def test__watermark_encoded__integer_source__raises_type_error(self):
+        self.assertRaises(WaterMarkerTypeError, watermark_encoded, 5,
+                          self._spec)
+
+    def test__watermark_encoded__zero_width__raises_value_error(self):
+        self.assertRaises(WaterMarkerValueError, watermark_encoded, b"",
+                          self._spec, (0, 100))
+
+    '''
+    fit_size
+    '''
+    def test__fit_size__larger_image__keeps_aspect_ratio(self):
+        self.assertEqual((800, 450), fit_size((1920, 1080), (800, 800)))
+
+    def test__fit_size__smaller_image__not_enlarged(self):
+        self.assertEqual((300, 200), fit_size((300, 200), (800, 800)))
+
+    def test__fit_size__thin_image__at_least_one_pixel(self):
+        self.assertEqual((100, 1), fit_size((10000, 10), (100, 100)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,154 @@
+#!/usr/bin/env python
+
+import numpy
+import unittest
+from PIL import Image
+from project.plan import WatermarkPlan
+from project.textual_water_marker import Corner
+from project.textual_water_marker import Edge
+from project.textual_water_marker import TextualWaterMarker
+from project.textual_water_marker import WaterMarkerTypeError
+from project.textual_water_marker import WaterMarkerValueError
+
+
+class Plan_Tester(unittest.TestCase):
+    """
+    Tests deferred watermarking through the WatermarkPlan class.
+    """
+
+    @staticmethod
+    def _create_img():
+        return Image.new('RGB', (400, 300), (20, 120, 200))
+
+    @staticmethod
+    def _apply_all(wm):
+        wm.colour((255, 0, 0)).size(14)
+        wm.apply_lattice("LATTICE", 12, 9, 4, 6)
+        wm.colour((175, 175, 175)).size(16)
+        wm.apply_random("RANDOM", 5, seed=3)
+        wm.colour((255, 255, 255)).size(20)
+        wm.apply_centre("CENTRE")
+        wm.reverse(True).rotation(90).colour((0, 0, 255))
+        wm.apply_edge("RIGHT-EDGE", Edge.right())
+        wm.reverse(False).rotation(45).colour((255, 255, 255))
+        wm.apply_percent("PERCENT", 20, 80)
+        wm.apply_corner("CORNER", Corner.bottom_right())
+        return wm
+
+    @staticmethod
+    def _max_difference(expected, actual):
+        expected = numpy.asarray(expected, dtype=numpy.int16)
+        actual = numpy.asarray(actual, dtype=numpy.int16)
+        return numpy.abs(expected - actual).max()
+
+    '''
+    TextualWaterMarker.defer
+    '''
+    def test__defer__apply_before_collect__image_unchanged(self):
+        img = self._create_img()
+        TextualWaterMarker(img).defer(True).apply_centre("CENTRE")
+        self.assertEqual((20, 120, 200), img.getpixel((200, 150)))
+
+    def test__defer__many_operations__close_to_eager(self):
+        expected = self._apply_all(
+            TextualWaterMarker(self._create_img())).collect()
+        actual = self._apply_all(
+            TextualWaterMarker(self._create_img()).defer(True)).collect()
+        self.assertLessEqual(self._max_difference(expected, actual), 2)
+
+    def test__defer__rgba_image__identical_to_eager(self):
+        def apply(wm):
+            for offset in range(20):
+                wm.apply_absolute("ABSOLUTE", 100 + offset, 100 + offset)
+            return self._apply_all(wm).collect()
+
+        img = Image.new('RGBA', (400, 300), (20, 120, 200, 90))
+        expected = apply(TextualWaterMarker(img.copy()))
+        actual = apply(TextualWaterMarker(img.copy()).defer(True))
+        self.assertEqual(expected.tobytes(), actual.tobytes())
+
+    def test__defer__single_operation__identical_to_eager(self):
+        expected = TextualWaterMarker(self._create_img())\
+            .apply_lattice("LATTICE", 5, 5)
+        wm = TextualWaterMarker(self._create_img()).defer(True)
+        wm.apply_lattice("LATTICE", 5, 5)
+        self.assertEqual(expected.tobytes(), wm.collect().tobytes())
+
+    def test__defer__turned_off__pending_operations_applied(self):
+        img = self._create_img()
+        wm = TextualWaterMarker(img).defer(True)
+        wm.size(40).apply_centre("CENTRE")
+        wm.defer(False)
+        self.assertIsNone(wm.plan())
+        self.assertNotEqual(self._create_img().tobytes(), img.tobytes())
+
+    def test__collect__called_twice__operations_applied_once(self):
+        wm = TextualWaterMarker(self._create_img()).defer(True)
+        wm.apply_centre("CENTRE")
+        wm.collect()
+        self.assertEqual(0, len(wm.plan()))
+
+    '''
+    apply
+    '''
+    def test__apply__other_image_same_size__same_result(self):
+        wm = self._apply_all(
+            TextualWaterMarker(self._create_img()).defer(True))
+        plan = wm.plan()
+        expected = wm.collect()
+        actual = plan.apply(self._create_img())
+        self.assertEqual(expected.tobytes(), actual.tobytes())
+
+    def test__apply__image_is_none__raises_wm_type_error(self):
+        plan = WatermarkPlan((400, 300))
+        self.assertRaises(WaterMarkerTypeError, plan.apply, None)
+
+    def test__apply__image_of_other_size__raises_wm_value_error(self):
+        plan = WatermarkPlan((400, 300))
+        self.assertRaises(WaterMarkerValueError, plan.apply,
+                          Image.new('RGB', (300, 400)))
+
+    def test__apply__no_operations__image_unchanged(self):
+        img = self._create_img()
+        WatermarkPlan((400, 300)).apply(img)
+        self.assertEqual(self._create_img().tobytes(), img.tobytes())
+
+    '''
+    compile
+    '''
+    def test__compile__operation_in_centre__overlay_cropped_to_stamp(self):
+        wm = TextualWaterMarker(self._create_img()).defer(True)
+        wm.apply_centre("CENTRE")
+        wm.apply_centre("CENTRE")
+        overlay, origin = wm.plan().compile()
+        self.assertLess(overlay.size[0], 400)
+        self.assertGreater(origin[0], 0)
+
+    '''
+    key
+    '''
+    def test__key__same_operations__equal_keys(self):
+        expected = self._apply_all(
+            TextualWaterMarker(self._create_img()).defer(True)).plan().key()
+        actual = self._apply_all(
+            TextualWaterMarker(self._create_img()).defer(True)).plan().key()
+        self.assertIsNotNone(expected)
+        self.assertEqual(expected, actual)
+
+    def test__key__different_colour__different_keys(self):
+        wm = TextualWaterMarker(self._create_img()).defer(True)
+        wm.apply_centre("CENTRE")
+        first = wm.plan().key()
+        wm.collect()
+        wm.colour((1, 2, 3)).apply_centre("CENTRE")
+        second = wm.plan().key()
+        self.assertNotEqual(first, second)
+
+    def test__key__unseeded_random__returns_none(self):
+        wm = TextualWaterMarker(self._create_img()).defer(True)
+        wm.apply_random("RANDOM", 3)
+        self.assertIsNone(wm.plan().key())
+
+
+if __name__ == '__main__':
+    unittest.main()
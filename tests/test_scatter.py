@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+
+import numpy
+import unittest
+from PIL import Image
+from project.scatter import paste_scattered
+from project.scatter import random_positions
+from project.scatter import scattered_overlay
+from project.textual_water_marker import TextualWaterMarker
+from project.textual_water_marker import WaterMarkerValueError
+
+
+class Scatter_Tester(unittest.TestCase):
+    """
+    Tests the scattered stamp compositing functions.
+    """
+
+    @staticmethod
+    def _stamp():
+        img = Image.new('RGB', (8, 8))
+        wm = TextualWaterMarker(img).colour((200, 40, 90)).rotation(30)
+        return wm._prepare_text_img("RANDOM")
+
+    @staticmethod
+    def _max_difference(expected, actual):
+        expected = numpy.asarray(expected, dtype=numpy.int16)
+        actual = numpy.asarray(actual, dtype=numpy.int16)
+        return numpy.abs(expected - actual).max()
+
+    def _assert_close_to_per_copy(self, stamp, positions):
+        img = Image.new('RGB', (300, 200), (20, 120, 200))
+
+        expected = img.copy()
+        for x, y in positions:
+            expected.paste(stamp, (int(x), int(y)), stamp)
+
+        overlay, origin = scattered_overlay(stamp, positions)
+        actual = img.copy()
+        actual.paste(overlay, origin, overlay)
+
+        self.assertLessEqual(self._max_difference(expected, actual), 2)
+
+    '''
+    random_positions
+    '''
+    def test__random_positions__valid_params__within_bounds(self):
+        rng = numpy.random.default_rng(1)
+        actual = random_positions(rng, 500, (5, 10), (20, 30))
+        self.assertEqual((500, 2), actual.shape)
+        self.assertTrue(((actual >= (5, 10)) & (actual <= (20, 30))).all())
+
+    def test__random_positions__high_lt_low__raises_wm_value_error(self):
+        rng = numpy.random.default_rng(1)
+        self.assertRaises(WaterMarkerValueError, random_positions, rng, 1,
+                          (5, 5), (4, 10))
+
+    '''
+    scattered_overlay
+    '''
+    def test__scattered_overlay__overlapping_copies__close_to_per_copy(self):
+        positions = numpy.random.default_rng(3).integers(0, 120, (300, 2))
+        self._assert_close_to_per_copy(self._stamp(), positions)
+
+    def test__scattered_overlay__multicoloured_stamp__close_to_per_copy(self):
+        stamp = self._stamp().copy()
+        stamp.paste((255, 255, 0, 160), (0, 0, 6, 6))
+        positions = numpy.random.default_rng(3).integers(0, 120, (50, 2))
+        self._assert_close_to_per_copy(stamp, positions)
+
+    def test__scattered_overlay__valid_params__covers_bounding_box(self):
+        stamp = self._stamp()
+        positions = numpy.array([[10, 20], [40, 25]])
+        overlay, origin = scattered_overlay(stamp, positions)
+        self.assertEqual((10, 20), origin)
+        self.assertEqual((stamp.size[0] + 30, stamp.size[1] + 5),
+                         overlay.size)
+
+    '''
+    paste_scattered
+    '''
+    def test__paste_scattered__no_positions__image_unchanged(self):
+        img = Image.new('RGB', (50, 50), (1, 2, 3))
+        paste_scattered(img, self._stamp(), numpy.zeros((0, 2), int))
+        self.assertEqual((1, 2, 3), img.getpixel((25, 25)))
+
+    def test__paste_scattered__rgba_image__identical_to_per_copy(self):
+        stamp = self._stamp()
+        positions = numpy.random.default_rng(3).integers(0, 60, (40, 2))
+        img = Image.new('RGBA', (120, 100), (20, 120, 200, 90))
+
+        expected = img.copy()
+        for x, y in positions.tolist():
+            expected.paste(stamp, (x, y), stamp)
+
+        actual = img.copy()
+        paste_scattered(actual, stamp, positions)
+
+        self.assertEqual(0, self._max_difference(expected, actual))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,202 @@
+#!/usr/bin/env python
+
+import json
+import socket
+import time
+import unittest
+from http.client import HTTPConnection
+from io import BytesIO
+from threading import Thread
+from PIL import Image
+from project.errors import WaterMarkerValueError
+from project.service import WatermarkService
+from project.service import make_server
+from project.service import parse_args
+
+
+class Service_Tester(unittest.TestCase):
+    """
+    Tests the HTTP watermarking service.
+    """
+
+    _spec = {"operations": [{"apply": "centre", "text": "CENTRE"}]}
+
+    def setUp(self):
+        self._service = WatermarkService(self._spec, workers=2,
+                                         queue_size=1,
+                                         max_body_bytes=1024 * 1024)
+        self._service.warm()
+        self._server = make_server(self._service, port=0)
+        self._thread = Thread(target=self._server.serve_forever)
+        self._thread.start()
+
+    def tearDown(self):
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+        self._service.shutdown()
+
+    def _request(self, method, path, body=None, headers=None):
+        connection = HTTPConnection(*self._server.server_address[:2])
+        try:
+            connection.request(method, path, body, headers or {})
+            response = connection.getresponse()
+            return response.status, dict(response.getheaders()), \
+                response.read()
+        finally:
+            connection.close()
+
+    def _wait_for_count(self, outcome, count):
+        metrics = self._service.metrics()
+        for _ in range(100):
+            if metrics.count(outcome) >= count:
+                return
+            time.sleep(0.01)
+
+    @staticmethod
+    def _png(colour=(255, 255, 255)):
+        data = BytesIO()
+        Image.new('RGB', (200, 100), colour).save(data, "PNG")
+        return data.getvalue()
+
+    '''
+    POST /watermark
+    '''
+    def test__watermark__default_spec__returns_watermarked_image(self):
+        status, headers, body = self._request("POST", "/watermark",
+                                              self._png())
+        self.assertEqual(200, status)
+        self.assertEqual("image/png", headers["Content-Type"])
+
+        img = Image.open(BytesIO(body))
+        self.assertEqual((200, 100), img.size)
+        self.assertNotEqual((255, 255, 255), img.getpixel((100, 50)))
+
+    def test__watermark__spec_header__applies_header_spec(self):
+        spec = {"colour": [0, 0, 255], "operations": [
+            {"apply": "corner", "text": "C", "corner": "top_left"}]}
+        status, _, body = self._request(
+            "POST", "/watermark", self._png(),
+            {"X-Watermark-Spec": json.dumps(spec)})
+        self.assertEqual(200, status)
+
+        img = Image.open(BytesIO(body)).convert('RGB')
+        self.assertEqual((255, 255, 255), img.getpixel((100, 50)))
+        self.assertNotEqual(img.crop((0, 0, 40, 40)).getcolors(),
+                            [(1600, (255, 255, 255))])
+
+    def test__watermark__format_query__converts_output(self):
+        status, headers, body = self._request(
+            "POST", "/watermark?format=jpg", self._png())
+        self.assertEqual(200, status)
+        self.assertEqual("image/jpeg", headers["Content-Type"])
+        self.assertEqual("JPEG", Image.open(BytesIO(body)).format)
+
+    def test__watermark__invalid_spec__returns_400(self):
+        status, _, _ = self._request(
+            "POST", "/watermark", self._png(),
+            {"X-Watermark-Spec": '{"operations": []}'})
+        self.assertEqual(400, status)
+
+    def test__watermark__corner_not_a_string__returns_400(self):
+        spec = {"operations": [{"apply": "corner", "text": "A",
+                                "corner": ["a"]}]}
+        status, _, _ = self._request(
+            "POST", "/watermark", self._png(),
+            {"X-Watermark-Spec": json.dumps(spec)})
+        self.assertEqual(400, status)
+
+    def test__watermark__malformed_json__returns_400(self):
+        status, _, _ = self._request(
+            "POST", "/watermark", self._png(),
+            {"X-Watermark-Spec": "{"})
+        self.assertEqual(400, status)
+
+    def test__watermark__not_an_image__returns_400(self):
+        status, _, _ = self._request("POST", "/watermark", b"not an image")
+        self.assertEqual(400, status)
+
+    def test__watermark__body_too_large__returns_413(self):
+        status, _, _ = self._request("POST", "/watermark",
+                                     b"x" * (1024 * 1024 + 1))
+        self.assertEqual(413, status)
+
+    def test__watermark__queue_full__returns_503(self):
+        for _ in range(self._service.capacity()):
+            self.assertTrue(self._service.admit())
+
+        try:
+            status, headers, _ = self._request("POST", "/watermark",
+                                               self._png())
+        finally:
+            for _ in range(self._service.capacity()):
+                self._service.release()
+
+        self.assertEqual(503, status)
+        self.assertEqual("1", headers["Retry-After"])
+        self.assertEqual(1, self._service.metrics().count("rejected"))
+
+    def test__watermark__after_requests__queue_empty(self):
+        self._request("POST", "/watermark", self._png())
+        self._request("POST", "/watermark", b"not an image")
+        self.assertEqual(0, self._service.metrics().queue_depth())
+        self.assertTrue(self._service.admit())
+        self._service.release()
+
+    def test__watermark__truncated_body__queue_empty(self):
+        for _ in range(3):
+            with socket.create_connection(
+                    self._server.server_address[:2]) as client:
+                client.sendall(b"POST /watermark HTTP/1.1\r\n"
+                               b"Content-Length: 1000\r\n\r\n"
+                               + self._png()[:100])
+                client.shutdown(socket.SHUT_WR)
+                client.recv(1)
+
+        self._wait_for_count("client_error", 3)
+        self.assertEqual(0, self._service.metrics().queue_depth())
+
+    '''
+    GET /metrics
+    '''
+    def test__metrics__after_requests__reports_counters(self):
+        self._request("POST", "/watermark", self._png())
+        self._request("POST", "/watermark", b"not an image")
+        self._wait_for_count("ok", 1)
+        self._wait_for_count("client_error", 1)
+
+        status, _, body = self._request("GET", "/metrics")
+        self.assertEqual(200, status)
+
+        text = body.decode("utf-8")
+        self.assertIn('watermark_requests_total{outcome="ok"} 1', text)
+        self.assertIn('watermark_requests_total{outcome="client_error"} 1',
+                      text)
+        self.assertIn("watermark_queue_depth 0", text)
+        self.assertIn("watermark_capacity 3", text)
+        self.assertIn("watermark_latency_seconds_count 2", text)
+        self.assertIn('watermark_latency_seconds{quantile="0.99"}', text)
+
+    def test__metrics__unknown_path__returns_404(self):
+        status, _, _ = self._request("GET", "/missing")
+        self.assertEqual(404, status)
+
+    '''
+    WatermarkService
+    '''
+    def test__init__no_workers__raises_value_error(self):
+        self.assertRaises(WaterMarkerValueError, WatermarkService,
+                          workers=0)
+
+    '''
+    parse_args
+    '''
+    def test__parse_args__defaults__listens_locally(self):
+        args = parse_args([])
+        self.assertEqual("127.0.0.1", args.host)
+        self.assertEqual(8080, args.port)
+        self.assertIsNone(args.spec)
+
+
+if __name__ == '__main__':
+    unittest.main()
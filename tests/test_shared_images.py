@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+
+import numpy
+import unittest
+from PIL import Image
+from project.errors import WaterMarkerTypeError
+from project.errors import WaterMarkerValueError
+from project.shared_images import attach_image
+from project.shared_images import read_image
+from project.shared_images import share_image
+from project.shared_images import watermark_shared
+from project.spec import apply_spec
+from project.textual_water_marker import TextualWaterMarker
+
+
+class Shared_Images_Tester(unittest.TestCase):
+    """
+    Tests watermarking images held in shared memory.
+    """
+
+    _spec = {"operations": [
+        {"apply": "lattice", "text": "DRAFT", "horizontal_margin": 20,
+         "vertical_margin": 20},
+        {"apply": "corner", "text": "C", "corner": "bottom_right"}]}
+
+    def _expected(self, img):
+        img = img.copy()
+        apply_spec(TextualWaterMarker(img).defer(True), self._spec).collect()
+        return img
+
+    def _assert_identical(self, expected, actual):
+        self.assertEqual(expected.mode, actual.mode)
+        self.assertEqual(expected.size, actual.size)
+        self.assertTrue(numpy.array_equal(numpy.asarray(expected),
+                                          numpy.asarray(actual)))
+
+    '''
+    share_image & read_image
+    '''
+    def test__read_image__rgb_image__identical_copy(self):
+        img = Image.new('RGB', (30, 20), (10, 20, 30))
+        img.putpixel((5, 5), (200, 100, 50))
+        block, shared = share_image(img)
+        try:
+            self._assert_identical(img, read_image(block, shared))
+        finally:
+            block.close()
+            block.unlink()
+
+    def test__read_image__rgba_image__identical_copy(self):
+        img = Image.new('RGBA', (30, 20), (10, 20, 30, 40))
+        block, shared = share_image(img)
+        try:
+            self._assert_identical(img, read_image(block, shared))
+        finally:
+            block.close()
+            block.unlink()
+
+    def test__share_image__greyscale_image__shared_as_rgb(self):
+        block, shared = share_image(Image.new('L', (30, 20), 128))
+        try:
+            self.assertEqual('RGB', shared.mode)
+        finally:
+            block.close()
+            block.unlink()
+
+    def test__share_image__not_an_image__raises_type_error(self):
+        self.assertRaises(WaterMarkerTypeError, share_image, "image")
+
+    '''
+    attach_image
+    '''
+    def test__attach_image__pasted_onto__writes_shared_memory(self):
+        block, shared = share_image(Image.new('RGB', (30, 20)))
+        try:
+            layer = Image.new('RGBA', (10, 10), (255, 0, 0, 255))
+            with attach_image(shared) as view:
+                view.paste(layer, (0, 0), layer)
+
+            actual = read_image(block, shared)
+            self.assertEqual((255, 0, 0), actual.getpixel((5, 5)))
+            self.assertEqual((0, 0, 0), actual.getpixel((15, 15)))
+        finally:
+            block.close()
+            block.unlink()
+
+    '''
+    watermark_shared
+    '''
+    def test__watermark_shared__mixed_modes__identical_to_in_process(self):
+        imgs = [Image.new('RGB', (300, 200), (index * 50, 90, 160))
+                for index in range(4)]
+        imgs.append(Image.new('RGBA', (200, 300), (30, 200, 60, 120)))
+
+        actual = list(watermark_shared(imgs, self._spec, workers=2))
+
+        self.assertEqual(len(imgs), len(actual))
+        for img, result in zip(imgs, actual):
+            self._assert_identical(self._expected(img), result)
+
+    def test__watermark_shared__no_images__generates_nothing(self):
+        self.assertEqual([], list(watermark_shared([], self._spec, 1)))
+
+    def test__watermark_shared__no_workers__raises_value_error(self):
+        self.assertRaises(WaterMarkerValueError, watermark_shared, [],
+                          self._spec, 0)
+
+    def test__watermark_shared__invalid_spec__raises_value_error(self):
+        self.assertRaises(WaterMarkerValueError, watermark_shared, [],
+                          {"operations": []})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python
+
+import json
+import os
+import tempfile
+import unittest
+from PIL import Image
+from project.spec import apply_spec
+from project.spec import canonical_spec
+from project.spec import check_spec
+from project.spec import load_spec
+from project.spec import validate_spec
+from project.spec import warm_spec
+from project.stamp_cache import stamp_cache
+from project.textual_water_marker import Corner
+from project.textual_water_marker import TextualWaterMarker
+from project.textual_water_marker import WaterMarkerTypeError
+from project.textual_water_marker import WaterMarkerValueError
+
+
+class Spec_Tester(unittest.TestCase):
+    """
+    Tests loading and applying watermark specs.
+    """
+
+    _spec = {
+        "colour": [255, 255, 255],
+        "operations": [
+            {"apply": "centre", "text": "CENTRE"},
+            {"apply": "corner", "text": "CORNER", "corner": "bottom_right",
+             "rotation": 45, "colour": [255, 0, 0]},
+            {"apply": "random", "text": "RANDOM", "quantity": 3,
+             "seed": 1},
+            {"apply": "lattice", "text": "LATTICE",
+             "horizontal_margin": 30, "vertical_margin": 20},
+        ],
+    }
+
+    '''
+    load_spec
+    '''
+    def test__load_spec__inline_json__returns_spec(self):
+        actual = load_spec(json.dumps(self._spec))
+        self.assertEqual(self._spec, actual)
+
+    def test__load_spec__json_file__returns_spec(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "spec.json")
+            with open(path, "w") as spec_file:
+                json.dump(self._spec, spec_file)
+            actual = load_spec(path)
+        self.assertEqual(self._spec, actual)
+
+    def test__load_spec__source_is_none__raises_wm_type_error(self):
+        self.assertRaises(WaterMarkerTypeError, load_spec, None)
+
+    def test__load_spec__invalid_json__raises_wm_value_error(self):
+        self.assertRaises(WaterMarkerValueError, load_spec, "{not json")
+
+    '''
+    validate_spec
+    '''
+    def test__validate_spec__not_a_dict__raises_wm_type_error(self):
+        self.assertRaises(WaterMarkerTypeError, validate_spec, [])
+
+    def test__validate_spec__no_operations__raises_wm_value_error(self):
+        self.assertRaises(WaterMarkerValueError, validate_spec,
+                          {"operations": []})
+
+    def test__validate_spec__unknown_key__raises_wm_value_error(self):
+        self.assertRaises(WaterMarkerValueError, validate_spec,
+                          {"operations": [{"apply": "centre", "text": "A"}],
+                           "opacity": 50})
+
+    def test__validate_spec__unknown_apply__raises_wm_value_error(self):
+        self.assertRaises(WaterMarkerValueError, validate_spec,
+                          {"operations": [{"apply": "middle", "text": "A"}]})
+
+    def test__validate_spec__missing_argument__raises_wm_value_error(self):
+        self.assertRaises(WaterMarkerValueError, validate_spec,
+                          {"operations": [{"apply": "edge", "text": "A"}]})
+
+    '''
+    apply_spec
+    '''
+    def test__apply_spec__valid_spec__same_as_fluent_calls(self):
+        expected = TextualWaterMarker(Image.new('RGB', (300, 200)))
+        expected.colour((255, 255, 255)).apply_centre("CENTRE")
+        expected.rotation(45).colour((255, 0, 0))
+        expected.apply_corner("CORNER", Corner.bottom_right())
+        expected.apply_random("RANDOM", quantity=3, seed=1)
+        expected.apply_lattice("LATTICE", 30, 20)
+
+        actual = apply_spec(TextualWaterMarker(Image.new('RGB', (300, 200))),
+                            self._spec)
+        self.assertEqual(expected.collect().tobytes(),
+                         actual.collect().tobytes())
+
+    def test__apply_spec__unknown_corner__raises_wm_value_error(self):
+        spec = {"operations": [{"apply": "corner", "text": "A",
+                                "corner": "middle"}]}
+        wm = TextualWaterMarker(Image.new('RGB', (300, 200)))
+        self.assertRaises(WaterMarkerValueError, apply_spec, wm, spec)
+
+    def test__apply_spec__invalid_style__raises_wm_value_error(self):
+        spec = {"size": 0, "operations": [{"apply": "centre", "text": "A"}]}
+        wm = TextualWaterMarker(Image.new('RGB', (300, 200)))
+        self.assertRaises(WaterMarkerValueError, apply_spec, wm, spec)
+
+    def test__apply_spec__corner_not_a_string__raises_wm_type_error(self):
+        spec = {"operations": [{"apply": "corner", "text": "A",
+                                "corner": ["bottom_right"]}]}
+        wm = TextualWaterMarker(Image.new('RGB', (300, 200)))
+        self.assertRaises(WaterMarkerTypeError, apply_spec, wm, spec)
+
+    '''
+    check_spec
+    '''
+    def test__check_spec__valid_spec__passes(self):
+        spec = {"operations": self._spec["operations"] + [
+            {"apply": "random", "text": "RANDOM", "quantity": 50}]}
+        check_spec(spec)
+
+    def test__check_spec__zero_lattice_margin__raises_wm_value_error(self):
+        spec = {"operations": [{"apply": "lattice", "text": "A",
+                                "horizontal_margin": 0,
+                                "vertical_margin": 5}]}
+        self.assertRaises(WaterMarkerValueError, check_spec, spec)
+
+    def test__check_spec__unknown_edge__raises_wm_value_error(self):
+        spec = {"operations": [{"apply": "edge", "text": "A",
+                                "edge": "middle"}]}
+        self.assertRaises(WaterMarkerValueError, check_spec, spec)
+
+    '''
+    warm_spec
+    '''
+    def test__warm_spec__valid_spec__stamps_cached(self):
+        stamp_cache.clear()
+        warm_spec(TextualWaterMarker(Image.new('RGB', (1, 1))), self._spec)
+        self.assertEqual(4, len(stamp_cache))
+
+    '''
+    canonical_spec
+    '''
+    def test__canonical_spec__reordered_keys__same_text(self):
+        expected = canonical_spec({"size": 10, "font": "A.ttf"})
+        actual = canonical_spec({"font": "A.ttf", "size": 10})
+        self.assertEqual(expected, actual)
+
+
+if __name__ == '__main__':
+    unittest.main()
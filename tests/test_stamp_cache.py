@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+
+import os
+import shutil
+import tempfile
+import unittest
+from PIL import Image
+from PIL import ImageFont
+from project.stamp_cache import StampCache
+from project.stamp_cache import stamp_cache
+from project.textual_water_marker import TextualWaterMarker
+from project.textual_water_marker import WaterMarkerTypeError
+
+
+class Stamp_Cache_Tester(unittest.TestCase):
+    """
+    Tests the StampCache class.
+    """
+
+    @staticmethod
+    def _stamp(cache, text, colour=(0, 0, 0), width=10, height=10):
+        return cache.stamp(text, "Arial_Bold.ttf", 20, colour, 0, False,
+                           lambda: Image.new('RGBA', (width, height)))
+
+    def setUp(self):
+        stamp_cache.clear()
+
+    '''
+    stamp
+    '''
+    def test__stamp__same_style__returns_same_stamp(self):
+        cache = StampCache()
+        expected = self._stamp(cache, "WATERMARK")
+        actual = self._stamp(cache, "WATERMARK")
+        self.assertIs(expected, actual)
+
+    def test__stamp__different_colour__returns_different_stamp(self):
+        cache = StampCache()
+        black = self._stamp(cache, "WATERMARK", colour=(0, 0, 0))
+        white = self._stamp(cache, "WATERMARK", colour=(255, 255, 255))
+        self.assertIsNot(black, white)
+
+    def test__stamp__over_budget__evicts_least_recently_used(self):
+        cache = StampCache(max_bytes=1000)
+        self._stamp(cache, "A")
+        self._stamp(cache, "B")
+        self._stamp(cache, "C")
+        stats = cache.stats()
+        self.assertEqual((2, 800, 1), (stats.entries, stats.weight,
+                                       stats.evictions))
+
+    def test__stamp__font_file_changed__rendered_again(self):
+        cache = StampCache()
+        renders = []
+
+        def stamp(font_file):
+            return cache.stamp("A", font_file, 20, (0, 0, 0), 0, False,
+                               lambda: renders.append(1)
+                               or Image.new('RGBA', (10, 10)))
+
+        with tempfile.TemporaryDirectory() as directory:
+            font_file = os.path.join(directory, "font.ttf")
+            shutil.copyfile(ImageFont.truetype("Arial_Bold.ttf", 20).path,
+                            font_file)
+            stamp(font_file)
+            stat = os.stat(font_file)
+            os.utime(font_file, ns=(stat.st_atime_ns,
+                                    stat.st_mtime_ns + 10 ** 9))
+            stamp(font_file)
+        self.assertEqual(2, len(renders))
+
+    '''
+    invalidate
+    '''
+    def test__invalidate_text__cached_text__removed(self):
+        cache = StampCache()
+        self._stamp(cache, "A", colour=(0, 0, 0))
+        self._stamp(cache, "A", colour=(255, 0, 0))
+        self._stamp(cache, "B")
+        self.assertEqual(2, cache.invalidate_text("A"))
+        self.assertEqual(1, len(cache))
+
+    def test__invalidate_font__cached_font__removed(self):
+        cache = StampCache()
+        self._stamp(cache, "A")
+        self.assertEqual(1, cache.invalidate_font("Arial_Bold.ttf"))
+        self.assertEqual(0, cache.invalidate_font("Arial_Bold.ttf"))
+
+    '''
+    stamp_bytes
+    '''
+    def test__stamp_bytes__rgba_stamp__four_bytes_per_pixel(self):
+        stamp = Image.new('RGBA', (8, 4))
+        self.assertEqual(128, StampCache.stamp_bytes(stamp))
+
+    '''
+    TextualWaterMarker
+    '''
+    def test__water_marker__same_text_twice__renders_once(self):
+        img = Image.new('RGB', (512, 512))
+        wm = TextualWaterMarker(img)
+        wm.apply_centre("WATERMARK")
+        wm.apply_centre("WATERMARK")
+        stats = stamp_cache.stats()
+        self.assertEqual((1, 1), (stats.hits, stats.misses))
+
+    def test__water_marker__style_changes__renders_again(self):
+        img = Image.new('RGB', (512, 512))
+        wm = TextualWaterMarker(img)
+        wm.apply_centre("WATERMARK")
+        wm.rotation(45).apply_centre("WATERMARK")
+        wm.reverse(True).apply_centre("WATERMARK")
+        self.assertEqual(3, stamp_cache.stats().misses)
+
+    def test__water_marker__own_stamp_cache__shared_cache_untouched(self):
+        cache = StampCache()
+        wm = TextualWaterMarker(Image.new('RGB', (512, 512)))
+        wm.use_stamp_cache(cache).apply_centre("WATERMARK")
+        self.assertEqual((1, 0), (len(cache), len(stamp_cache)))
+
+    def test__use_stamp_cache__not_a_stamp_cache__raises_wm_type_error(self):
+        wm = TextualWaterMarker(Image.new('RGB', (512, 512)))
+        self.assertRaises(WaterMarkerTypeError, wm.use_stamp_cache, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+
+import glob
+import os
+import shutil
+import tempfile
+import unittest
+from PIL import Image
+from PIL import ImageFont
+from project.stamp_cache import StampCache
+from project.stamp_store import StampStore
+from project.textual_water_marker import TextualWaterMarker
+from project.textual_water_marker import WaterMarkerTypeError
+from project.textual_water_marker import WaterMarkerValueError
+
+
+class Stamp_Store_Tester(unittest.TestCase):
+    """
+    Tests the StampStore class.
+    """
+
+    def setUp(self):
+        self._temp = tempfile.TemporaryDirectory()
+        self._directory = os.path.join(self._temp.name, "stamps")
+        self._renders = []
+
+    def tearDown(self):
+        self._temp.cleanup()
+
+    def _render(self, colour=(200, 40, 90)):
+        def render():
+            self._renders.append(1)
+            img = Image.new('RGB', (8, 8))
+            return TextualWaterMarker(img).colour(colour)\
+                ._render_text_img("STAMP")
+        return render
+
+    def _stamp(self, store, font_file="Arial_Bold.ttf",
+               colour=(200, 40, 90)):
+        return store.stamp("STAMP", font_file, 20, colour, 0, False,
+                           self._render(colour))
+
+    def _stored_files(self):
+        return glob.glob(os.path.join(self._directory, "*", "*", "*.npy"))
+
+    '''
+    __init__
+    '''
+    def test__init__directory_is_none__raises_wm_type_error(self):
+        self.assertRaises(WaterMarkerTypeError, StampStore, None)
+
+    def test__init__directory_empty__raises_wm_value_error(self):
+        self.assertRaises(WaterMarkerValueError, StampStore, " ")
+
+    '''
+    stamp
+    '''
+    def test__stamp__new_store_instance__loaded_without_rendering(self):
+        expected = self._stamp(StampStore(self._directory))
+        store = StampStore(self._directory)
+        actual = self._stamp(store)
+        self.assertEqual(1, len(self._renders))
+        self.assertEqual((1, 0), store.counts())
+        self.assertEqual(expected.tobytes(), actual.tobytes())
+
+    def test__stamp__loaded__read_only(self):
+        self._stamp(StampStore(self._directory))
+        actual = self._stamp(StampStore(self._directory))
+        self.assertTrue(actual.readonly)
+
+    def test__stamp__different_colour__stored_separately(self):
+        store = StampStore(self._directory)
+        self._stamp(store, colour=(0, 0, 0))
+        self._stamp(store, colour=(255, 0, 0))
+        self.assertEqual(2, len(self._stored_files()))
+
+    def test__stamp__font_file_changed__rendered_again(self):
+        font_file = os.path.join(self._temp.name, "font.ttf")
+        shutil.copyfile(ImageFont.truetype("Arial_Bold.ttf", 20).path,
+                        font_file)
+        self._stamp(StampStore(self._directory), font_file)
+
+        stat = os.stat(font_file)
+        os.utime(font_file, ns=(stat.st_atime_ns,
+                                stat.st_mtime_ns + 10 ** 9))
+        self._stamp(StampStore(self._directory), font_file)
+
+        self.assertEqual(2, len(self._renders))
+
+    def test__stamp__corrupt_file__rendered_again(self):
+        self._stamp(StampStore(self._directory))
+        with open(self._stored_files()[0], "wb") as stored:
+            stored.write(b"NOT A STAMP")
+
+        actual = self._stamp(StampStore(self._directory))
+        self.assertEqual(2, len(self._renders))
+        self.assertEqual('RGBA', actual.mode)
+
+    '''
+    clear
+    '''
+    def test__clear__stored_stamps__removed(self):
+        store = StampStore(self._directory)
+        self._stamp(store)
+        store.clear()
+        self.assertEqual([], self._stored_files())
+
+    '''
+    StampCache.use_store
+    '''
+    def test__use_store__cold_cache__loads_from_store(self):
+        self._stamp(StampStore(self._directory))
+        cache = StampCache().use_store(StampStore(self._directory))
+        self._stamp(cache)
+        self.assertEqual(1, len(self._renders))
+        self.assertEqual(1, len(cache))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+
+import copy
+import pickle
+import unittest
+from project.errors import WaterMarkerTypeError
+from project.errors import WaterMarkerValueError
+from project.style import WatermarkStyle
+
+
+class Style_Tester(unittest.TestCase):
+    """
+    Tests the WatermarkStyle class.
+    """
+
+    '''
+    __init__
+    '''
+    def test__init__no_params__default_style(self):
+        actual = WatermarkStyle()
+        self.assertEqual(("Arial_Bold.ttf", 20, (0, 0, 0), 0, False, 0),
+                         actual.key())
+
+    def test__init__rotation_is_360__stored_as_0(self):
+        self.assertEqual(0, WatermarkStyle(degrees=360).degrees())
+
+    def test__init__font_file_is_empty__raises_wm_value_error(self):
+        self.assertRaises(WaterMarkerValueError, WatermarkStyle,
+                          font_file=" ")
+
+    def test__init__size_is_not_int__raises_wm_type_error(self):
+        self.assertRaises(WaterMarkerTypeError, WatermarkStyle,
+                          size_pt=12.5)
+
+    def test__init__colour_out_of_range__raises_wm_value_error(self):
+        self.assertRaises(WaterMarkerValueError, WatermarkStyle,
+                          rgb_colour=(0, 0, 256))
+
+    def test__init__reverse_is_none__raises_wm_type_error(self):
+        self.assertRaises(WaterMarkerTypeError, WatermarkStyle,
+                          reverse=None)
+
+    '''
+    immutability
+    '''
+    def test__setattr__any_attribute__raises_attribute_error(self):
+        style = WatermarkStyle()
+        self.assertRaises(AttributeError, setattr, style, "_size_pt", 10)
+        self.assertRaises(AttributeError, setattr, style, "other", 10)
+
+    def test__slots__instance__has_no_dict(self):
+        self.assertFalse(hasattr(WatermarkStyle(), "__dict__"))
+
+    '''
+    replace
+    '''
+    def test__replace__one_value__copy_with_value_changed(self):
+        style = WatermarkStyle(size_pt=30)
+        actual = style.replace(rgb_colour=(255, 0, 0))
+        self.assertEqual((255, 0, 0), actual.rgb_colour())
+        self.assertEqual(30, actual.size_pt())
+        self.assertEqual((0, 0, 0), style.rgb_colour())
+
+    def test__replace__value_is_none__raises_wm_type_error(self):
+        self.assertRaises(WaterMarkerTypeError, WatermarkStyle().replace,
+                          margin=None)
+
+    '''
+    __eq__ & __hash__
+    '''
+    def test__eq__same_values__equal_with_same_hash(self):
+        first = WatermarkStyle(size_pt=12, degrees=45)
+        second = WatermarkStyle(size_pt=12, degrees=45)
+        self.assertEqual(first, second)
+        self.assertEqual(hash(first), hash(second))
+        self.assertEqual(1, len({first, second}))
+
+    def test__eq__different_values__not_equal(self):
+        self.assertNotEqual(WatermarkStyle(margin=1), WatermarkStyle())
+
+    '''
+    pickle & copy
+    '''
+    def test__pickle__round_trip__equal_style(self):
+        style = WatermarkStyle("Arial_Bold.ttf", 14, (1, 2, 3), 90, True, 5)
+        self.assertEqual(style, pickle.loads(pickle.dumps(style)))
+
+    def test__copy__any_style__same_instance(self):
+        style = WatermarkStyle()
+        self.assertIs(style, copy.copy(style))
+        self.assertIs(style, copy.deepcopy(style))
+
+
+if __name__ == '__main__':
+    unittest.main()
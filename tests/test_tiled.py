@@ -0,0 +1,169 @@
+#!/usr/bin/env python
+
+import numpy
+import os
+import tempfile
+import unittest
+from PIL import Image
+from project.spec import apply_spec
+from project.textual_water_marker import TextualWaterMarker
+from project.textual_water_marker import WaterMarkerTypeError
+from project.textual_water_marker import WaterMarkerValueError
+from project.tiled import ImageStripSource
+from project.tiled import PNMStripWriter
+from project.tiled import RawStripSource
+from project.tiled import TiledWaterMarker
+from project.tiled import open_strip_source
+from project.tiled import watermark_tiled
+
+
+class Tiled_Tester(unittest.TestCase):
+    """
+    Tests strip by strip watermarking.
+    """
+
+    _spec = {
+        "colour": [255, 255, 255],
+        "operations": [
+            {"apply": "lattice", "text": "LATTICE", "size": 12,
+             "horizontal_margin": 9, "vertical_margin": 7,
+             "horizontal_start_margin": -20},
+            {"apply": "centre", "text": "CENTRE", "size": 30},
+            {"apply": "corner", "text": "CORNER", "corner": "top_right",
+             "rotation": 45},
+            {"apply": "edge", "text": "EDGE", "edge": "left",
+             "rotation": 90, "reverse": True},
+        ],
+    }
+
+    def setUp(self):
+        self._temp = tempfile.TemporaryDirectory()
+        pixels = numpy.random.default_rng(5).integers(
+            0, 256, (333, 401, 3), dtype=numpy.uint8)
+        self._img = Image.fromarray(pixels, 'RGB')
+
+    def tearDown(self):
+        self._temp.cleanup()
+
+    def _path(self, name):
+        return os.path.join(self._temp.name, name)
+
+    def _expected(self, spec=None):
+        wm = TextualWaterMarker(self._img.copy())
+        return apply_spec(wm, spec or self._spec).collect()
+
+    def _assert_tiled_matches(self, name, strip_height):
+        self._img.save(self._path(name))
+        watermark_tiled(self._path(name), self._path("out.ppm"),
+                        self._spec, strip_height)
+        actual = Image.open(self._path("out.ppm"))
+        self.assertEqual(self._expected().tobytes(), actual.tobytes())
+
+    '''
+    watermark_tiled
+    '''
+    def test__watermark_tiled__ppm__identical_to_whole_image(self):
+        self._assert_tiled_matches("in.ppm", 50)
+
+    def test__watermark_tiled__tiff__identical_to_whole_image(self):
+        self._assert_tiled_matches("in.tif", 64)
+
+    def test__watermark_tiled__bottom_up_bmp__identical_to_whole_image(self):
+        self._assert_tiled_matches("in.bmp", 17)
+
+    def test__watermark_tiled__png__identical_to_whole_image(self):
+        self._assert_tiled_matches("in.png", 100)
+
+    def test__watermark_tiled__rotated_lattice__identical_to_whole_image(self):
+        spec = {"rotation": 30, "operations": [
+            {"apply": "rotated_lattice", "text": "ROTATED",
+             "horizontal_margin": 9, "vertical_margin": 7}]}
+        self._img = self._img.resize((1100, 700))
+        self._img.save(self._path("in.ppm"))
+        watermark_tiled(self._path("in.ppm"), self._path("out.ppm"), spec,
+                        50)
+        actual = Image.open(self._path("out.ppm"))
+        self.assertEqual(self._expected(spec).tobytes(), actual.tobytes())
+
+    def test__watermark_tiled__palette_bmp__identical_to_whole_image(self):
+        self._img = self._img.quantize(64)
+        self._img.save(self._path("in.bmp"))
+        watermark_tiled(self._path("in.bmp"), self._path("out.ppm"),
+                        self._spec, 50)
+
+        self._img = self._img.convert('RGB')
+        actual = Image.open(self._path("out.ppm"))
+        self.assertEqual(self._expected().tobytes(), actual.tobytes())
+
+    def test__watermark_tiled__random__close_to_whole_image(self):
+        spec = {"operations": [{"apply": "random", "text": "RANDOM",
+                                "quantity": 40, "seed": 2}]}
+        self._img.save(self._path("in.ppm"))
+        watermark_tiled(self._path("in.ppm"), self._path("out.ppm"), spec,
+                        32)
+        expected = numpy.asarray(self._expected(spec), dtype=numpy.int16)
+        actual = numpy.asarray(Image.open(self._path("out.ppm")),
+                               dtype=numpy.int16)
+        self.assertLessEqual(numpy.abs(expected - actual).max(), 2)
+
+    '''
+    open_strip_source
+    '''
+    def test__open_strip_source__ppm__reads_from_disk(self):
+        self._img.save(self._path("in.ppm"))
+        source = open_strip_source(self._path("in.ppm"))
+        self.assertIsInstance(source, RawStripSource)
+        source.close()
+
+    def test__open_strip_source__palette_bmp__converted_to_rgb(self):
+        self._img.quantize(64).save(self._path("in.bmp"))
+        source = open_strip_source(self._path("in.bmp"))
+        self.addCleanup(source.close)
+        self.assertIsInstance(source, ImageStripSource)
+        self.assertEqual('RGB', source.mode())
+
+    def test__open_strip_source__png__decodes_whole_image(self):
+        self._img.save(self._path("in.png"))
+        source = open_strip_source(self._path("in.png"))
+        self.assertIsInstance(source, ImageStripSource)
+        source.close()
+
+    '''
+    RawStripSource
+    '''
+    def test__read_strip__middle_rows__same_as_crop(self):
+        self._img.save(self._path("in.ppm"))
+        source = RawStripSource(self._path("in.ppm"))
+        actual = source.read_strip(100, 150)
+        source.close()
+        expected = self._img.crop((0, 100, 401, 150))
+        self.assertEqual(expected.tobytes(), actual.tobytes())
+
+    '''
+    PNMStripWriter
+    '''
+    def test__pnm_writer__rgba_mode__raises_wm_value_error(self):
+        self.assertRaises(WaterMarkerValueError, PNMStripWriter,
+                          self._path("out.ppm"), (10, 10), "RGBA")
+
+    '''
+    TiledWaterMarker
+    '''
+    def test__init__source_is_none__raises_wm_type_error(self):
+        self.assertRaises(WaterMarkerTypeError, TiledWaterMarker, None)
+
+    def test__init__strip_height_lt_1__raises_wm_value_error(self):
+        source = ImageStripSource(self._img)
+        self.assertRaises(WaterMarkerValueError, TiledWaterMarker, source, 0)
+
+    def test__defer__false__raises_wm_value_error(self):
+        wm = TiledWaterMarker(ImageStripSource(self._img))
+        self.assertRaises(WaterMarkerValueError, wm.defer, False)
+
+    def test__collect__called__raises_wm_value_error(self):
+        wm = TiledWaterMarker(ImageStripSource(self._img))
+        self.assertRaises(WaterMarkerValueError, wm.collect)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+
+import unittest
+from PIL import Image
+from benchmarks.lattice_benchmark import paste_lattice_per_cell
+from project.textual_water_marker import Corner
+from project.textual_water_marker import Edge
+from project.textual_water_marker import TextualWaterMarker
+from project.trim import ink_pieces
+from project.trim import trim_stamp
+
+
+class Trim_Tester(unittest.TestCase):
+    """
+    Tests trimming stamps to their visible pixels.
+    """
+
+    @staticmethod
+    def _create_img():
+        return Image.new('RGB', (300, 200), (20, 120, 200))
+
+    @staticmethod
+    def _water_marker(img, degrees=45):
+        return TextualWaterMarker(img)\
+            .size(24)\
+            .rotation(degrees)\
+            .margin(5)\
+            .colour((255, 255, 255))
+
+    def _stamp(self, degrees=45, size=24):
+        return self._water_marker(self._create_img(), degrees)\
+            .size(size)\
+            ._prepare_text_img("TRIMMED")
+
+    '''
+    trim_stamp
+    '''
+    def test__trim_stamp__rotated__smaller_than_stamp(self):
+        stamp = self._stamp()
+        trimmed, _ = trim_stamp(stamp)
+        self.assertLess(trimmed.size[0], stamp.size[0])
+        self.assertLess(trimmed.size[1], stamp.size[1])
+
+    def test__trim_stamp__pasted_at_offset__same_as_stamp(self):
+        stamp = self._stamp()
+        trimmed, (x, y) = trim_stamp(stamp)
+
+        expected = self._create_img()
+        expected.paste(stamp, (10, 10), stamp)
+        actual = self._create_img()
+        actual.paste(trimmed, (10 + x, 10 + y), trimmed)
+
+        self.assertEqual(expected.tobytes(), actual.tobytes())
+
+    def test__trim_stamp__same_stamp__remembered(self):
+        stamp = self._stamp()
+        self.assertIs(trim_stamp(stamp)[0], trim_stamp(stamp)[0])
+
+    def test__trim_stamp__transparent_stamp__returned_as_is(self):
+        stamp = Image.new('RGBA', (10, 10))
+        self.assertEqual((stamp, (0, 0)), trim_stamp(stamp))
+
+    '''
+    ink_pieces
+    '''
+    def test__ink_pieces__diagonal_stamp__several_pieces_cover_stamp(self):
+        stamp, _ = trim_stamp(self._stamp(size=72))
+        pieces = ink_pieces(stamp)
+
+        actual = Image.new('RGBA', stamp.size)
+        for piece, position in pieces:
+            actual.paste(piece, position)
+
+        self.assertGreater(len(pieces), 1)
+        self.assertEqual(stamp.tobytes(), actual.tobytes())
+
+    def test__ink_pieces__horizontal_stamp__one_piece(self):
+        stamp, _ = trim_stamp(self._stamp(0))
+        self.assertEqual(((stamp, (0, 0)),), ink_pieces(stamp))
+
+    '''
+    apply
+    '''
+    def test__apply_corner__trimmed__same_as_untrimmed_paste(self):
+        for corner in (Corner.top_left(), Corner.bottom_right()):
+            stamp = self._stamp()
+            x = 5 if corner[0] == 0 else 300 - stamp.size[0] - 5
+            y = 5 if corner[1] == 0 else 200 - stamp.size[1] - 5
+            expected = self._create_img()
+            expected.paste(stamp, (x, y), stamp)
+
+            actual = self._water_marker(self._create_img())\
+                .apply_corner("TRIMMED", corner)
+
+            self.assertEqual(expected.tobytes(), actual.tobytes())
+
+    def test__apply_edge__trimmed__same_as_untrimmed_paste(self):
+        stamp = self._stamp(90)
+        expected = self._create_img()
+        expected.paste(stamp, (300 - stamp.size[0] - 5,
+                               int(100 - stamp.size[1] / 2)), stamp)
+
+        actual = self._water_marker(self._create_img(), 90)\
+            .apply_edge("TRIMMED", Edge.right())
+
+        self.assertEqual(expected.tobytes(), actual.tobytes())
+
+    def test__apply_lattice__trimmed__same_as_untrimmed_cells(self):
+        stamp = self._stamp()
+        expected = self._create_img()
+        paste_lattice_per_cell(expected, stamp, (-7, 3), (6, 4))
+
+        actual = self._water_marker(self._create_img())\
+            .apply_lattice("TRIMMED", 6, 4, -7, 3)
+
+        self.assertEqual(expected.tobytes(), actual.tobytes())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,6 @@
 #!/usr/bin/env python
 
+import numpy
 import unittest
 from PIL import Image
 from project.textual_water_marker import TextualWaterMarker
@@ -7,6 +8,7 @@ from project.textual_water_marker import WaterMarkerTypeError
 from project.textual_water_marker import WaterMarkerValueError
 from project.textual_water_marker import Corner
 from project.textual_water_marker import Edge
+from project.style import WatermarkStyle
 
 
 class WM_Tester(unittest.TestCase):
@@ -187,6 +189,22 @@ class WM_Tester(unittest.TestCase):
         wm = self._create_wm()
         self.assertRaises(WaterMarkerTypeError, wm.margin, "NOT INT")
 
+    '''
+    defer
+    '''
+    def test__defer__defer_is_valid__returns_self(self):
+        expected = self._create_wm()
+        actual = expected.defer(True)
+        self.assertIs(expected, actual)
+
+    def test__defer__defer_is_none__raises_wm_type_error(self):
+        wm = self._create_wm()
+        self.assertRaises(WaterMarkerTypeError, wm.defer, None)
+
+    def test__defer__defer_not_bool__raises_wm_type_error(self):
+        wm = self._create_wm()
+        self.assertRaises(WaterMarkerTypeError, wm.defer, 2017)
+
     '''
     apply_centre
     '''
@@ -406,6 +424,32 @@ class WM_Tester(unittest.TestCase):
         self.assertRaises(WaterMarkerValueError, wm.apply_random,
                           "WATERMARK", 0)
 
+    def test__apply_random__same_seed__returns_same_image(self):
+        expected = self._create_wm().apply_random("WATERMARK", 20, seed=7)
+        actual = self._create_wm().apply_random("WATERMARK", 20, seed=7)
+        self.assertEqual(expected.tobytes(), actual.tobytes())
+
+    def test__apply_random__generator_seed__returns_image(self):
+        wm = self._create_wm()
+        actual = wm.apply_random("WATERMARK", 5,
+                                 seed=numpy.random.default_rng(7))
+        self.assertIsInstance(actual, Image.Image)
+
+    def test__apply_random__seed_is_not_int__raises_wm_type_error(self):
+        wm = self._create_wm()
+        self.assertRaises(WaterMarkerTypeError, wm.apply_random,
+                          "WATERMARK", 1, "NOT INT")
+
+    def test__apply_random__seed_lt_0__raises_wm_value_error(self):
+        wm = self._create_wm()
+        self.assertRaises(WaterMarkerValueError, wm.apply_random,
+                          "WATERMARK", 1, -1)
+
+    def test__apply_random__text_larger_than_image__raises_wm_value_error(self):
+        wm = TextualWaterMarker(Image.new('RGB', (8, 8)))
+        self.assertRaises(WaterMarkerValueError, wm.apply_random,
+                          "WATERMARK")
+
     '''
     apply_lattice
     '''
@@ -480,5 +524,93 @@ class WM_Tester(unittest.TestCase):
                           100, 100,
                           vertical_start_margin="NOT INT")
 
+    '''
+    apply_rotated_lattice
+    '''
+    def test__apply_rotated_lattice__valid_params__returns_image(self):
+        wm = self._create_wm().rotation(30)
+        actual = wm.apply_rotated_lattice("WATERMARK", 20, 20)
+        self.assertIsInstance(actual, Image.Image)
+        self.assertEqual((512, 512), actual.size)
+
+    def test__apply_rotated_lattice__no_rotation__same_as_lattice(self):
+        expected = self._create_wm().apply_lattice("WATERMARK", 9, 7, 0, 0)
+        actual = self._create_wm().apply_rotated_lattice("WATERMARK", 9, 7)
+        self.assertTrue(numpy.array_equal(numpy.asarray(expected),
+                                          numpy.asarray(actual)))
+
+    def test__apply_rotated_lattice__text_is_none__raises_wm_type_error(self):
+        wm = self._create_wm()
+        self.assertRaises(WaterMarkerTypeError, wm.apply_rotated_lattice,
+                          None, 100, 100)
+
+    def test__apply_rotated_lattice__margin_is_none__raises_wm_type_error(self):
+        wm = self._create_wm()
+        self.assertRaises(WaterMarkerTypeError, wm.apply_rotated_lattice,
+                          "WATERMARK", 100, None)
+
+    def test__apply_rotated_lattice__margin_is_lt_1__raises_wm_value_error(self):
+        wm = self._create_wm()
+        self.assertRaises(WaterMarkerValueError, wm.apply_rotated_lattice,
+                          "WATERMARK", 0, 100)
+
+    '''
+    for_image
+    '''
+    def test__for_image__valid_image__keeps_style(self):
+        wm = self._create_wm().size(30).colour((255, 0, 0)).rotation(45)
+        img = Image.new('RGB', (64, 64))
+        actual = wm.for_image(img)
+        self.assertEqual(wm._style_key(), actual._style_key())
+        self.assertIs(img, actual.apply_centre("WATERMARK"))
+
+    def test__for_image__deferring__defers_onto_new_plan(self):
+        wm = self._create_wm().defer(True)
+        actual = wm.for_image(Image.new('RGB', (64, 64)))
+        actual.apply_centre("WATERMARK")
+        self.assertEqual(0, len(wm.plan()))
+        self.assertEqual(1, len(actual.plan()))
+
+    def test__for_image__image_is_none__raises_wm_type_error(self):
+        wm = self._create_wm()
+        self.assertRaises(WaterMarkerTypeError, wm.for_image, None)
+
+    '''
+    style
+    '''
+    def test__init__style_given__uses_style(self):
+        style = WatermarkStyle(size_pt=30, rgb_colour=(255, 0, 0))
+        wm = TextualWaterMarker(Image.new('RGB', (64, 64)), style)
+        self.assertIs(style, wm.style())
+
+    def test__init__style_not_watermark_style__raises_wm_type_error(self):
+        self.assertRaises(WaterMarkerTypeError, TextualWaterMarker,
+                          Image.new('RGB', (64, 64)), {"size": 30})
+
+    def test__size__style_kept__kept_style_unchanged(self):
+        wm = self._create_wm()
+        kept = wm.style()
+        wm.size(40)
+        self.assertEqual(20, kept.size_pt())
+        self.assertEqual(40, wm.style().size_pt())
+
+    def test__init__style_given__same_as_setters(self):
+        style = WatermarkStyle(size_pt=24, rgb_colour=(255, 255, 255),
+                               degrees=30, margin=4)
+        expected = self._create_wm().size(24).colour((255, 255, 255))\
+            .rotation(30).margin(4)\
+            .apply_corner("WATERMARK", Corner.bottom_right())
+        actual = TextualWaterMarker(Image.new('RGB', (512, 512)), style)\
+            .apply_corner("WATERMARK", Corner.bottom_right())
+        self.assertTrue(numpy.array_equal(numpy.asarray(expected),
+                                          numpy.asarray(actual)))
+
+    '''
+    compositor
+    '''
+    def test__compositor__not_band_compositor__raises_wm_type_error(self):
+        wm = self._create_wm()
+        self.assertRaises(WaterMarkerTypeError, wm.compositor, 4)
+
 if __name__ == '__main__':
     unittest.main()